@@ -1,570 +1,1950 @@
 #Code written by MohammadJavad Vaez
 
-from PyQt5 import QtCore, QtGui, QtWidgets
-import sys, os
-import mysql.connector
-import networkx as nx
-import matplotlib.pyplot as plt
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from openpyxl import Workbook
+import sys, os, time, datetime, threading, functools, contextlib, atexit
+from collections import Counter
+from database import (ConnectionPool, MySQLBackend, DatabaseError, IntegrityError, legacy_stage_columns,
+                      has_completed_at, ensure_completed_at)
+from dependency_index import DependencyIndex
+from part_index import PartIndex
+from validation import completion_order, find_cycle, validate_part
+from exports import ExportCancelled, write_rows, write_sheets
+from metrics import metrics, instrumented
+from write_behind import WriteBehindQueue, WriteQueueFull, apply_entries, open_journal, reject_entry, unsaved_entries
+from dependency_graphs import LayoutCache, RenderCancelled, graph_signature, render_graphs, write_graph_pages
 
 # ------------------ Database connection ------------------
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "123456789",
+    "database": "production_manager",
+    "use_pure": True,
+}
+DB_POOL_SIZE = 5
+
+_pool = None
+
+def configure_database(backend=None, pool_size=DB_POOL_SIZE, **pool_options):
+    """Replace the connection pool, e.g. with SQLiteBackend for tests and benchmarks."""
+    global _pool
+    if _pool is not None:
+        _pool.close_all()
+    _pool = ConnectionPool(backend or MySQLBackend(**DB_CONFIG), size=pool_size, **pool_options)
+    _pool.query_observer = metrics.observe_query if metrics.enabled else None
+    return _pool
+
 def get_db_connection():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="123456789",
-        database="production_manager",
-        use_pure=True
-    )
+    # Connections come from the pool; close() returns them instead of disconnecting.
+    if _pool is None:
+        configure_database()
+    return _pool.acquire()
+
+def db_pool_stats():
+    return _pool.stats() if _pool is not None else {}
+
+def set_instrumentation(enabled=True, slow_query_threshold=None):
+    """Turn latency/row/error metrics and the slow-query log on or off.
+
+    slow_query_threshold is in seconds. Read the results with
+    metrics.snapshot() or write them with dump_metrics().
+    """
+    metrics.enabled = enabled
+    if slow_query_threshold is not None:
+        metrics.slow_query_threshold = slow_query_threshold
+    if _pool is not None:
+        _pool.query_observer = metrics.observe_query if enabled else None
+
+def dump_metrics(path="metrics.json"):
+    metrics.dump(path)
+    return f"✅ Metrics written to {path}"
+
+def close_database():
+    global _pool
+    disable_write_behind()
+    if _pool is not None:
+        _pool.close_all()
+        _pool = None
 
 # ------------------ Data model ------------------
+# Operation names, stage IDs and whole ops/deps tuples repeat across millions of
+# stages, so each distinct value is stored once and shared.
+_symbols = {}
+
+def intern_symbol(value):
+    return _symbols.setdefault(value, value)
+
+def intern_tuple(values):
+    if not values:
+        return ()
+    return intern_symbol(tuple(intern_symbol(v) for v in values))
+
+_split_cache = {}
+
+def split_symbols(text):
+    """Interned tuple for a comma-joined DB column such as "drill,deburr"."""
+    if not text:
+        return ()
+    result = _split_cache.get(text)
+    if result is None:
+        result = _split_cache[text] = intern_tuple(text.split(","))
+    return result
+
+_operator_cache = {}
+
+def intern_operator(first, last):
+    """Interned (first, last) name of the operator assigned to a stage; () when unassigned."""
+    result = _operator_cache.get((first, last))
+    if result is None:
+        name = ((first or "").strip(), (last or "").strip())
+        result = _operator_cache[(first, last)] = intern_tuple(name) if any(name) else ()
+    return result
+
+def symbol_table_size():
+    return len(_symbols)
+
+def clear_symbols():
+    _symbols.clear()
+    _split_cache.clear()
+    _operator_cache.clear()
+
 class Stage:
-    def __init__(self, sid, ops=None, deps=None, done=False):
-        self.sid = sid
-        self.ops = ops or []
-        self.deps = deps or []
+    __slots__ = ("sid", "ops", "deps", "done", "operator")
+
+    def __init__(self, sid, ops=None, deps=None, done=False, operator=()):
+        self.sid = intern_symbol(sid)
+        self.ops = intern_tuple(ops)
+        self.deps = intern_tuple(deps)
         self.done = done
+        self.operator = operator  # from intern_operator()
 
 class Part:
+    __slots__ = ("pid", "order_id", "stages")
+
     def __init__(self, pid, order_id):
-        self.pid = pid
-        self.order_id = order_id
+        self.pid = intern_symbol(pid)
+        self.order_id = intern_symbol(order_id)
         self.stages = {}
 
 parts = {}  # in-memory cache
 
+# Background workers and the GUI thread share `parts`; every public function that
+# reads or changes it does so under this lock.
+cache_lock = threading.RLock()
+
+def _locked(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with cache_lock:
+            return fn(*args, **kwargs)
+    return wrapper
+
+# Edits also take a lock per (part_id, order_id), always before cache_lock, so
+# two edits of one part never interleave while cache_lock is released for a
+# database round trip. Locks exist only while someone holds or waits for them.
+_part_locks = {}   # key -> [lock, holders and waiters]
+_part_locks_guard = threading.Lock()
+
+@contextlib.contextmanager
+def part_lock(key):
+    with _part_locks_guard:
+        entry = _part_locks.get(key)
+        if entry is None:
+            entry = _part_locks[key] = [threading.Lock(), 0]
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _part_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _part_locks[key]
+
+@contextlib.contextmanager
+def part_locks(keys):
+    # Several parts' locks, taken in sorted order so two callers cannot deadlock.
+    with contextlib.ExitStack() as stack:
+        for key in sorted(set(keys)):
+            stack.enter_context(part_lock(key))
+        yield
+
+def _part_locked(fn):
+    # For functions whose first two arguments are part_id and order_id.
+    @functools.wraps(fn)
+    def wrapper(pid, order_id, *args, **kwargs):
+        with part_lock((pid, order_id)):
+            return fn(pid, order_id, *args, **kwargs)
+    return wrapper
+
+def _cached_stage(key, sid):
+    part = parts.get(key)
+    return part.stages.get(sid) if part is not None else None
+
+class OperationCancelled(Exception):
+    pass
+
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise OperationCancelled()
+
+# ------------------ Cache listeners ------------------
+# Indexes derived from `parts` register here. Every change to the cache goes
+# through the _cache_* helpers below, which notify listeners after applying it.
+# A listener implements reset(parts), part_added(part), part_removed(part),
+# stage_added(part, stage), stage_removed(part, stage) and
+# stage_changed(part, stage, old_ops, old_deps, old_done).
+_cache_listeners = []
+
+def add_cache_listener(listener):
+    _cache_listeners.append(listener)
+    listener.reset(parts)
+
+def remove_cache_listener(listener):
+    if listener in _cache_listeners:
+        _cache_listeners.remove(listener)
+
+def _cache_reset():
+    for listener in _cache_listeners:
+        listener.reset(parts)
+
+def _cache_add_part(pid, order_id):
+    part = Part(pid, order_id)
+    parts[(part.pid, part.order_id)] = part
+    for listener in _cache_listeners:
+        listener.part_added(part)
+    return part
+
+def _cache_remove_part(key):
+    part = parts.pop(key, None)
+    if part is not None:
+        for listener in _cache_listeners:
+            listener.part_removed(part)
+    return part
+
+def _cache_add_stage(part, sid, ops, deps, done, operator=()):
+    stage = Stage(sid, ops, deps, done, operator)
+    part.stages[stage.sid] = stage
+    for listener in _cache_listeners:
+        listener.stage_added(part, stage)
+    return stage
+
+def _cache_remove_stage(part, sid):
+    stage = part.stages.pop(sid, None)
+    if stage is not None:
+        for listener in _cache_listeners:
+            listener.stage_removed(part, stage)
+    return stage
+
+def _cache_update_stage(part, stage, ops=None, deps=None, done=None, operator=None):
+    old_ops, old_deps, old_done = stage.ops, stage.deps, stage.done
+    if operator is not None:
+        stage.operator = operator  # no listener depends on it
+    if ops is not None:
+        stage.ops = intern_tuple(ops)
+    if deps is not None:
+        stage.deps = intern_tuple(deps)
+    if done is not None:
+        stage.done = done
+    if (old_ops, old_deps, old_done) != (stage.ops, stage.deps, stage.done):
+        for listener in _cache_listeners:
+            listener.stage_changed(part, stage, old_ops, old_deps, old_done)
+
+# ------------------ Ready stages ------------------
+dependency_index = DependencyIndex()
+add_cache_listener(dependency_index)
+
+@_locked
+def ready_stages(order_id=None, operation=None):
+    """(part_id, order_id, stage_id) of every stage that can be completed now,
+    optionally limited to one order and/or operation."""
+    return dependency_index.ready_stages(order_id, operation)
+
+# ------------------ Part queries ------------------
+part_index = PartIndex()
+add_cache_listener(part_index)
+
+def _order_keys(order_id=None):
+    # Keys of one order (or all parts); the caller holds cache_lock.
+    return list(parts) if order_id is None else part_index.keys_for_order(order_id)
+
+@_locked
+def parts_in_order(order_id):
+    """(part_id, order_id) of every part in one order."""
+    return sorted(part_index.keys_for_order(order_id))
+
+@_locked
+def orders_for_part(pid):
+    return sorted(order_id for _pid, order_id in part_index.keys_for_part(pid))
+
+@_locked
+def completed_parts(order_id=None):
+    """(part_id, order_id) of parts whose stages are all done."""
+    return sorted(part_index.complete_parts(order_id))
+
+@_locked
+def stages_with_operation(operation, done=None):
+    """(part_id, order_id, stage_id) of stages that include operation,
+    optionally only done (True) or pending (False) ones."""
+    result = part_index.stages_with_operation(operation)
+    if done is not None:
+        result = [(pid, oid, sid) for pid, oid, sid in result if parts[(pid, oid)].stages[sid].done == done]
+    return sorted(result)
+
+# ------------------ Report aggregates ------------------
+# Completion counters live in part_index and change in O(1) with every edit.
+DASHBOARD_INTERVAL_MS = 2000   # how often the GUI dashboard re-reads them
+
+@_locked
+def order_progress(order_id=None):
+    """OrderProgress for one order, or {order_id: OrderProgress} for every order."""
+    if order_id is not None:
+        return part_index.order_progress(order_id)
+    return {oid: part_index.order_progress(oid) for oid in part_index.order_ids()}
+
+@_locked
+def check_report_aggregates():
+    """Aggregates that disagree with a full recompute; empty when consistent."""
+    return part_index.verify(parts)
+
+# ------------------ Scheduling ------------------
+# Set real figures with schedule_engine.configure(durations={"drill": 0.5, ...},
+# capacities={"drill": 2, ...}); results are recomputed only for changed parts.
+_schedule_engine = None
+
+def _get_schedule_engine():
+    # Created on first use, so numpy is only imported by code that schedules.
+    global _schedule_engine
+    with cache_lock:
+        if _schedule_engine is None:
+            from scheduling import ScheduleEngine
+            _schedule_engine = ScheduleEngine()
+            add_cache_listener(_schedule_engine)
+    return _schedule_engine
+
+@_locked
+def critical_path(pid, order_id):
+    return _get_schedule_engine().critical_path((pid, order_id))
+
+@_locked
+def shop_schedule():
+    return _get_schedule_engine().shop_schedule()
+
+# ------------------ Validation ------------------
+def _check_dependencies(key, sid, deps_list):
+    part = parts[key]
+    for dep in deps_list:
+        if dep == sid:
+            return f"❌ Stage {sid} cannot depend on itself."
+        if dep not in part.stages:
+            return f"❌ Dependency {dep} does not exist in part {key[0]}."
+    path = find_cycle(dependency_index.dependents_map(key), sid, deps_list)
+    if path:
+        return f"❌ Dependencies would create a cycle: {' -> '.join(path + [sid])}."
+    return None
+
+@instrumented(rows=len)
+@_locked
+def validate_all_parts():
+    """[(part_id, order_id, stage_id, message)] for every dangling dependency and cycle."""
+    violations = []
+    for (pid, order_id), part in parts.items():
+        for sid, message in validate_part(part):
+            violations.append((pid, order_id, sid, message))
+    return violations
+
+# ------------------ Stage operations and dependencies ------------------
+# Stored one row per item in stage_operations and stage_dependencies, with an
+# ordinal that keeps the stage's order. (table, value column, Stage attribute):
+STAGE_LIST_TABLES = (("stage_operations", "operation", "ops"), ("stage_dependencies", "depends_on", "deps"))
+
+_layout_checked = None   # the pool whose schema has been checked
+_completion_times = True # whether that schema has stages.completed_at
+
+# Only looks: schema changes are left to migrate_schema(), which needs rights
+# and, on MySQL, table locks that an ordinary client should not take.
+def _check_stage_layout(conn):
+    global _layout_checked, _completion_times
+    if _layout_checked is not _pool:
+        if legacy_stage_columns(conn):
+            raise DatabaseError("stages still uses comma-joined operations/dependencies columns; "
+                                "run python cli.py migrate-schema first")
+        _completion_times = has_completed_at(conn)
+        if not _completion_times:
+            print("⚠ stages has no completed_at column, so completion times are not recorded; "
+                  "run python cli.py migrate-schema to add it.")
+        _layout_checked = _pool
+
+def _records_completion_times(conn):
+    _check_stage_layout(conn)
+    return _completion_times
+
+def _insert_stage_lists(cursor, rows, existing_only=False):
+    # rows: (part_id, order_id, stage_id, operations, dependencies) with sequences of names.
+    # existing_only skips stages that are no longer in the database instead of
+    # failing on the foreign key, for writes that may have lost a race with a delete.
+    for slot, (table, column, _attr) in enumerate(STAGE_LIST_TABLES):
+        values = [(pid, order_id, sid, i, value)
+                  for pid, order_id, sid, *lists in rows for i, value in enumerate(lists[slot])]
+        if not values:
+            continue
+        sql = f"INSERT INTO {table} (part_id, order_id, stage_id, ordinal, {column}) "
+        if existing_only:
+            cursor.executemany(sql + "SELECT %s, %s, %s, %s, %s FROM stages "
+                               "WHERE part_id = %s AND order_id = %s AND stage_id = %s",
+                               [v + v[:3] for v in values])
+        else:
+            cursor.executemany(sql + "VALUES (%s, %s, %s, %s, %s)", values)
+
+def _delete_stage_lists(cursor, keys):
+    keys = list(keys)
+    for table, _column, _attr in STAGE_LIST_TABLES:
+        cursor.executemany(f"DELETE FROM {table} WHERE part_id = %s AND order_id = %s AND stage_id = %s", keys)
+
+def _fetch_stage_lists(cursor, key_columns, keys):
+    """{(part_id, order_id, stage_id): (operations, dependencies)} as interned
+    tuples, for the stages matching keys on key_columns."""
+    lists = {}
+    for slot, (table, column, _attr) in enumerate(STAGE_LIST_TABLES):
+        rows = sorted(_fetch_by_keys(cursor, f"SELECT part_id, order_id, stage_id, ordinal, {column} FROM {table}",
+                                     key_columns, keys))
+        for pid, order_id, sid, _ordinal, value in rows:
+            lists.setdefault((pid, order_id, sid), ([], []))[slot].append(value)
+    return {key: (intern_tuple(ops), intern_tuple(deps)) for key, (ops, deps) in lists.items()}
+
+def _fetch_stage_list_range(cursor, first, last, order_id=None):
+    """{(part_id, order_id, stage_id): ([operations], [dependencies])} for every
+    stage with a key from first to last inclusive; a primary-key range scan on
+    both tables. The lists are plain, not interned, for one-off readers."""
+    lists = {}
+    for slot, (table, column, _attr) in enumerate(STAGE_LIST_TABLES):
+        sql = (f"SELECT part_id, order_id, stage_id, {column} FROM {table} "
+               "WHERE (part_id, order_id, stage_id) >= (%s, %s, %s) AND (part_id, order_id, stage_id) <= (%s, %s, %s)")
+        params = list(first) + list(last)
+        if order_id is not None:
+            sql += " AND order_id = %s"
+            params.append(order_id)
+        cursor.execute(sql + " ORDER BY part_id, order_id, stage_id, ordinal", params)
+        for pid, oid, sid, value in cursor.fetchall():
+            entry = lists.get((pid, oid, sid))
+            if entry is None:
+                entry = lists[(pid, oid, sid)] = ([], [])
+            entry[slot].append(value)
+    return lists
+
+def _fetch_stages(cursor, key_columns, keys):
+    """[(part_id, order_id, stage_id, operations, dependencies, done, operator)]
+    for the stages matching keys on key_columns."""
+    keys = list(keys)
+    lists = _fetch_stage_lists(cursor, key_columns, keys)
+    return [(pid, order_id, sid) + lists.get((pid, order_id, sid), ((), ()))
+            + (bool(done), intern_operator(operator_first, operator_last))
+            for pid, order_id, sid, done, operator_first, operator_last in _fetch_by_keys(
+                cursor, "SELECT part_id, order_id, stage_id, done, operator_first, operator_last FROM stages",
+                key_columns, keys)]
+
+def _split_legacy(text):
+    return [v.strip() for v in (text or "").split(",") if v.strip()]
+
+def migrate_stage_lists(batch_size=5000, progress=None):
+    """One-shot move of the comma-joined stages.operations/dependencies columns
+    into stage_operations and stage_dependencies.
+
+    The copy is counted and checked before the old columns are dropped, so a
+    failed or interrupted run leaves them in place and can simply be run again.
+    Other clients must be stopped while it runs.
+    """
+    conn = cursor = None
+    try:
+        conn = get_db_connection()
+        if not legacy_stage_columns(conn):
+            return "✅ The database already uses the stage_operations/stage_dependencies tables."
+        _settle_writes()
+        cursor = conn.cursor()
+        for statement in _pool.backend.stage_tables_ddl():
+            cursor.execute(statement)
+        # No change_log entries for the copy; the triggers come back at the end.
+        for table, _column, _attr in STAGE_LIST_TABLES:
+            for when in ("ins", "del"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {table}_change_{when}")
+            cursor.execute(f"DELETE FROM {table}")  # leftovers of an interrupted run
+        conn.commit()
+
+        total = copied = 0
+        expected = [0, 0]
+        if progress:
+            cursor.execute("SELECT COUNT(*) FROM stages")
+            total = cursor.fetchall()[0][0]
+        # Paged by key on the one connection: SQLite cannot commit while another
+        # connection is still reading.
+        last = None
+        while True:
+            sql = "SELECT part_id, order_id, stage_id, operations, dependencies FROM stages"
+            params = []
+            if last is not None:
+                sql += " WHERE (part_id, order_id, stage_id) > (%s, %s, %s)"
+                params = list(last)
+            cursor.execute(sql + " ORDER BY part_id, order_id, stage_id LIMIT %s", params + [batch_size])
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            lists = [(pid, order_id, sid, _split_legacy(ops), _split_legacy(deps))
+                     for pid, order_id, sid, ops, deps in rows]
+            _insert_stage_lists(cursor, lists)
+            conn.commit()
+            for row in lists:
+                expected[0] += len(row[3])
+                expected[1] += len(row[4])
+            copied += len(rows)
+            last = tuple(rows[-1][:3])
+            if progress:
+                progress(copied, total)
+
+        for (table, _column, _attr), count in zip(STAGE_LIST_TABLES, expected):
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            found = cursor.fetchall()[0][0]
+            if found != count:
+                return f"❌ {table} has {found} rows after the copy, expected {count}. Old columns kept."
+        cursor.execute("ALTER TABLE stages DROP COLUMN operations")
+        cursor.execute("ALTER TABLE stages DROP COLUMN dependencies")
+        conn.commit()
+        if _read_change_log_watermark(conn) is not None:
+            for statement in _pool.backend.change_log_ddl():
+                cursor.execute(statement)
+            conn.commit()
+        return f"✅ Migrated {copied} stages: {expected[0]} operations and {expected[1]} dependencies."
+    except DatabaseError as e:
+        return f"❌ Database error: {e}"
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def migrate_schema(batch_size=5000, progress=None):
+    """Bring an older database up to date: stage lists in their own tables
+    (migrate_stage_lists), stages.completed_at with its index, and the change
+    log that sync_from_db reads.
+
+    Each step is skipped when already done. Other clients must be stopped while
+    it runs: on MySQL the ALTER TABLE blocks writes to stages.
+    """
+    global _layout_checked
+    messages = [migrate_stage_lists(batch_size, progress)]
+    if messages[-1].startswith("❌"):
+        return messages[-1]
+    conn = None
+    try:
+        conn = get_db_connection()
+        if ensure_completed_at(conn):
+            messages.append("✅ Added stages.completed_at; completion times are recorded from now on.")
+        if _read_change_log_watermark(conn) is None:
+            messages.append(install_change_log())
+    except DatabaseError as e:
+        messages.append(f"❌ Database error: {e}")
+    finally:
+        if conn: conn.close()
+    _layout_checked = None
+    # A failed step goes first, so the result still reads as a failure.
+    messages.sort(key=lambda m: not m.startswith("❌"))
+    return "\n".join(messages)
+
 # ------------------ Load from DB ------------------
-def load_from_db():
-    global parts
+LOAD_BATCH_SIZE = 5000
+
+def _fetch_batches(cursor, batch_size):
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+@instrumented(rows=lambda _result: part_index.totals().stages,
+              failed=lambda _result: _sync_seq is None and not _change_log_missing)
+@_locked
+def load_from_db(batch_size=LOAD_BATCH_SIZE, progress=None, raise_errors=False):
+    """Stream both tables into the cache in batches of batch_size rows.
+
+    Rows are read through an unbuffered cursor, so peak memory is bounded by the
+    batch size rather than the table size. progress(loaded, total) is called
+    after every batch when given. Database errors are printed and leave the
+    cache empty, or are raised when raise_errors is set.
+    """
+    global parts, _sync_seq, _change_log_missing, _change_log_warned
+    try:
+        _settle_writes()
+    except DatabaseError as e:
+        if raise_errors:
+            raise
+        print(f"❌ Not reloading: {e}")
+        return
     parts.clear()
+    clear_symbols()
+    _sync_gaps.clear()
     conn = cursor = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
+        _check_stage_layout(conn)
+        # Taken before reading, so changes racing with the load are re-applied by the next sync.
+        watermark = _read_change_log_watermark(conn)
+        total = loaded = 0
+        if progress:
+            cursor = conn.cursor()
+            cursor.execute("SELECT (SELECT COUNT(*) FROM parts) + (SELECT COUNT(*) FROM stages)")
+            total = cursor.fetchall()[0][0]
+            cursor.close()
+            progress(0, total)
+
+        cursor = conn.cursor(buffered=False)
         cursor.execute("SELECT part_id, order_id FROM parts")
-        for row in cursor.fetchall():
-            key = (row["part_id"], row["order_id"])
-            parts[key] = Part(row["part_id"], row["order_id"])
+        for rows in _fetch_batches(cursor, batch_size):
+            for pid, order_id in rows:
+                part = Part(pid, order_id)
+                parts[(part.pid, part.order_id)] = part
+            loaded += len(rows)
+            if progress:
+                progress(loaded, total)
+
+        cursor.execute("SELECT part_id, order_id, stage_id, done, operator_first, operator_last FROM stages")
+        for rows in _fetch_batches(cursor, batch_size):
+            for pid, order_id, sid, done, operator_first, operator_last in rows:
+                part = parts.get((pid, order_id))
+                if part is None:
+                    continue
+                stage = Stage(sid, None, None, bool(done), intern_operator(operator_first, operator_last))
+                part.stages[stage.sid] = stage
+            loaded += len(rows)
+            if progress:
+                progress(loaded, total)
+
+        # In key order each stage's items arrive together, so every list is
+        # built and interned once, with no string splitting.
+        for table, column, attr in STAGE_LIST_TABLES:
+            cursor.execute(f"SELECT part_id, order_id, stage_id, {column} FROM {table} "
+                           "ORDER BY part_id, order_id, stage_id, ordinal")
+            current, values = None, []
+            for rows in _fetch_batches(cursor, batch_size):
+                for pid, order_id, sid, value in rows:
+                    if (pid, order_id, sid) != current:
+                        _set_stage_list(current, attr, values)
+                        current, values = (pid, order_id, sid), []
+                    values.append(value)
+            _set_stage_list(current, attr, values)
+        _sync_seq = watermark
+        _change_log_missing = watermark is None
+        if _change_log_missing and not _change_log_warned:
+            print("⚠ The database has no change log, so edits from other clients are only seen "
+                  "after a reload; run python cli.py migrate-schema to install it.")
+            _change_log_warned = True
+
+    except DatabaseError as e:
+        _sync_seq = None
+        _change_log_missing = False
+        if raise_errors:
+            raise
+        print(f"❌ Database error while loading: {e}")
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+        _cache_reset()
+
+def _set_stage_list(key, attr, values):
+    part = parts.get(key[:2]) if key else None
+    stage = part.stages.get(key[2]) if part else None
+    if stage is not None:
+        setattr(stage, attr, intern_tuple(values))
+
+# ------------------ Delta sync ------------------
+# Each client remembers the last change_log sequence number it has applied and
+# pulls only newer entries, so sync cost scales with the number of changes.
+SYNC_GAP_TIMEOUT = 60.0   # seconds to wait for a skipped sequence number to commit
+SYNC_KEY_CHUNK = 500
+SYNC_INTERVAL_MS = 5000   # how often the GUI pulls changes from other workstations
+
+_sync_seq = None  # None until loaded with a change log present
+_change_log_missing = False   # loaded, but there is no change log to sync from
+_change_log_warned = False
+_sync_gaps = {}   # seq -> time first noticed missing
+
+def install_change_log():
+    conn = cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        for statement in _pool.backend.change_log_ddl():
+            cursor.execute(statement)
+        conn.commit()
+        return "✅ Change log installed."
+    except DatabaseError as e:
+        return f"❌ Database error: {e}"
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
 
-        cursor.execute("SELECT part_id, order_id, stage_id, operations, dependencies, done, operator_first, operator_last FROM stages")
-        for row in cursor.fetchall():
-            key = (row["part_id"], row["order_id"])
-            if key not in parts:
-                continue
-            ops = row["operations"].split(",") if row["operations"] else []
-            deps = row["dependencies"].split(",") if row["dependencies"] else []
-            done = bool(row["done"])
-            parts[key].stages[row["stage_id"]] = Stage(row["stage_id"], ops, deps, done)
+def prune_change_log(keep_last=100000):
+    # Clients whose watermark falls behind the pruned range do a full reload.
+    conn = cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(seq) FROM change_log")
+        max_seq = cursor.fetchall()[0][0]
+        if max_seq is not None and max_seq > keep_last:
+            cursor.execute("DELETE FROM change_log WHERE seq <= %s", (max_seq - keep_last,))
+            conn.commit()
+        return "✅ Change log pruned."
+    except DatabaseError as e:
+        return f"❌ Database error: {e}"
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
 
-    except mysql.connector.Error as e:
-        print(f"❌ Database error while loading: {e}")
+def _read_change_log_watermark(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log")
+        return cursor.fetchall()[0][0]
+    except DatabaseError:
+        conn.rollback()
+        return None
+    finally:
+        cursor.close()
+
+def _fetch_by_keys(cursor, sql, key_columns, keys):
+    keys = list(keys)
+    width = len(key_columns)
+    placeholder = "(" + ", ".join(["%s"] * width) + ")"
+    for i in range(0, len(keys), SYNC_KEY_CHUNK):
+        chunk = keys[i:i + SYNC_KEY_CHUNK]
+        cursor.execute(f"{sql} WHERE ({', '.join(key_columns)}) IN ({', '.join([placeholder] * len(chunk))})",
+                       [v for key in chunk for v in key])
+        yield from cursor.fetchall()
+
+class _EditRecorder:
+    # Cache listener noting the parts that change while sync_from_db reads the
+    # database without cache_lock: rows it read for them may predate the change.
+    def __init__(self):
+        self.keys = None
+
+    def start(self):
+        self.keys = set()
+
+    def stop(self):
+        keys, self.keys = self.keys, None
+        return keys or set()
+
+    def _note(self, part):
+        if self.keys is not None:
+            self.keys.add((part.pid, part.order_id))
+
+    def reset(self, parts):
+        pass  # a load moves the watermark, which sync_from_db checks
+
+    def part_added(self, part):
+        self._note(part)
+
+    def part_removed(self, part):
+        self._note(part)
+
+    def stage_added(self, part, stage):
+        self._note(part)
+
+    def stage_removed(self, part, stage):
+        self._note(part)
+
+    def stage_changed(self, part, stage, old_ops, old_deps, old_done):
+        self._note(part)
+
+_sync_edits = _EditRecorder()
+add_cache_listener(_sync_edits)
+_sync_lock = threading.Lock()   # one sync at a time; taken before cache_lock
+
+def _read_changes(since, gaps):
+    """Everything sync_from_db needs from the database, read without cache_lock:
+    (changes, existing parts, stage rows, live stage IDs per existing part), or
+    None when the change log has been pruned past since."""
+    conn = cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(seq) FROM change_log")
+        min_seq = cursor.fetchall()[0][0]
+        if min_seq is not None and min_seq > since + 1:
+            return None
+
+        sql = "SELECT seq, part_id, order_id, stage_id FROM change_log WHERE seq > %s"
+        params = [since]
+        if gaps:
+            sql += f" OR seq IN ({', '.join(['%s'] * len(gaps))})"
+            params.extend(gaps)
+        cursor.execute(sql + " ORDER BY seq", params)
+        changes = cursor.fetchall()
+
+        part_keys = {(pid, order_id) for _seq, pid, order_id, sid in changes if sid is None}
+        stage_keys = {(pid, order_id, sid) for _seq, pid, order_id, sid in changes if sid is not None}
+        existing_parts = set(_fetch_by_keys(cursor, "SELECT part_id, order_id FROM parts",
+                                            ("part_id", "order_id"), part_keys))
+        stage_rows = {r[:3]: r for r in _fetch_stages(cursor, ("part_id", "order_id", "stage_id"), stage_keys)}
+        # A logged part that exists may have been deleted and added again, and
+        # MySQL logs nothing for the stages the delete cascaded to, so all of its
+        # stages are read and the cached ones compared against them.
+        live_stages = {key: set() for key in existing_parts}
+        for row in _fetch_stages(cursor, ("part_id", "order_id"), existing_parts):
+            stage_rows[row[:3]] = row
+            live_stages[row[:2]].add(row[2])
+        conn.rollback()  # end the read snapshot
+        return changes, existing_parts, stage_rows, live_stages
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+@instrumented(rows=lambda stats: stats["changes"])
+def sync_from_db():
+    """Apply inserts, updates and deletes made since the last load or sync.
+
+    Falls back to a full load_from_db when nothing is loaded yet or the change
+    log has been pruned past this client's watermark. Without a change log
+    (see migrate_schema) it does nothing, rather than reload everything on
+    every call. Returns counts of what changed.
+
+    The database is read without cache_lock, which is only taken to apply the
+    result. Changes to parts edited here in the meantime are left for the
+    next sync, and the whole result is dropped if a load ran meanwhile.
+    """
+    global _sync_seq
+    _settle_writes()
+    stats = {"changes": 0, "parts_upserted": 0, "parts_removed": 0,
+             "stages_upserted": 0, "stages_removed": 0, "full_reload": False, "skipped": False}
+    with _sync_lock:
+        with cache_lock:
+            if _change_log_missing:
+                stats["skipped"] = True
+                return stats
+            since, gaps = _sync_seq, list(_sync_gaps)
+            if since is not None:
+                _sync_edits.start()
+        if since is None:
+            load_from_db()
+            stats["full_reload"] = True
+            return stats
+        try:
+            result = _read_changes(since, gaps)
+        except BaseException:
+            with cache_lock:
+                _sync_edits.stop()
+            raise
+        if result is None:
+            with cache_lock:
+                _sync_edits.stop()
+            load_from_db()
+            stats["full_reload"] = True
+            return stats
+
+        changes, existing_parts, stage_rows, live_stages = result
+        with cache_lock:
+            edited = _sync_edits.stop()
+            if _sync_seq != since:
+                return stats  # a load ran meanwhile and saw these changes itself
+            now = time.monotonic()
+            seen, part_keys, stage_keys = set(), set(), set()
+            for seq, pid, order_id, sid in changes:
+                if (pid, order_id) in edited:
+                    _sync_gaps[seq] = now  # ask again next time, with fresh rows
+                    continue
+                seen.add(seq)
+                if sid is None:
+                    part_keys.add((pid, order_id))
+                else:
+                    stage_keys.add((pid, order_id, sid))
+            stage_keys.update(k for k in stage_rows if k[:2] in part_keys)
+
+            for key in part_keys:
+                if key in existing_parts:
+                    part = parts.get(key)
+                    if part is None:
+                        _cache_add_part(*key)
+                        stats["parts_upserted"] += 1
+                        continue
+                    for sid in [sid for sid in part.stages if sid not in live_stages[key]]:
+                        _cache_remove_stage(part, sid)
+                        stats["stages_removed"] += 1
+                elif _cache_remove_part(key) is not None:  # its stages go with it
+                    stats["parts_removed"] += 1
+
+            for pid, order_id, sid in stage_keys:
+                part = parts.get((pid, order_id))
+                row = stage_rows.get((pid, order_id, sid))
+                if row is None:
+                    if part is not None and _cache_remove_stage(part, sid) is not None:
+                        stats["stages_removed"] += 1
+                    continue
+                if part is None:
+                    part = _cache_add_part(pid, order_id)
+                ops, deps, done, operator = row[3:]
+                stage = part.stages.get(sid)
+                if stage is None:
+                    _cache_add_stage(part, sid, ops, deps, done, operator)
+                else:
+                    _cache_update_stage(part, stage, ops, deps, done, operator)
+                stats["stages_upserted"] += 1
+
+            # Sequence numbers are allocated before commit, so one that is missing
+            # now may still show up; re-ask for it until SYNC_GAP_TIMEOUT expires.
+            if changes:
+                new_seq = max(_sync_seq, changes[-1][0])
+                for seq in range(_sync_seq + 1, new_seq):
+                    if seq not in seen:
+                        _sync_gaps.setdefault(seq, now)
+                _sync_seq = new_seq
+            for seq in list(_sync_gaps):
+                if seq in seen or now - _sync_gaps[seq] > SYNC_GAP_TIMEOUT:
+                    del _sync_gaps[seq]
+            stats["changes"] = len(seen)
+            return stats
+
+@instrumented(rows=len)
+@_locked
+def load_parts(keys):
+    """Load just these (part_id, order_id) parts into the cache, replacing any
+    cached copy. Meant for short scripts that touch a few parts; returns the
+    keys that exist in the database. Raises DatabaseError."""
+    keys = list(keys)
+    _settle_writes()
+    conn = cursor = None
+    try:
+        conn = get_db_connection()
+        _check_stage_layout(conn)
+        cursor = conn.cursor()
+        found = [tuple(row) for row in _fetch_by_keys(
+            cursor, "SELECT part_id, order_id FROM parts", ("part_id", "order_id"), keys)]
+        stage_rows = _fetch_stages(cursor, ("part_id", "order_id"), found)
+        conn.rollback()
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+    for key in keys:
+        _cache_remove_part(key)
+    for key in found:
+        _cache_add_part(*key)
+    for pid, order_id, sid, ops, deps, done, operator in stage_rows:
+        _cache_add_stage(parts[(pid, order_id)], sid, ops, deps, done, operator)
+    return found
+
+# ------------------ Database queries ------------------
+# Answered by the server through its indexes, for scripts that should not load
+# the whole cache first.
+def db_stages_with_operation(operation, done=None, order_id=None):
+    """(part_id, order_id, stage_id) of stages that include operation, optionally
+    only done (True) or pending (False) ones. Raises DatabaseError."""
+    sql = """
+        SELECT s.part_id, s.order_id, s.stage_id FROM stage_operations o
+        JOIN stages s ON s.part_id = o.part_id AND s.order_id = o.order_id AND s.stage_id = o.stage_id
+        WHERE o.operation = %s"""
+    params = [operation]
+    if order_id is not None:
+        sql += " AND o.order_id = %s"
+        params.append(order_id)
+    if done is not None:
+        sql += " AND s.done = %s"
+        params.append(done)
+    return sorted(set(_db_query(sql, params)))
+
+def db_dependents(pid, order_id, sid):
+    """Stage IDs in the part that depend directly on sid. Raises DatabaseError."""
+    return sorted({row[0] for row in _db_query(
+        "SELECT stage_id FROM stage_dependencies WHERE part_id = %s AND order_id = %s AND depends_on = %s",
+        (pid, order_id, sid))})
+
+def db_completions_by_day(since, until, order_id=None):
+    """(operator_first, operator_last, day, stages) for stages completed from the
+    date since through the date until; none before migrate-schema has added
+    stages.completed_at. Raises DatabaseError."""
+    conn = get_db_connection()
+    try:
+        if not _records_completion_times(conn):
+            return []
+    finally:
+        conn.close()
+    sql = """
+        SELECT operator_first, operator_last, DATE(completed_at), COUNT(*) FROM stages
+        WHERE done = TRUE AND completed_at >= %s AND completed_at < %s"""
+    params = [f"{since} 00:00:00", f"{until + datetime.timedelta(days=1)} 00:00:00"]
+    if order_id is not None:
+        sql += " AND order_id = %s"
+        params.append(order_id)
+    sql += " GROUP BY operator_first, operator_last, DATE(completed_at)"
+    return _db_query(sql, params)
+
+def _db_query(sql, params):
+    _settle_writes()
+    conn = cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(sql, params)
+        rows = [tuple(row) for row in cursor.fetchall()]
+        conn.rollback()
+        return rows
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
+# ------------------ Write-behind ------------------
+# Optional. While enabled, complete_stage and update_stage change the cache and
+# journal the write as soon as their checks pass, and a background thread saves
+# queued writes in batched transactions. Everything else that writes or reads
+# the database waits for the queue to drain first, so it never overtakes a
+# queued write. Writes left in the journal by a crash are saved again by
+# replay_pending_writes(), or queued first by the next enable_write_behind().
+# The journal is locked while a queue or replay has it open, so only one
+# process at a time uses it.
+WRITE_BEHIND = False              # gui.main() turns it on when True
+WRITE_BEHIND_JOURNAL = "pending_writes.journal"
+WRITE_BEHIND_MAX_PENDING = 10000
+WRITE_BEHIND_BATCH_SIZE = 500
+WRITE_BEHIND_TIMEOUT = 30.0       # seconds a caller waits on a full or draining queue
+# Writes failing with these are set aside in "<journal>.rejected" rather than
+# retried: a constraint they break, or a malformed journal line.
+WRITE_BEHIND_PERMANENT_ERRORS = (IntegrityError, KeyError)
+
+_write_behind = None
+
+def _apply_stage_writes(entries):
+    # Later updates of the same stage win, the first completion time is kept;
+    # one transaction for the batch.
+    done, changed = {}, {}
+    for e in entries:
+        key = (e["part_id"], e["order_id"], e["stage_id"])
+        if e["op"] == "complete":
+            done.setdefault(key, e.get("completed_at") or _timestamp())
+        else:
+            changed[key] = (e["operations"], e["dependencies"])
+    conn = cursor = None
+    try:
+        conn = get_db_connection()
+        timed = _records_completion_times(conn)
+        cursor = conn.cursor()
+        if changed:
+            _delete_stage_lists(cursor, changed)
+            # Another client may have removed the stage since the update was queued.
+            _insert_stage_lists(cursor, [key + tuple(split_symbols(text) for text in values)
+                                         for key, values in changed.items()], existing_only=True)
+        if done:
+            _mark_done(cursor, [(at,) + key for key, at in done.items()], timed)
+        conn.commit()
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+def replay_pending_writes(journal=WRITE_BEHIND_JOURNAL):
+    """Save writes a previous run journaled but never committed; returns how many.
+
+    Raises DatabaseError, or JournalLocked while another process's queue or
+    replay has the journal; its writes are that process's to save.
+    """
+    if _write_behind is not None and _write_behind.journal_path == journal:
+        return 0  # the live queue owns this journal
+    if not os.path.exists(journal):
+        return 0
+    with open_journal(journal) as f:
+        entries = unsaved_entries(f)
+        for i in range(0, len(entries), WRITE_BEHIND_BATCH_SIZE):
+            _saved, _rejected, error = apply_entries(_apply_stage_writes, entries[i:i + WRITE_BEHIND_BATCH_SIZE],
+                                                     WRITE_BEHIND_PERMANENT_ERRORS,
+                                                     lambda entry, e: reject_entry(journal, entry, e))
+            if error is not None:
+                raise error
+        f.truncate(0)  # still locked; removing it would race with a queue opening it
+    return len(entries)
+
+@_locked
+def enable_write_behind(journal=WRITE_BEHIND_JOURNAL, max_pending=WRITE_BEHIND_MAX_PENDING,
+                        batch_size=WRITE_BEHIND_BATCH_SIZE, fsync=True):
+    """Queue stage completions and updates from now on; returns how many writes
+    left in the journal by an earlier run are queued ahead of them.
+
+    Raises JournalLocked if another process is using the journal.
+    """
+    global _write_behind
+    disable_write_behind()
+    _write_behind = WriteBehindQueue(_apply_stage_writes, journal, max_pending=max_pending,
+                                     batch_size=batch_size, fsync=fsync,
+                                     permanent_errors=WRITE_BEHIND_PERMANENT_ERRORS)
+    return _write_behind.recovered
+
+@_locked
+def disable_write_behind(timeout=WRITE_BEHIND_TIMEOUT):
+    """Save everything queued and go back to synchronous writes.
+
+    Returns False if the database could not take the queued writes in time;
+    they stay in the journal for replay_pending_writes().
+    """
+    global _write_behind
+    if _write_behind is None:
+        return True
+    queue, _write_behind = _write_behind, None
+    return queue.close(timeout)
+
+def write_behind_stats():
+    return _write_behind.stats() if _write_behind is not None else {}
+
+def _settle_writes():
+    # Called before anything else reads or writes the database.
+    if _write_behind is not None and not _write_behind.flush(WRITE_BEHIND_TIMEOUT):
+        raise DatabaseError(f"{_write_behind.pending} queued writes not saved yet "
+                            f"({_write_behind.last_error or 'database busy'})")
+
+def _queue_write(queue, entry):
+    # Not under cache_lock: put() waits for room when the queue is full.
+    try:
+        queue.put(entry, WRITE_BEHIND_TIMEOUT)
+    except (WriteQueueFull, OSError) as e:
+        return f"❌ Could not queue the write: {e}"
+    return None
+
+def _flush_on_exit():
+    # Not under cache_lock: a worker thread may still hold it at exit.
+    if _write_behind is not None:
+        _write_behind.close(WRITE_BEHIND_TIMEOUT)
+
+atexit.register(_flush_on_exit)
+
 # ------------------ Save functions ------------------
+# Completion times are taken on the client, so a queued completion keeps the
+# time it happened; completing a stage again does not move it.
+COMPLETE_STAGE_SQL = """
+    UPDATE stages SET done = TRUE, completed_at = COALESCE(completed_at, %s)
+    WHERE part_id = %s AND order_id = %s AND stage_id = %s
+"""
+UNTIMED_COMPLETE_STAGE_SQL = """
+    UPDATE stages SET done = TRUE WHERE part_id = %s AND order_id = %s AND stage_id = %s
+"""
+
+def _mark_done(cursor, rows, timed):
+    # rows: (completed_at, part_id, order_id, stage_id); timed from
+    # _records_completion_times(), asked before the transaction's first write.
+    if timed:
+        cursor.executemany(COMPLETE_STAGE_SQL, rows)
+    else:
+        cursor.executemany(UNTIMED_COMPLETE_STAGE_SQL, [row[1:] for row in rows])
+
+def _timestamp():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+# Each edit holds its part's lock from the first check to the cache update, and
+# cache_lock only while reading or changing the cache, so the database round
+# trips of edits to different parts overlap. The cache updates re-check what
+# they change: a load or sync may have run in between.
+@instrumented
+@_part_locked
 def add_part(pid, order_id):
     if not pid or not order_id:
         return "⚠ Part ID and Order ID cannot be blank."
     key = (pid, order_id)
-    if key in parts:
-        return f"❌ Part {pid} with order {order_id} already exists."
+    with cache_lock:
+        if key in parts:
+            return f"❌ Part {pid} with order {order_id} already exists."
 
+    conn = cursor = None
     try:
+        _settle_writes()
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("INSERT INTO parts (part_id, order_id) VALUES (%s, %s)", (pid, order_id))
         conn.commit()
-        cursor.close()
-        conn.close()
-        parts[key] = Part(pid, order_id)
+        with cache_lock:
+            if key not in parts:
+                _cache_add_part(pid, order_id)
         return f"✅ Part {pid} (Order {order_id}) added."
-    except mysql.connector.IntegrityError:
+    except IntegrityError:
         return f"❌ Part {pid} with order {order_id} already exists in DB."
-    except mysql.connector.Error as e:
+    except DatabaseError as e:
         return f"❌ Database error: {e}"
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
+@instrumented
+@_part_locked
 def add_stage(pid, order_id, sid, ops, deps, operator_first="", operator_last=""):
     if not pid or not order_id or not sid:
         return "⚠ Part ID, Order ID, and Stage ID cannot be blank."
 
     key = (pid, order_id)
-    if key not in parts:
-        return f"❌ Part {pid} with order {order_id} not found."
-    if sid in parts[key].stages:
-        return f"❌ Stage {sid} already exists for part {pid}."
-
     ops_list = [o.strip() for o in ops.split(",") if o.strip()]
     deps_list = [d.strip() for d in deps.split(",") if d.strip()]
+    with cache_lock:
+        if key not in parts:
+            return f"❌ Part {pid} with order {order_id} not found."
+        if sid in parts[key].stages:
+            return f"❌ Stage {sid} already exists for part {pid}."
+        error = _check_dependencies(key, sid, deps_list)
+        if error:
+            return error
 
     conn = cursor = None
     try:
+        _settle_writes()
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO stages (part_id, order_id, stage_id, operations, dependencies, done, operator_first, operator_last)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """, (pid, order_id, sid, ",".join(ops_list), ",".join(deps_list), False, operator_first, operator_last))
+            INSERT INTO stages (part_id, order_id, stage_id, done, operator_first, operator_last)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (pid, order_id, sid, False, operator_first, operator_last))
+        _insert_stage_lists(cursor, [(pid, order_id, sid, ops_list, deps_list)])
         conn.commit()
 
-        parts[key].stages[sid] = Stage(sid, ops_list, deps_list, False)
+        operator = intern_operator(operator_first, operator_last)
+        with cache_lock:
+            part = parts.get(key) or _cache_add_part(pid, order_id)
+            if sid in part.stages:
+                _cache_update_stage(part, part.stages[sid], ops_list, deps_list, False, operator)
+            else:
+                _cache_add_stage(part, sid, ops_list, deps_list, False, operator)
         return f"✅ Stage {sid} added to part {pid}."
-    except mysql.connector.Error as e:
+    except DatabaseError as e:
         return f"❌ Database error: {e}"
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
+@instrumented
+@_part_locked
 def complete_stage(pid, order_id, sid):
     key = (pid, order_id)
-    if key not in parts:
-        return f"❌ Part {pid} (Order {order_id}) not found."
-    if sid not in parts[key].stages:
-        return f"❌ Stage {sid} not found in part {pid}."
+    with cache_lock:
+        if key not in parts:
+            return f"❌ Part {pid} (Order {order_id}) not found."
+        if sid not in parts[key].stages:
+            return f"❌ Stage {sid} not found in part {pid}."
 
-    stage = parts[key].stages[sid]
-    for dep in stage.deps:
-        if dep not in parts[key].stages or not parts[key].stages[dep].done:
-            return f"❌ Dependency {dep} not completed."
+        stage = parts[key].stages[sid]
+        for dep in stage.deps:
+            if dep not in parts[key].stages or not parts[key].stages[dep].done:
+                return f"❌ Dependency {dep} not completed."
+        queue = _write_behind
+
+    if queue is not None:
+        error = _queue_write(queue, {"op": "complete", "part_id": pid, "order_id": order_id,
+                                     "stage_id": sid, "completed_at": _timestamp()})
+        if error:
+            return error
+        with cache_lock:
+            stage = _cached_stage(key, sid)
+            if stage is not None:
+                _cache_update_stage(parts[key], stage, done=True)
+        return f"✅ Stage {sid} completed."
 
     conn = cursor = None
     try:
         conn = get_db_connection()
+        timed = _records_completion_times(conn)
         cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE stages SET done = TRUE
-            WHERE part_id = %s AND order_id = %s AND stage_id = %s
-        """, (pid, order_id, sid))
+        _mark_done(cursor, [(_timestamp(), pid, order_id, sid)], timed)
         conn.commit()
-        stage.done = True
+        with cache_lock:
+            stage = _cached_stage(key, sid)
+            if stage is not None:
+                _cache_update_stage(parts[key], stage, done=True)
         return f"✅ Stage {sid} completed."
-    except mysql.connector.Error as e:
+    except DatabaseError as e:
         return f"❌ Database error: {e}"
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
+@instrumented
+@_part_locked
 def remove_part(pid, order_id):
     key = (pid, order_id)
-    if key not in parts:
-        return f"❌ Part {pid} (Order {order_id}) not found."
+    with cache_lock:
+        if key not in parts:
+            return f"❌ Part {pid} (Order {order_id}) not found."
 
     conn = cursor = None
     try:
+        _settle_writes()
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("DELETE FROM parts WHERE part_id = %s AND order_id = %s", (pid, order_id))
         conn.commit()
-        del parts[key]
+        with cache_lock:
+            _cache_remove_part(key)
         return f"✅ Part {pid} (Order {order_id}) removed."
-    except mysql.connector.Error as e:
+    except DatabaseError as e:
         return f"❌ Database error: {e}"
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
+@instrumented
+@_part_locked
 def remove_stage(pid, order_id, sid):
     key = (pid, order_id)
-    if key not in parts or sid not in parts[key].stages:
-        return f"❌ Stage {sid} not found for part {pid}."
+    with cache_lock:
+        if _cached_stage(key, sid) is None:
+            return f"❌ Stage {sid} not found for part {pid}."
 
     conn = cursor = None
     try:
+        _settle_writes()
         conn = get_db_connection()
         cursor = conn.cursor()
         cursor.execute("""
             DELETE FROM stages WHERE part_id = %s AND order_id = %s AND stage_id = %s
         """, (pid, order_id, sid))
         conn.commit()
-        del parts[key].stages[sid]
+        with cache_lock:
+            if key in parts:
+                _cache_remove_stage(parts[key], sid)
         return f"✅ Stage {sid} removed from part {pid}."
-    except mysql.connector.Error as e:
+    except DatabaseError as e:
         return f"❌ Database error: {e}"
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
+@instrumented
+@_part_locked
 def update_stage(pid, order_id, sid, ops, deps):
     key = (pid, order_id)
-    if key not in parts or sid not in parts[key].stages:
-        return f"❌ Stage {sid} not found in part {pid}."
-
     ops_list = [o.strip() for o in ops.split(",") if o.strip()]
     deps_list = [d.strip() for d in deps.split(",") if d.strip()]
+    with cache_lock:
+        if _cached_stage(key, sid) is None:
+            return f"❌ Stage {sid} not found in part {pid}."
+        error = _check_dependencies(key, sid, deps_list)
+        if error:
+            return error
+        queue = _write_behind
+
+    if queue is not None:
+        error = _queue_write(queue, {"op": "update", "part_id": pid, "order_id": order_id, "stage_id": sid,
+                                     "operations": ",".join(ops_list), "dependencies": ",".join(deps_list)})
+        if error:
+            return error
+        with cache_lock:
+            stage = _cached_stage(key, sid)
+            if stage is not None:
+                _cache_update_stage(parts[key], stage, ops_list, deps_list)
+        return f"✅ Stage {sid} updated in part {pid}."
 
     conn = cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE stages SET operations = %s, dependencies = %s
-            WHERE part_id = %s AND order_id = %s AND stage_id = %s
-        """, (",".join(ops_list), ",".join(deps_list), pid, order_id, sid))
+        _delete_stage_lists(cursor, [(pid, order_id, sid)])
+        _insert_stage_lists(cursor, [(pid, order_id, sid, ops_list, deps_list)])
         conn.commit()
-        stage = parts[key].stages[sid]
-        stage.ops, stage.deps = ops_list, deps_list
+        with cache_lock:
+            stage = _cached_stage(key, sid)
+            if stage is not None:
+                _cache_update_stage(parts[key], stage, ops_list, deps_list)
         return f"✅ Stage {sid} updated in part {pid}."
-    except mysql.connector.Error as e:
+    except DatabaseError as e:
         return f"❌ Database error: {e}"
     finally:
         if cursor: cursor.close()
         if conn: conn.close()
 
-# ------------------ PDF functions ------------------
-def generate_part_dependency_pdf(key):
+# ------------------ Batch completion ------------------
+@instrumented
+def complete_stages(targets):
+    """Complete each (part_id, order_id, stage_id) in targets together with every
+    unfinished stage upstream of it.
+
+    The whole set is validated first, then written in dependency order in one
+    transaction and applied to the cache in one pass; if anything fails nothing
+    is completed. Like the single-stage edits it holds the parts' locks
+    throughout, but cache_lock only to check and to apply.
+    """
+    with part_locks((pid, order_id) for pid, order_id, _sid in targets):
+        with cache_lock:
+            by_part = {}
+            for pid, order_id, sid in targets:
+                key = (pid, order_id)
+                if key not in parts:
+                    return f"❌ Part {pid} (Order {order_id}) not found."
+                if sid not in parts[key].stages:
+                    return f"❌ Stage {sid} not found in part {pid}."
+                by_part.setdefault(key, []).append(sid)
+
+            plan = []
+            for key, sids in by_part.items():
+                order, problem = completion_order(parts[key].stages, sids)
+                if problem:
+                    return f"❌ Part {key[0]} (Order {key[1]}): {problem} Nothing was completed."
+                plan.extend((key, sid) for sid in order)
+            if not plan:
+                return "⚠ Those stages are already completed."
+
+        conn = cursor = None
+        try:
+            _settle_writes()
+            conn = get_db_connection()
+            timed = _records_completion_times(conn)
+            cursor = conn.cursor()
+            at = _timestamp()
+            _mark_done(cursor, [(at,) + key + (sid,) for key, sid in plan], timed)
+            conn.commit()
+        except DatabaseError as e:
+            if conn: conn.rollback()
+            return f"❌ Database error: {e}. Nothing was completed."
+        finally:
+            if cursor: cursor.close()
+            if conn: conn.close()
+
+        with cache_lock:
+            for key, sid in plan:
+                stage = _cached_stage(key, sid)
+                if stage is not None:
+                    _cache_update_stage(parts[key], stage, done=True)
+        return f"✅ {len(plan)} stages completed in {len(by_part)} part{'s' if len(by_part) != 1 else ''}."
+
+# Not under cache_lock: complete_stages takes part locks, which come first.
+def complete_part(pid, order_id):
+    key = (pid, order_id)
+    with cache_lock:
+        if key not in parts:
+            return f"❌ Part {pid} (Order {order_id}) not found."
+        targets = [(pid, order_id, sid) for sid in parts[key].stages]
+    return complete_stages(targets)
+
+def complete_order(order_id):
+    with cache_lock:
+        keys = part_index.keys_for_order(order_id)
+        if not keys:
+            return f"❌ Order {order_id} not found."
+        targets = [key + (sid,) for key in keys for sid in parts[key].stages]
+    return complete_stages(targets)
+
+# ------------------ Bulk import ------------------
+IMPORT_COLUMNS = ["part_id", "order_id", "stage_id", "operations", "dependencies",
+                  "done", "operator_first", "operator_last", "completed_at"]
+
+class ImportReport:
+    def __init__(self):
+        self.parts_added = 0
+        self.stages_added = 0
+        self.errors = []  # [(row_number, message), ...]
+        self.dependency_problems = 0  # of errors, found by validating the imported parts
+
+    def summary(self):
+        msg = f"✅ Imported {self.parts_added} parts and {self.stages_added} stages."
+        rejected = len(self.errors) - self.dependency_problems
+        if rejected:
+            msg += f"\n⚠ {rejected} rows rejected."
+        if self.dependency_problems:
+            msg += f"\n⚠ {self.dependency_problems} dependency problems in the imported parts."
+        return msg
+
+def _normalize_header(name):
+    return str(name or "").strip().lower().replace(" ", "_")
+
+def _parse_done(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y", "done", "✔")
+    return bool(value)
+
+def _parse_completed_at(value):
+    # "YYYY-MM-DD[ HH:MM[:SS]]" text or a datetime (from xlsx); None when blank.
+    if value is None or value == "":
+        return None
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.fromisoformat(str(value).strip())
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+def read_csv_records(path):
+    import csv
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [_normalize_header(h) for h in next(reader, [])]
+        for values in reader:
+            yield dict(zip(header, values))
+
+def read_xlsx_records(path):
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
     try:
-        from networkx.drawing.nx_agraph import graphviz_layout
-    except ImportError:
-        return "❌ Graphviz is not installed or not configured properly. Please install Graphviz and pygraphviz."
-
-    if key not in parts:
-        return f"❌ Part {key[0]} (Order {key[1]}) not found."
+        rows = wb.active.iter_rows(values_only=True)
+        header = [_normalize_header(h) for h in next(rows, [])]
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        wb.close()
+
+def _iter_import_records(source):
+    if isinstance(source, (str, os.PathLike)):
+        ext = os.path.splitext(str(source))[1].lower()
+        if ext == ".csv":
+            return read_csv_records(source)
+        if ext in (".xlsx", ".xlsm"):
+            return read_xlsx_records(source)
+        raise ValueError(f"Unsupported import file type: {ext or source}")
+    return ({_normalize_header(k): v for k, v in r.items()} if isinstance(r, dict)
+            else dict(zip(IMPORT_COLUMNS, r)) for r in source)
+
+def _insert_import_chunk(part_rows, stage_rows):
+    conn = cursor = None
+    try:
+        conn = get_db_connection()
+        timed = _records_completion_times(conn)
+        cursor = conn.cursor()
+        if part_rows:
+            cursor.executemany("INSERT INTO parts (part_id, order_id) VALUES (%s, %s)",
+                               [r[1:] for r in part_rows])
+        if stage_rows and timed:
+            cursor.executemany("""
+                INSERT INTO stages (part_id, order_id, stage_id, done, operator_first, operator_last, completed_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, [r[1:4] + r[6:] for r in stage_rows])
+        elif stage_rows:
+            cursor.executemany("""
+                INSERT INTO stages (part_id, order_id, stage_id, done, operator_first, operator_last)
+                VALUES (%s, %s, %s, %s, %s, %s)
+            """, [r[1:4] + r[6:9] for r in stage_rows])
+        if stage_rows:
+            _insert_stage_lists(cursor, [r[1:4] + (split_symbols(r[4]), split_symbols(r[5])) for r in stage_rows])
+        conn.commit()
+    except DatabaseError:
+        if conn: conn.rollback()
+        raise
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
 
-    part = parts[key]
-    if not part.stages:
-        return f"⚠ Part {key[0]} (Order {key[1]}) has no stages."
+def _insert_import_rows_one_by_one(part_rows, stage_rows, report):
+    # Fallback when a chunk fails: isolate the offending rows, keep the rest.
+    ok_parts, ok_stages, failed_parts = [], [], {}
+    for row in part_rows:
+        try:
+            _insert_import_chunk([row], [])
+            ok_parts.append(row)
+        except DatabaseError as e:
+            failed_parts[row[1:]] = row[0]
+            report.errors.append((row[0], f"Database error: {e}"))
+    for row in stage_rows:
+        if row[1:3] in failed_parts:
+            if failed_parts[row[1:3]] != row[0]:
+                report.errors.append((row[0], f"Part {row[1]} (Order {row[2]}) was not imported."))
+            continue
+        try:
+            _insert_import_chunk([], [row])
+            ok_stages.append(row)
+        except DatabaseError as e:
+            report.errors.append((row[0], f"Database error: {e}"))
+    return ok_parts, ok_stages
+
+def import_part_keys(source):
+    """(part_id, order_id) of every record in a CSV/XLSX import file, so a
+    script can load just those parts before bulk_import."""
+    keys = set()
+    for record in _iter_import_records(source):
+        key = (str(record.get("part_id") or "").strip(), str(record.get("order_id") or "").strip())
+        if all(key):
+            keys.add(key)
+    return sorted(keys)
+
+@instrumented(rows=lambda report: report.stages_added)
+@_locked
+def bulk_import(source, chunk_size=1000, create_parts=True):
+    """Import parts and stages from a CSV/XLSX path or an iterable of records.
+
+    Each record has part_id and order_id, plus stage_id, operations,
+    dependencies, done, operator names and, for done stages, an optional
+    completed_at for stage rows. Rows are validated
+    against the cache, written with executemany in one transaction per chunk,
+    and the cache is updated once at the end. Invalid rows are reported in the
+    returned ImportReport instead of aborting the batch, as are dangling
+    dependencies and cycles in the parts that received stages.
+    """
+    report = ImportReport()
+    try:
+        _settle_writes()
+    except DatabaseError as e:
+        report.errors.append((0, f"Database error: {e}"))
+        return report
+    new_parts = {}   # key -> Part, in insertion order
+    new_stages = {}  # (key, sid) -> row
+    pending_parts, pending_stages = [], []
+    committed_parts, committed_stages = [], []
+
+    def flush():
+        try:
+            _insert_import_chunk(pending_parts, pending_stages)
+            committed_parts.extend(pending_parts)
+            committed_stages.extend(pending_stages)
+        except DatabaseError:
+            ok_parts, ok_stages = _insert_import_rows_one_by_one(pending_parts, pending_stages, report)
+            committed_parts.extend(ok_parts)
+            committed_stages.extend(ok_stages)
+        pending_parts.clear()
+        pending_stages.clear()
+
+    for row_number, record in enumerate(_iter_import_records(source), start=1):
+        pid = str(record.get("part_id") or "").strip()
+        order_id = str(record.get("order_id") or "").strip()
+        sid = str(record.get("stage_id") or "").strip()
+        if not pid or not order_id:
+            report.errors.append((row_number, "Part ID and Order ID cannot be blank."))
+            continue
+        key = (pid, order_id)
+
+        if key not in parts and key not in new_parts:
+            if not sid or create_parts:
+                new_parts[key] = None
+                pending_parts.append((row_number, pid, order_id))
+            else:
+                report.errors.append((row_number, f"Part {pid} with order {order_id} not found."))
+                continue
+        elif not sid:
+            report.errors.append((row_number, f"Part {pid} with order {order_id} already exists."))
+            continue
 
-    G = nx.DiGraph()
-    for stage in part.stages.values():
-        G.add_node(stage.sid)
-        for dep in stage.deps:
-            G.add_edge(dep, stage.sid)
+        if sid:
+            if (key, sid) in new_stages or (key in parts and sid in parts[key].stages):
+                report.errors.append((row_number, f"Stage {sid} already exists for part {pid}."))
+                continue
+            ops_list = [o.strip() for o in str(record.get("operations") or "").split(",") if o.strip()]
+            deps_list = [d.strip() for d in str(record.get("dependencies") or "").split(",") if d.strip()]
+            done = _parse_done(record.get("done"))
+            try:
+                completed_at = _parse_completed_at(record.get("completed_at")) if done else None
+            except ValueError:
+                report.errors.append((row_number, f"Invalid completion time {record.get('completed_at')!r}."))
+                continue
+            row = (row_number, pid, order_id, sid, ",".join(ops_list), ",".join(deps_list), done,
+                   str(record.get("operator_first") or "").strip(),
+                   str(record.get("operator_last") or "").strip(),
+                   completed_at)
+            new_stages[(key, sid)] = row
+            pending_stages.append(row)
+
+        if len(pending_parts) + len(pending_stages) >= chunk_size:
+            flush()
+    flush()
+
+    # Single cache update for everything that made it into the database.
+    for _row_number, pid, order_id in committed_parts:
+        _cache_add_part(pid, order_id)
+    for _row_number, pid, order_id, sid, ops, deps, done, first, last, _completed_at in committed_stages:
+        part = parts.get((pid, order_id))
+        if part is None:  # part was already in the DB but not in this cache
+            part = _cache_add_part(pid, order_id)
+        _cache_add_stage(part, sid, split_symbols(ops), split_symbols(deps), done, intern_operator(first, last))
+    report.parts_added = len(committed_parts)
+    report.stages_added = len(committed_stages)
+
+    # Rows are only checked against what exists when they are read, so dangling
+    # dependencies and cycles are looked for once the parts are complete.
+    for key in dict.fromkeys(row[1:3] for row in committed_stages):
+        for sid, problem in validate_part(parts[key]):
+            row = new_stages.get((key, sid))
+            report.errors.append((row[0] if row else 0, f"Part {key[0]} (Order {key[1]}), stage {sid}: {problem}"))
+            report.dependency_problems += 1
+    report.errors.sort()
+    return report
+
+# ------------------ Exports ------------------
+EXPORT_KEY_CHUNK = 1000   # parts copied per lock acquisition
+
+def _cache_export_rows(order_id=None, status=None):
+    # Copy a few parts at a time so edits are never blocked for the whole export.
+    with cache_lock:
+        keys = _order_keys(order_id)
+    want_done = None if status is None else status == "done"
+    for start in range(0, len(keys), EXPORT_KEY_CHUNK):
+        with cache_lock:
+            rows = [(pid, oid, sid, ", ".join(stage.ops), ", ".join(stage.deps), stage.done)
+                    for pid, oid in keys[start:start + EXPORT_KEY_CHUNK] if (pid, oid) in parts
+                    for sid, stage in parts[(pid, oid)].stages.items()
+                    if want_done is None or stage.done == want_done]
+        yield from rows
+
+def _db_export_rows(order_id=None, status=None):
+    sql = "SELECT part_id, order_id, stage_id, done FROM stages"
+    where, params = [], []
+    if order_id is not None:
+        where.append("order_id = %s")
+        params.append(order_id)
+    if status is not None:
+        where.append("done = %s")
+        params.append(status == "done")
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY part_id, order_id, stage_id"
+    conn = cursor = lists_conn = lists_cursor = None
+    try:
+        _settle_writes()
+        conn = get_db_connection()
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(sql, params)
+        # The stage cursor is still streaming, so lists come through a second connection.
+        lists_conn = get_db_connection()
+        lists_cursor = lists_conn.cursor()
+        for rows in _fetch_batches(cursor, LOAD_BATCH_SIZE):
+            lists = _fetch_stage_list_range(lists_cursor, rows[0][:3], rows[-1][:3], order_id)
+            lists_conn.rollback()
+            for pid, oid, sid, done in rows:
+                ops, deps = lists.get((pid, oid, sid), ((), ()))
+                yield (pid, oid, sid, ", ".join(ops), ", ".join(deps), bool(done))
+    finally:
+        if lists_cursor: lists_cursor.close()
+        if lists_conn: lists_conn.close()
+        if cursor: cursor.close()
+        if conn: conn.close()
 
-    pos = graphviz_layout(G, prog="dot")
+@instrumented(rows=lambda count: count)
+def export_stages(path, fmt=None, source="cache", order_id=None, status=None, progress=None, cancel=None):
+    """Stream stage rows to an xlsx, csv or parquet file.
+
+    source is "cache" (what the window shows) or "db" (read straight from the
+    database without loading it into memory). status filters on "done" or
+    "pending". Raises ExportCancelled when cancelled.
+    """
+    if source == "cache":
+        rows = _cache_export_rows(order_id, status)
+        with cache_lock:
+            total = sum(len(parts[key].stages) for key in _order_keys(order_id))
+    else:
+        rows = _db_export_rows(order_id, status)
+        total = None
+    try:
+        return write_rows(path, rows, fmt, total=total, progress=progress, cancel=cancel)
+    finally:
+        rows.close()
+
+# ------------------ Operator analytics ------------------
+# Who has what assigned comes from the cache, reduced to counts of distinct
+# (operator, operations, done) triples a few parts at a time; completions over
+# time come from stages.completed_at. See operator_analytics.py.
+def _operator_triples(order_id=None):
+    with cache_lock:
+        keys = _order_keys(order_id)
+    triples = Counter()
+    for start in range(0, len(keys), EXPORT_KEY_CHUNK):
+        with cache_lock:
+            triples.update((stage.operator, stage.ops, stage.done)
+                           for key in keys[start:start + EXPORT_KEY_CHUNK] if key in parts
+                           for stage in parts[key].stages.values())
+    return triples
+
+@instrumented
+def operator_workload(order_id=None):
+    """OperatorWorkload (assigned/completed/pending and operation mix per
+    operator) over every stage, or over one order's."""
+    from operator_analytics import OperatorWorkload
+    return OperatorWorkload(_operator_triples(order_id))
+
+@instrumented
+def operator_throughput(days=30, period="day", order_id=None, until=None):
+    """Throughput (completed stages per operator per day, week or month) over
+    the `days` days ending on until (default today). Raises DatabaseError."""
+    from operator_analytics import Throughput
+    until = until or datetime.date.today()
+    since = until - datetime.timedelta(days=days - 1)
+    return Throughput(db_completions_by_day(since, until, order_id), since, until, period)
+
+OPERATOR_REPORT_PERIODS = 6   # throughput columns that fit across an A4 page
+
+@instrumented
+def generate_operator_report(filename="operator_workload_report.pdf", order_id=None, days=30, period="week"):
+    """Operator workload, operation mix and throughput as a PDF, or as an Excel
+    workbook when filename ends in .xlsx."""
+    workload = operator_workload(order_id)
+    if not workload.total_stages:
+        return "⚠ No stages to report on."
+    try:
+        throughput = operator_throughput(days, period, order_id)
+    except (DatabaseError, ValueError) as e:
+        return f"❌ {e}"
+    per_day = throughput.per_day()
+    loads = [[load.operator, load.assigned, load.completed, load.pending, load.percent,
+              per_day.get(load.operator, 0.0)] for load in workload.loads()]
+    load_headers = ["Operator", "Assigned", "Completed", "Pending", "% Done", f"Done/Day ({days} d)"]
+    overloaded = workload.overloaded()
+    note = (f"Overloaded (pending above 1.5× the average): {', '.join(overloaded)}" if overloaded
+            else "No operator has more than 1.5× the average pending work.")
+
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        mix = {(operator, op): [n, 0] for operator, op, n in workload.operation_mix(pending_only=True)}
+        for operator, op, n in workload.operation_mix():
+            counts = mix.setdefault((operator, op), [0, 0])
+            counts[1] = n - counts[0]
+        write_sheets(filename, [
+            ("Workload", load_headers, loads),
+            ("Operation Mix", ["Operator", "Operation", "Pending", "Completed"],
+             [[operator, op, pending, completed] for (operator, op), (pending, completed) in sorted(mix.items())]),
+            (f"Throughput by {period}", ["Operator"] + throughput.labels() + ["Total"],
+             [[operator] + counts + [total] for operator, counts, total in throughput.rows()]),
+        ])
+        return f"✅ Excel file created: {filename}"
+
+    labels = throughput.labels()[-OPERATOR_REPORT_PERIODS:]
+    _build_sections_pdf(filename, "Operator Workload Report", [
+        (None, note),
+        ("Workload", [load_headers] + [[str(v) for v in row[:4]] + [f"{row[4]}%", str(row[5])] for row in loads]),
+        ("Pending Operations", [["Operator", "Operation", "Pending Stages"]]
+         + [[operator, op, str(n)] for operator, op, n in sorted(workload.operation_mix(pending_only=True))]),
+        (f"Completed Stages by {period.capitalize()}", [["Operator"] + labels + ["Total"]]
+         + [[operator] + [str(n) for n in counts[-len(labels):]] + [str(total)]
+            for operator, counts, total in throughput.rows()]),
+    ])
+    return f"✅ PDF generated: {filename}"
 
-    plt.figure(figsize=(6, 4))
-    nx.draw(
-        G, pos,
-        with_labels=True,
-        node_color='lightblue',
-        edge_color='gray',
-        node_size=2000,
-        font_size=10,
-        arrowsize=20
-    )
+# ------------------ PDF functions ------------------
+layout_cache = LayoutCache()
+
+def _snapshot_graphs(keys):
+    # {key: signature} plus the distinct graphs, copied under the lock.
+    with cache_lock:
+        signatures, graphs = {}, {}
+        for key in keys:
+            part = parts.get(key)
+            if part is None or not part.stages:
+                continue
+            sig, edges = graph_signature((stage.sid, stage.deps) for stage in part.stages.values())
+            signatures[key] = sig
+            graphs[sig] = edges
+    return signatures, graphs
 
-    img_path = f"{key[0]}_{key[1]}_dependency_graph.png"
-    plt.savefig(img_path, bbox_inches='tight')
-    plt.close()
+@instrumented
+def generate_part_dependency_pdf(key):
+    with cache_lock:
+        if key not in parts:
+            return f"❌ Part {key[0]} (Order {key[1]}) not found."
+        if not parts[key].stages:
+            return f"⚠ Part {key[0]} (Order {key[1]}) has no stages."
+    signatures, graphs = _snapshot_graphs([key])
+    images = render_graphs(graphs, layout_cache, workers=1)
 
     pdf_path = f"{key[0]}_{key[1]}_dependency_graph.pdf"
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4)
-    elements = [Image(img_path, width=400, height=300), Spacer(1, 12)]
-    doc.build(elements)
-    os.remove(img_path)
+    write_graph_pages(pdf_path, [(f"Part {key[0]} (Order {key[1]})", images[signatures[key]])])
     return f"✅ Dependency graph PDF created: {pdf_path}"
 
 
-def generate_completed_parts_pdf():
-    pdf_filename = "completed_parts_report.pdf"
-    doc = SimpleDocTemplate(pdf_filename, pagesize=A4)
-    styles = getSampleStyleSheet()
-    content = [Paragraph("Completed Parts Report", styles['Heading1']), Spacer(1, 12)]
+@instrumented
+def generate_dependency_pdfs(order_id=None, keys=None, output=None, separate=False,
+                             workers=None, progress=None, cancel=None):
+    """Dependency graphs for many parts, rendered across a process pool.
+
+    Covers keys, or every part of order_id, or every part. Writes one
+    multi-page PDF (output, default "<order>_dependency_graphs.pdf"), or with
+    separate=True one "<part>_<order>_dependency_graph.pdf" per part in the
+    output directory.
+    """
+    if keys is None:
+        with cache_lock:
+            keys = _order_keys(order_id)
+    keys = sorted(keys)
+    signatures, graphs = _snapshot_graphs(keys)
+    if not signatures:
+        return "⚠ No parts with stages to draw."
+    try:
+        images = render_graphs(graphs, layout_cache, workers, progress, cancel)
+    except RenderCancelled:
+        return "⚠ Report cancelled."
+
+    pages = [(key, images[signatures[key]]) for key in keys if key in signatures]
+    if separate:
+        directory = output or "."
+        os.makedirs(directory, exist_ok=True)
+        for (pid, oid), png in pages:
+            write_graph_pages(os.path.join(directory, f"{pid}_{oid}_dependency_graph.pdf"),
+                              [(f"Part {pid} (Order {oid})", png)])
+        return f"✅ {len(pages)} dependency graph PDFs created in {directory}"
+    pdf_path = output or f"{order_id or 'all'}_dependency_graphs.pdf"
+    write_graph_pages(pdf_path, [(f"Part {pid} (Order {oid})", png) for (pid, oid), png in pages])
+    return f"✅ Dependency graph PDF created: {pdf_path} ({len(pages)} parts, {len(graphs)} distinct graphs)"
+
+
+@instrumented
+def generate_completed_parts_pdf(progress=None, cancel=None, pdf_filename="completed_parts_report.pdf"):
     data = [["Part ID", "Order ID", "Completed Stages"]]
-    for (pid, order_id), p in parts.items():
-        if p.stages and all(s.done for s in p.stages.values()):
-            data.append([pid, order_id, ", ".join(s.sid for s in p.stages.values())])
-    if len(data) == 1:
-        data.append(["-", "-", "-"])
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.grey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('GRID', (0,0), (-1,-1), 1, colors.black)
-    ]))
-    content.append(table)
-    doc.build(content)
+    try:
+        with cache_lock:
+            completed = sorted(part_index.complete_parts())
+            total = len(completed)
+            for i, (pid, order_id) in enumerate(completed, start=1):
+                data.append([pid, order_id, ", ".join(parts[(pid, order_id)].stages)])
+                if i % 1000 == 0:
+                    _check_cancel(cancel)
+                    if progress:
+                        progress(i, total)
+        _check_cancel(cancel)
+    except OperationCancelled:
+        return "⚠ Report cancelled."
+    _build_table_pdf(pdf_filename, "Completed Parts Report", data)
     return f"✅ PDF generated: {pdf_filename}"
 
 
-def generate_multiple_orders_report():
-    pdf_filename = "multiple_orders_report.pdf"
-    doc = SimpleDocTemplate(pdf_filename, pagesize=A4)
-    styles = getSampleStyleSheet()
-    content = [Paragraph("Multiple Orders Report", styles['Heading1']), Spacer(1, 12)]
-    order_counts = {}
-    for (pid, _order_id), _part in parts.items():
-        order_counts[pid] = order_counts.get(pid, 0) + 1
+@instrumented
+def generate_multiple_orders_report(progress=None, cancel=None, pdf_filename="multiple_orders_report.pdf"):
+    with cache_lock:
+        order_counts = part_index.multi_order_parts()
+    if cancel is not None and cancel.is_set():
+        return "⚠ Report cancelled."
     data = [["Part ID", "Order Count"]]
-    for pid, count in order_counts.items():
-        if count > 1:
-            data.append([pid, str(count)])
-    if len(data) == 1:
-        data.append(["-", "-"])
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.grey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('GRID', (0,0), (-1,-1), 1, colors.black)
-    ]))
-    content.append(table)
-    doc.build(content)
+    for pid, count in sorted(order_counts.items()):
+        data.append([pid, str(count)])
+    _build_table_pdf(pdf_filename, "Multiple Orders Report", data)
     return f"✅ PDF generated: {pdf_filename}"
 
-# ------------------ GUI ------------------
-class Ui_MainWindow(object):
-    def setupUi(self, MainWindow):
-        MainWindow.setObjectName("MainWindow")
-        MainWindow.resize(800, 600)
-
-        self.centralwidget = QtWidgets.QWidget(MainWindow)
-
-        # ---- Main Layout ----
-        mainLayout = QtWidgets.QVBoxLayout(self.centralwidget)
-
-        # ---- Part Info ----
-        partBox = QtWidgets.QGroupBox("Part Info")
-        partLayout = QtWidgets.QHBoxLayout(partBox)
-        partLayout.addWidget(QtWidgets.QLabel("Part ID:"))
-        self.partInput = QtWidgets.QLineEdit()
-        partLayout.addWidget(self.partInput)
-        partLayout.addWidget(QtWidgets.QLabel("Order ID:"))
-        self.orderInput = QtWidgets.QLineEdit()
-        partLayout.addWidget(self.orderInput)
-        mainLayout.addWidget(partBox)
-
-        # ---- Stage Info ----
-        stageBox = QtWidgets.QGroupBox("Stage Info")
-        stageLayout = QtWidgets.QGridLayout(stageBox)
-        stageLayout.addWidget(QtWidgets.QLabel("Stage ID:"), 0, 0)
-        self.stageInput = QtWidgets.QLineEdit()
-        stageLayout.addWidget(self.stageInput, 0, 1)
-        stageLayout.addWidget(QtWidgets.QLabel("Operations:"), 0, 2)
-        self.opsInput = QtWidgets.QLineEdit()
-        stageLayout.addWidget(self.opsInput, 0, 3)
-        stageLayout.addWidget(QtWidgets.QLabel("Dependencies:"), 1, 0)
-        self.depsInput = QtWidgets.QLineEdit()
-        stageLayout.addWidget(self.depsInput, 1, 1, 1, 3)
-        mainLayout.addWidget(stageBox)
-
-        # ---- Operator Info ----
-        operatorBox = QtWidgets.QGroupBox("Operator Info")
-        operatorLayout = QtWidgets.QHBoxLayout(operatorBox)
-        operatorLayout.addWidget(QtWidgets.QLabel("First Name:"))
-        self.firstNameInput = QtWidgets.QLineEdit()
-        operatorLayout.addWidget(self.firstNameInput)
-        operatorLayout.addWidget(QtWidgets.QLabel("Last Name:"))
-        self.lastNameInput = QtWidgets.QLineEdit()
-        operatorLayout.addWidget(self.lastNameInput)
-        mainLayout.addWidget(operatorBox)
-
-        # ---- Action Buttons ----
-        buttonLayout = QtWidgets.QGridLayout()
-        self.addPartBtn = QtWidgets.QPushButton("Add Part")
-        self.addStageBtn = QtWidgets.QPushButton("Add Stage")
-        self.completeStageBtn = QtWidgets.QPushButton("Complete Stage")
-        self.listPartsBtn = QtWidgets.QPushButton("List Parts")
-        buttonLayout.addWidget(self.addPartBtn, 0, 0)
-        buttonLayout.addWidget(self.addStageBtn, 0, 1)
-        buttonLayout.addWidget(self.completeStageBtn, 0, 2)
-        buttonLayout.addWidget(self.listPartsBtn, 0, 3)
-        mainLayout.addLayout(buttonLayout)
-
-        # ---- PDF Buttons ----
-        pdfLayout = QtWidgets.QHBoxLayout()
-        self.depPdfBtn = QtWidgets.QPushButton("Part Dependency PDF")
-        self.completedPdfBtn = QtWidgets.QPushButton("Completed Parts Report")
-        self.multiPdfBtn = QtWidgets.QPushButton("Multiple Orders Report")
-        pdfLayout.addWidget(self.depPdfBtn)
-        pdfLayout.addWidget(self.completedPdfBtn)
-        pdfLayout.addWidget(self.multiPdfBtn)
-        mainLayout.addLayout(pdfLayout)
-
-        # ---- Remove/Update Buttons ----
-        crudLayout = QtWidgets.QHBoxLayout()
-        self.removePartBtn = QtWidgets.QPushButton("Remove Part")
-        self.removeStageBtn = QtWidgets.QPushButton("Remove Stage")
-        self.updateStageBtn = QtWidgets.QPushButton("Update Stage")
-        crudLayout.addWidget(self.removePartBtn)
-        crudLayout.addWidget(self.removeStageBtn)
-        crudLayout.addWidget(self.updateStageBtn)
-        mainLayout.addLayout(crudLayout)
-
-        # ---- Excel Report Button (hidden at first) ----
-        self.excelBtn = QtWidgets.QPushButton("Generate Excel Report")
-        self.excelBtn.setVisible(False)  # hidden until list is clicked
-        self.excelBtn.setFixedWidth(self.excelBtn.sizeHint().width() + 20)  # make it compact
-
-        # Apply a "bulging" style
-        self.excelBtn.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;   /* green */
-                color: white;
-                font-weight: bold;
-                border-radius: 12px;
-                padding: 6px 5px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;   /* darker green */
-            }
-            QPushButton:pressed {
-                background-color: #3e8e41;   /* even darker when clicked */
-            }
-        """)
-
-        mainLayout.addWidget(self.excelBtn)
-
-        # ---- Table for displaying parts ----
-        self.partsTable = QtWidgets.QTableWidget()
-        self.partsTable.setColumnCount(6)
-        self.partsTable.setHorizontalHeaderLabels(
-            ["Part ID", "Order ID", "Stage ID", "Operations", "Dependencies", "Done"]
-        )
-        mainLayout.addWidget(self.partsTable)
-
-        MainWindow.setCentralWidget(self.centralwidget)
-        MainWindow.setWindowTitle("Production Manager")
-
-# ------------------ Application ------------------
-class MyApp(QtWidgets.QMainWindow, Ui_MainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setupUi(self)
-
-        self.addPartBtn.clicked.connect(self.handle_add_part)
-        self.addStageBtn.clicked.connect(self.handle_add_stage)
-        self.completeStageBtn.clicked.connect(self.handle_complete_stage)
-        self.listPartsBtn.clicked.connect(self.handle_list_parts)
-        self.depPdfBtn.clicked.connect(self.handle_dep_pdf)
-        self.completedPdfBtn.clicked.connect(self.handle_completed_pdf)
-        self.multiPdfBtn.clicked.connect(self.handle_multi_pdf)
-        self.removePartBtn.clicked.connect(self.handle_remove_part)
-        self.removeStageBtn.clicked.connect(self.handle_remove_stage)
-        self.updateStageBtn.clicked.connect(self.handle_update_stage)
-
-    def handle_add_part(self):
-        msg = add_part(self.partInput.text().strip(), self.orderInput.text().strip())
-        QtWidgets.QMessageBox.information(self, "Add Part", msg)
-
-    def handle_add_stage(self):
-        pid = self.partInput.text().strip()
-        order_id = self.orderInput.text().strip()
-        sid = self.stageInput.text().strip()
-        ops = self.opsInput.text().strip()
-        deps = self.depsInput.text().strip()
-        operator_first = self.firstNameInput.text().strip()
-        operator_last = self.lastNameInput.text().strip()
-
-        msg = add_stage(pid, order_id, sid, ops, deps, operator_first, operator_last)
-        QtWidgets.QMessageBox.information(self, "Add Stage", msg)
-
-    def handle_complete_stage(self):
-        msg = complete_stage(
-            self.partInput.text().strip(),
-            self.orderInput.text().strip(),
-            self.stageInput.text().strip()
-        )
-        QtWidgets.QMessageBox.information(self, "Complete Stage", msg)
-
-    def handle_list_parts(self):
-    # If too many parts, export directly to Excel
-        if len(parts) > 100:
-            filename = generate_excel_report()
-            QtWidgets.QMessageBox.warning(self, "Too Many Parts",
-                f"There are more than 100 parts.\n"
-                f"Data was exported to {filename} instead of showing in the table.")
-            return
 
-        # Show Excel button
-        self.excelBtn.setVisible(True)
-        self.excelBtn.clicked.disconnect() if self.excelBtn.receivers(self.excelBtn.clicked) > 0 else None
-        self.excelBtn.clicked.connect(lambda: QtWidgets.QMessageBox.information(
-            self, "Excel Report", f"✅ Excel file created: {generate_excel_report()}"))
-
-        # Fill the table
-        self.partsTable.setRowCount(0)
-        row = 0
-        for (pid, order_id), p in parts.items():
-            for sid, stage in p.stages.items():
-                self.partsTable.insertRow(row)
-                self.partsTable.setItem(row, 0, QtWidgets.QTableWidgetItem(pid))
-                self.partsTable.setItem(row, 1, QtWidgets.QTableWidgetItem(order_id))
-                self.partsTable.setItem(row, 2, QtWidgets.QTableWidgetItem(sid))
-                self.partsTable.setItem(row, 3, QtWidgets.QTableWidgetItem(", ".join(stage.ops)))
-                self.partsTable.setItem(row, 4, QtWidgets.QTableWidgetItem(", ".join(stage.deps)))
-                self.partsTable.setItem(row, 5, QtWidgets.QTableWidgetItem("✔" if stage.done else "✘"))
-                row += 1
-
-        if row == 0:
-            QtWidgets.QMessageBox.information(self, "Parts", "⚠ No parts available.")
-
-    def handle_dep_pdf(self):
-        msg = generate_part_dependency_pdf((self.partInput.text().strip(), self.orderInput.text().strip()))
-        QtWidgets.QMessageBox.information(self, "PDF", msg)
-
-    def handle_completed_pdf(self):
-        msg = generate_completed_parts_pdf()
-        QtWidgets.QMessageBox.information(self, "PDF", msg)
-
-    def handle_multi_pdf(self):
-        msg = generate_multiple_orders_report()
-        QtWidgets.QMessageBox.information(self, "PDF", msg)
-
-    def handle_remove_part(self):
-        pid, order_id = self.partInput.text().strip(), self.orderInput.text().strip()
-        reply = QtWidgets.QMessageBox.question(self, "Confirm",
-            f"Delete part {pid} (Order {order_id}) and all its stages?",
-            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
-        if reply == QtWidgets.QMessageBox.Yes:
-            msg = remove_part(pid, order_id)
-            QtWidgets.QMessageBox.information(self, "Remove Part", msg)
-
-    def handle_remove_stage(self):
-        pid, order_id, sid = self.partInput.text().strip(), self.orderInput.text().strip(), self.stageInput.text().strip()
-        reply = QtWidgets.QMessageBox.question(self, "Confirm",
-            f"Delete stage {sid} from part {pid} (Order {order_id})?",
-            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
-        if reply == QtWidgets.QMessageBox.Yes:
-            msg = remove_stage(pid, order_id, sid)
-            QtWidgets.QMessageBox.information(self, "Remove Stage", msg)
-
-    def handle_update_stage(self):
-        msg = update_stage(
-            self.partInput.text().strip(),
-            self.orderInput.text().strip(),
-            self.stageInput.text().strip(),
-            self.opsInput.text().strip(),
-            self.depsInput.text().strip()
-        )
-        QtWidgets.QMessageBox.information(self, "Update Stage", msg)
+def _build_table_pdf(pdf_filename, title, data):
+    _build_sections_pdf(pdf_filename, title, [(None, data)])
+
+def _build_sections_pdf(pdf_filename, title, sections):
+    # sections: [(heading or None, table rows with a header row, or a paragraph of text)]
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    doc = SimpleDocTemplate(pdf_filename, pagesize=A4)
+    styles = getSampleStyleSheet()
+    content = [Paragraph(title, styles['Heading1']), Spacer(1, 12)]
+    for heading, data in sections:
+        if heading:
+            content.append(Paragraph(heading, styles['Heading2']))
+        if isinstance(data, str):
+            content += [Paragraph(data, styles['Normal']), Spacer(1, 12)]
+            continue
+        if len(data) == 1:
+            data.append(["-"] * len(data[0]))
+        table = Table(data, repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.grey),
+            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+            ('GRID', (0,0), (-1,-1), 1, colors.black)
+        ]))
+        content += [table, Spacer(1, 12)]
+    doc.build(content)
 
 # -------------- Excel generator function ---------------
-def generate_excel_report(filename="parts_report.xlsx"):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Parts Report"
-
-    headers = ["Part ID", "Order ID", "Stage ID", "Operations", "Dependencies", "Done"]
-    ws.append(headers)
-
-    for (pid, order_id), p in parts.items():
-        for sid, stage in p.stages.items():
-            ws.append([
-                pid,
-                order_id,
-                sid,
-                ", ".join(stage.ops),
-                ", ".join(stage.deps),
-                "✔" if stage.done else "✘"
-            ])
-
-    wb.save(filename)
+@instrumented
+def generate_excel_report(filename="parts_report.xlsx", progress=None, cancel=None):
+    try:
+        export_stages(filename, "xlsx", progress=progress, cancel=cancel)
+    except ExportCancelled:
+        return None
     return filename
 
 # ------------------ Run ------------------
+# Heavy libraries (Qt, numpy, reportlab, matplotlib, networkx, openpyxl) are
+# imported only by the functions that need them, so scripts that use this
+# module without a window start quickly. The window lives in gui.py; the
+# names below still resolve from here for existing callers.
+_GUI_NAMES = {"TABLE_HEADERS", "PartsTableModel", "PartsFilterProxyModel",
+              "TaskSignals", "Task", "Ui_MainWindow", "MyApp"}
+
+def __getattr__(name):
+    if name == "schedule_engine":
+        return _get_schedule_engine()
+    if name in _GUI_NAMES:
+        import gui
+        return getattr(gui, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == "__main__":
-    load_from_db()
-    app = QtWidgets.QApplication(sys.argv)
-    window = MyApp()
-    window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    from gui import main
+    sys.exit(main())
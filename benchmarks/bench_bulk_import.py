@@ -0,0 +1,55 @@
+"""Per-row add_part/add_stage versus bulk_import on an SQLite file database.
+
+    python benchmarks/bench_bulk_import.py --stages 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Project
+from database import SQLiteBackend
+from workload import make_records
+
+
+def fresh_db(directory, name):
+    Project.configure_database(SQLiteBackend(os.path.join(directory, name)))
+    Project.load_from_db()  # empties the cache and its indexes
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--stages", type=int, default=100_000)
+    ap.add_argument("--stages-per-part", type=int, default=20)
+    ap.add_argument("--per-row-sample", type=int, default=5_000,
+                    help="rows timed on the per-row path; the rate is extrapolated")
+    ap.add_argument("--chunk-size", type=int, default=1000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fresh_db(tmp, "per_row.db")
+        sample = min(args.per_row_sample, args.stages)
+        start = time.perf_counter()
+        for r in make_records(sample, args.stages_per_part):
+            if (r["part_id"], r["order_id"]) not in Project.parts:
+                Project.add_part(r["part_id"], r["order_id"])
+            Project.add_stage(r["part_id"], r["order_id"], r["stage_id"], r["operations"], r["dependencies"])
+        per_row = (time.perf_counter() - start) / sample
+
+        fresh_db(tmp, "bulk.db")
+        start = time.perf_counter()
+        report = Project.bulk_import(make_records(args.stages, args.stages_per_part),
+                                     chunk_size=args.chunk_size)
+        bulk = time.perf_counter() - start
+
+    print(f"per-row : {per_row * 1e6:9.1f} us/stage  (~{per_row * args.stages:.1f}s for {args.stages} stages)")
+    print(f"bulk    : {bulk / args.stages * 1e6:9.1f} us/stage  ({bulk:.2f}s, "
+          f"{report.parts_added} parts, {report.stages_added} stages, {len(report.errors)} errors)")
+    print(f"speedup : {per_row * args.stages / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
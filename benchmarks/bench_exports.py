@@ -0,0 +1,81 @@
+"""Legacy in-memory Excel report versus the streaming exporters.
+
+    python benchmarks/bench_exports.py --stages 200000 [--memory]
+
+--memory reports peak allocations through tracemalloc, which makes openpyxl
+many times slower; time and memory are best measured in separate runs.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Project
+from database import SQLiteBackend
+from workload import make_records
+
+
+def legacy_excel_report(filename):
+    # The report as it was before streaming: all rows and cells in memory at once.
+    from openpyxl import Workbook
+    with Project.cache_lock:
+        rows = [(pid, order_id, sid, stage.ops, stage.deps, stage.done)
+                for (pid, order_id), p in Project.parts.items() for sid, stage in p.stages.items()]
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Parts Report"
+    ws.append(["Part ID", "Order ID", "Stage ID", "Operations", "Dependencies", "Done"])
+    for pid, order_id, sid, ops, deps, done in rows:
+        ws.append([pid, order_id, sid, ", ".join(ops), ", ".join(deps), "✔" if done else "✘"])
+    wb.save(filename)
+
+
+def measure(trace_memory, fn, *args, **kwargs):
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--stages", type=int, default=200_000)
+    ap.add_argument("--stages-per-part", type=int, default=20)
+    ap.add_argument("--memory", action="store_true", help="trace peak memory instead of just timing")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Project.configure_database(SQLiteBackend(os.path.join(tmp, "bench.db")))
+        Project.bulk_import(make_records(args.stages, args.stages_per_part))
+
+        runs = [("legacy xlsx", legacy_excel_report, (os.path.join(tmp, "legacy.xlsx"),), {})]
+        for fmt in ("xlsx", "csv", "parquet"):
+            for source in ("cache", "db"):
+                path = os.path.join(tmp, f"{source}.{fmt}")
+                runs.append((f"{fmt} ({source})", Project.export_stages, (path,), {"source": source}))
+
+        for name, fn, fn_args, fn_kwargs in runs:
+            try:
+                elapsed, peak = measure(args.memory, fn, *fn_args, **fn_kwargs)
+            except ImportError as e:
+                print(f"{name:16}: skipped ({e})")
+                continue
+            size = os.path.getsize(fn_args[0])
+            line = f"{name:16}: {elapsed:6.2f}s  {args.stages / elapsed:9.0f} rows/s  file {size / 2**20:6.1f} MiB"
+            if peak is not None:
+                line += f"  peak {peak / 2**20:7.1f} MiB"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
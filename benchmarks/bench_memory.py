@@ -0,0 +1,91 @@
+"""Resident size of the in-memory model per million stages, before and after slots/interning.
+
+    python benchmarks/bench_memory.py --stages 1000000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Project
+
+OPERATIONS = ["drill", "deburr", "mill", "turn", "grind", "paint", "inspect", "pack"]
+
+
+class LegacyStage:
+    def __init__(self, sid, ops=None, deps=None, done=False):
+        self.sid = sid
+        self.ops = ops or []
+        self.deps = deps or []
+        self.done = done
+
+
+class LegacyPart:
+    def __init__(self, pid, order_id):
+        self.pid = pid
+        self.order_id = order_id
+        self.stages = {}
+
+
+def rows(n_stages, stages_per_part):
+    # Fresh string objects per row, the way a DB cursor hands them out.
+    for i in range(n_stages):
+        part, stage = divmod(i, stages_per_part)
+        ops = ",".join(OPERATIONS[(stage + k) % len(OPERATIONS)] for k in range(1 + stage % 3))
+        deps = f"S{stage - 1:03d}" if stage else ""
+        yield "".join(["P", str(part)]), "".join(["O", str(part % 200)]), f"S{stage:03d}", ops, deps
+
+
+def build_legacy(n_stages, stages_per_part):
+    parts = {}
+    for pid, order_id, sid, ops, deps in rows(n_stages, stages_per_part):
+        key = (pid, order_id)
+        if key not in parts:
+            parts[key] = LegacyPart(pid, order_id)
+        parts[key].stages[sid] = LegacyStage(sid, ops.split(",") if ops else [],
+                                             deps.split(",") if deps else [], False)
+    return parts
+
+
+def build_current(n_stages, stages_per_part):
+    Project.clear_symbols()
+    parts = {}
+    for pid, order_id, sid, ops, deps in rows(n_stages, stages_per_part):
+        part = parts.get((pid, order_id))
+        if part is None:
+            part = Project.Part(pid, order_id)
+            parts[(part.pid, part.order_id)] = part
+        stage = Project.Stage(sid, Project.split_symbols(ops), Project.split_symbols(deps), False)
+        part.stages[stage.sid] = stage
+    return parts
+
+
+def measure(builder, n_stages, stages_per_part):
+    gc.collect()
+    tracemalloc.start()
+    model = builder(n_stages, stages_per_part)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del model
+    return size
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--stages", type=int, default=1_000_000)
+    ap.add_argument("--stages-per-part", type=int, default=20)
+    args = ap.parse_args()
+
+    scale = 1_000_000 / args.stages
+    legacy = measure(build_legacy, args.stages, args.stages_per_part) * scale
+    current = measure(build_current, args.stages, args.stages_per_part) * scale
+    print(f"legacy  : {legacy / 2**20:8.1f} MiB per million stages")
+    print(f"current : {current / 2**20:8.1f} MiB per million stages")
+    print(f"saving  : {(1 - current / legacy) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
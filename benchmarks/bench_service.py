@@ -0,0 +1,168 @@
+"""Many shop-floor terminals against one service.py process, on SQLite.
+
+    python benchmarks/bench_service.py --stages 100000 --clients 50 --duration 20
+
+Each simulated terminal keeps one connection open and loops: list the ready
+stages of an order, complete one of them, and now and then look at a part or
+at the order's progress. Reports requests per second, latency percentiles
+per request type and error counts, then stops the service and checks that
+the database holds exactly the completions the service acknowledged.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import Project
+from database import SQLiteBackend
+from workload import make_records
+
+
+class Terminal:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def terminal(host, port, orders, deadline, rng, stats):
+    t = Terminal(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            order_id = rng.choice(orders)
+            status, body = await timed(stats, "GET /ready", t.request("GET", f"/ready?order={order_id}"))
+            if status != 200 or not body["stages"]:
+                continue
+            pid, oid, sid = rng.choice(body["stages"])
+            status, _ = await timed(stats, "POST complete", t.request("POST", f"/parts/{pid}/{oid}/stages/{sid}/complete"))
+            if status == 200:
+                stats["completed"].add((pid, oid, sid))   # completing a done stage also succeeds
+            r = rng.random()
+            if r < 0.2:
+                await timed(stats, "GET part", t.request("GET", f"/parts/{pid}/{oid}"))
+            elif r < 0.3:
+                await timed(stats, "GET /progress", t.request("GET", f"/progress?order={oid}"))
+    finally:
+        t.close()
+
+
+async def timed(stats, name, request):
+    start = time.perf_counter()
+    status, body = await request
+    stats[name].append(time.perf_counter() - start)
+    if status == 409:
+        stats["conflicts"].append(name)   # another terminal got there first
+    elif status != 200:
+        stats["errors"].append(f"{name}: {status} {body.get('message')}")
+    return status, body
+
+
+async def run_clients(host, port, orders, clients, duration, seed):
+    stats = defaultdict(list)
+    stats["completed"] = set()
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(terminal(host, port, orders, deadline, random.Random(seed + i), stats)
+                           for i in range(clients)))
+    return stats, time.perf_counter() - start
+
+
+def start_service(db_path, workers, write_behind):
+    cmd = [sys.executable, os.path.join(ROOT, "service.py"), "--sqlite", db_path, "--port", "0",
+           "--workers", str(workers)]
+    if write_behind:
+        cmd.append("--write-behind")
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True, cwd=os.path.dirname(db_path))
+    line = proc.stdout.readline()
+    if not line.startswith("Serving on"):
+        proc.kill()
+        raise SystemExit(f"service did not start: {line!r}")
+    host, port = line.split("//")[1].strip().rsplit(":", 1)
+    return proc, host, int(port)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--stages", type=int, default=100_000)
+    ap.add_argument("--clients", type=int, default=50)
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds")
+    ap.add_argument("--workers", type=int, default=8, help="service worker threads")
+    ap.add_argument("--write-behind", action="store_true")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        Project.configure_database(SQLiteBackend(db_path))
+        Project.load_from_db()
+        Project.bulk_import(make_records(args.stages, 20))
+        orders = sorted(Project.order_progress())
+        done_before = sum(p.done_stages for p in Project.order_progress().values())
+        Project.close_database()
+
+        proc, host, port = start_service(db_path, args.workers, args.write_behind)
+        try:
+            stats, elapsed = asyncio.run(run_clients(host, port, orders, args.clients, args.duration, args.seed))
+        finally:
+            proc.terminate()
+            proc.wait(60)
+
+        total = 0
+        print(f"{args.clients} terminals, {args.stages} stages, {elapsed:.1f} s")
+        for name in ("GET /ready", "POST complete", "GET part", "GET /progress"):
+            times = sorted(stats[name])
+            if not times:
+                continue
+            total += len(times)
+            pct = lambda q: times[min(len(times) - 1, int(len(times) * q))] * 1000
+            print(f"  {name:14} {len(times):7} calls  p50 {pct(0.5):7.2f} ms  p95 {pct(0.95):7.2f} ms  "
+                  f"p99 {pct(0.99):7.2f} ms")
+        print(f"  {total / elapsed:.0f} requests/s, {len(stats['completed'])} stages completed, "
+              f"{len(stats['conflicts'])} conflicts, {len(stats['errors'])} errors")
+        for error in stats["errors"][:10]:
+            print(f"    {error}")
+
+        Project.configure_database(SQLiteBackend(db_path))
+        Project.load_from_db()
+        done_after = sum(p.done_stages for p in Project.order_progress().values())
+        missing = [key for key in stats["completed"] if not Project.parts[key[:2]].stages[key[2]].done]
+        Project.close_database()
+        if missing or done_after != done_before + len(stats["completed"]):
+            print(f"  ❌ database has {done_after - done_before} new completions, service acknowledged "
+                  f"{len(stats['completed'])} ({len(missing)} missing)")
+            sys.exit(1)
+        print("  ✅ database matches the acknowledged completions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Start-up time of the command-line entry point versus the desktop window.
+
+    python benchmarks/bench_startup.py --runs 10
+
+Each case runs in a fresh interpreter; the median wall time is reported. The
+"complete" case is what a barcode scanner script does: one stage completed
+against an SQLite database holding --stages stages.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def time_command(argv, runs, env):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--stages", type=int, default=100_000)
+    args = ap.parse_args()
+
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "bench.db")
+        import Project
+        from database import SQLiteBackend
+        from workload import make_records
+        Project.configure_database(SQLiteBackend(db))
+        Project.bulk_import(make_records(args.stages, 20))
+        Project.close_database()
+
+        py = sys.executable
+        cases = [
+            ("python (baseline)", [py, "-c", "pass"]),
+            ("import Project", [py, "-c", "import Project"]),
+            ("cli.py --help", [py, "cli.py", "--help"]),
+            ("cli.py complete", [py, "cli.py", "--sqlite", db, "complete", "P000000", "O000", "S000"]),
+            ("cli.py update-stage", [py, "cli.py", "--sqlite", db, "update-stage", "P000001", "O001", "S001",
+                                     "--ops", "mill", "--deps", "S000"]),
+            ("import gui (window)", [py, "-c", "import gui"]),
+        ]
+        for name, argv in cases:
+            print(f"{name:22}: {time_command(argv, args.runs, env) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Timing suite over synthetic factories of several sizes, on SQLite.
+
+    python benchmarks/bench_suite.py --sizes 10000,100000 --output results.json
+    python benchmarks/bench_suite.py --sizes 10000,100000 --compare results.json
+
+Each size gets a fresh SQLite file filled by bulk_import, then the suite times
+loading, every mutator, filling the parts table, the PDF and Excel reports,
+exports and the graph queries. Results are written as JSON (one entry per
+benchmark and size, with per-call statistics for repeated operations).
+--compare prints each mean against an earlier results file and exits with
+status 1 if anything got slower than --threshold (ignoring differences under
+--min-delta, which are timer noise on sub-millisecond operations).
+--instrument turns Project's metrics on, so comparing against a plain run
+shows what the instrumentation costs.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Project
+from database import SQLiteBackend
+from workload import SHAPES, FactorySpec, factory_records
+
+
+class Suite:
+    def __init__(self, only=None, skip=None):
+        self.only = re.compile(only) if only else None
+        self.skip = re.compile(skip) if skip else None
+        self.results = []
+        self.stages = 0
+
+    def wanted(self, name):
+        if self.only and not self.only.search(name):
+            return False
+        return not (self.skip and self.skip.search(name))
+
+    def once(self, name, fn, *args, **kwargs):
+        if not self.wanted(name):
+            return None
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.record(name, [time.perf_counter() - start])
+        return result
+
+    def each(self, name, fn, calls):
+        """Time fn(*args) for every args tuple in calls."""
+        if not self.wanted(name) or not calls:
+            return
+        times = []
+        for args in calls:
+            start = time.perf_counter()
+            fn(*args)
+            times.append(time.perf_counter() - start)
+        self.record(name, times)
+
+    def record(self, name, times):
+        ordered = sorted(times)
+        entry = {
+            "benchmark": name,
+            "stages": self.stages,
+            "calls": len(times),
+            "total_s": sum(times),
+            "mean_s": statistics.fmean(times),
+            "p50_s": ordered[len(ordered) // 2],
+            "p95_s": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        }
+        self.results.append(entry)
+        calls = f"  ({len(times)} calls, p95 {entry['p95_s'] * 1000:.2f} ms)" if len(times) > 1 else ""
+        print(f"  {name:34} {entry['mean_s'] * 1000:10.2f} ms{calls}", flush=True)
+
+
+def run_size(suite, spec, workdir, ops, with_gui):
+    suite.stages = spec.stages
+    print(f"{spec.stages} stages ({spec.parts} parts, {spec.orders} orders, {spec.shape})", flush=True)
+    Project.configure_database(SQLiteBackend(os.path.join(workdir, f"factory_{spec.stages}.db")))
+    Project.load_from_db()  # start from an empty cache
+    rng = random.Random(spec.seed)
+
+    report = suite.once("bulk_import", Project.bulk_import, factory_records(spec))
+    if report is not None and report.errors:
+        print(f"  ⚠ {len(report.errors)} rows rejected while populating", flush=True)
+    suite.once("load_from_db", Project.load_from_db)
+    suite.once("sync_from_db (no changes)", Project.sync_from_db)
+
+    if with_gui:
+        table_fill(suite)
+
+    # ---- queries ----
+    keys = sorted(Project.parts)
+    sample = rng.sample(keys, min(ops, len(keys)))
+    order_id = sample[0][1] if sample else "O000"
+    suite.once("ready_stages()", Project.ready_stages)
+    suite.each("ready_stages(order)", Project.ready_stages, [(key[1],) for key in sample])
+    suite.each("parts_in_order", Project.parts_in_order, [(key[1],) for key in sample])
+    suite.once("stages_with_operation", Project.stages_with_operation, "drill")
+    suite.once("validate_all_parts", Project.validate_all_parts)
+    suite.once("critical_path (cold)", Project.critical_path, *sample[0])
+    suite.each("critical_path (warm)", Project.critical_path, sample)
+    suite.once("shop_schedule", Project.shop_schedule)
+    suite.once("order_progress()", Project.order_progress)
+    suite.once("operator_workload", Project.operator_workload)
+    suite.once("operator_throughput", Project.operator_throughput, 30, "week")
+
+    # ---- reports and exports ----
+    suite.once("generate_completed_parts_pdf", Project.generate_completed_parts_pdf)
+    suite.once("generate_multiple_orders_report", Project.generate_multiple_orders_report)
+    suite.once("generate_excel_report", Project.generate_excel_report, "parts_report.xlsx")
+    suite.once("generate_operator_report", Project.generate_operator_report)
+    suite.once("export_stages csv (cache)", Project.export_stages, "stages.csv")
+    suite.once("export_stages csv (db)", Project.export_stages, "stages_db.csv", source="db")
+    suite.once("generate_part_dependency_pdf", Project.generate_part_dependency_pdf, sample[0])
+    suite.once("generate_dependency_pdfs (order)", Project.generate_dependency_pdfs, order_id)
+
+    # ---- mutators ----
+    new_keys = [(f"BENCH{i:05d}", order_id) for i in range(ops)]
+    suite.each("add_part", Project.add_part, new_keys)
+    suite.each("add_stage", Project.add_stage,
+               [(pid, oid, f"S{s}", "drill,mill", f"S{s - 1}" if s else "") for pid, oid in new_keys for s in range(2)])
+    suite.each("update_stage", Project.update_stage, [(pid, oid, "S1", "grind", "S0") for pid, oid in new_keys])
+    with Project.cache_lock:
+        ready = Project.ready_stages()
+    rng.shuffle(ready)
+    suite.each("complete_stage", Project.complete_stage, ready[:ops])
+    suite.each("remove_stage", Project.remove_stage, [(pid, oid, "S1") for pid, oid in new_keys])
+    suite.each("remove_part", Project.remove_part, new_keys)
+
+    problems = Project.check_report_aggregates()
+    if problems:
+        print(f"  ❌ aggregates out of step after the run: {', '.join(problems)}", flush=True)
+    Project.close_database()
+
+
+def warm_imports():
+    # Libraries the timed code imports lazily; loading them up front keeps
+    # one-off import costs out of the first size's figures.
+    for name in ("matplotlib.figure", "networkx", "numpy", "openpyxl", "reportlab.platypus"):
+        importlib.import_module(name)
+
+
+def table_fill(suite):
+    if not suite.wanted("handle_list_parts"):
+        return
+    from PyQt5 import QtWidgets
+    import gui
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    window = gui.MyApp()
+    window.syncTimer.stop()
+    window.dashboardTimer.stop()
+    suite.once("handle_list_parts", lambda: (window.handle_list_parts(), app.processEvents()))
+    Project.remove_cache_listener(window.partsModel)
+    window.deleteLater()
+    app.processEvents()
+
+
+def compare(results, spec, baseline_path, threshold, min_delta):
+    with open(baseline_path, encoding="utf-8") as f:
+        data = json.load(f)
+    baseline = {(r["benchmark"], r["stages"]): r for r in data["results"]}
+    slower = 0
+    print(f"\nversus {baseline_path} (new / old mean):")
+    if data.get("spec") != spec.as_dict():
+        print("  ⚠ the baseline was run with a different workload spec")
+    for r in results:
+        old = baseline.get((r["benchmark"], r["stages"]))
+        if old is None or old["mean_s"] <= 0:
+            continue
+        ratio = r["mean_s"] / old["mean_s"]
+        flag = "  ← slower" if ratio > threshold and r["mean_s"] - old["mean_s"] > min_delta else ""
+        slower += bool(flag)
+        print(f"  {r['benchmark']:34} {r['stages']:>9} {ratio:6.2f}x{flag}")
+    return slower
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="10000,100000", help="comma-separated stage counts")
+    ap.add_argument("--stages-per-part", type=int, default=20)
+    ap.add_argument("--orders", type=int, default=50)
+    ap.add_argument("--shape", choices=SHAPES, default="chain")
+    ap.add_argument("--fan-in", type=int, default=2)
+    ap.add_argument("--operations", type=int, default=8, help="size of the operation vocabulary")
+    ap.add_argument("--done-fraction", type=float, default=0.3)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--ops", type=int, default=100, help="calls per mutator and per sampled query")
+    ap.add_argument("--only", help="regex: run only matching benchmarks")
+    ap.add_argument("--skip", help="regex: skip matching benchmarks")
+    ap.add_argument("--no-gui", action="store_true", help="skip the Qt table benchmark")
+    ap.add_argument("--instrument", action="store_true",
+                    help="run with Project metrics enabled; compare against a plain run to see the overhead")
+    ap.add_argument("--output", help="write results as JSON")
+    ap.add_argument("--compare", metavar="JSON", help="earlier results to compare against")
+    ap.add_argument("--threshold", type=float, default=1.25, help="ratio counted as a regression")
+    ap.add_argument("--min-delta", type=float, default=0.002, help="seconds; smaller slowdowns are ignored")
+    args = ap.parse_args()
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    base = FactorySpec(orders=args.orders, stages_per_part=args.stages_per_part, shape=args.shape,
+                       fan_in=args.fan_in, operations=args.operations,
+                       done_fraction=args.done_fraction, seed=args.seed)
+    suite = Suite(args.only, args.skip)
+    Project.set_instrumentation(args.instrument)
+    warm_imports()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)  # reports are written to the working directory
+        try:
+            for size in (int(s) for s in args.sizes.split(",")):
+                run_size(suite, base.with_stages(size), workdir, args.ops, not args.no_gui)
+        finally:
+            os.chdir(cwd)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "spec": base.as_dict(),
+                "ops": args.ops,
+                "instrumented": args.instrument,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": suite.results,
+            }, f, indent=2)
+    if args.compare:
+        sys.exit(1 if compare(suite.results, base, args.compare, args.threshold, args.min_delta) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""A burst of scanner completions, saved synchronously versus write-behind.
+
+    python benchmarks/bench_write_behind.py --stages 100000 --burst 500
+
+Reports how long the burst takes to return to the callers and, for
+write-behind, how much longer until the database has every write.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Project
+from database import SQLiteBackend
+from workload import make_records
+
+
+def burst(keys):
+    start = time.perf_counter()
+    for key in keys:
+        Project.complete_stage(*key)
+    return time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--stages", type=int, default=100_000)
+    ap.add_argument("--burst", type=int, default=500)
+    ap.add_argument("--no-fsync", action="store_true", help="do not fsync the journal")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        Project.configure_database(SQLiteBackend(os.path.join(tmp, "bench.db")))
+        Project.load_from_db()
+        Project.bulk_import(make_records(args.stages, 20))
+        ready = Project.ready_stages()
+        random.Random(0).shuffle(ready)
+        sync_keys, queued_keys = ready[:args.burst], ready[args.burst:2 * args.burst]
+
+        elapsed = burst(sync_keys)
+        print(f"synchronous : {elapsed * 1000:8.1f} ms  ({elapsed / len(sync_keys) * 1e6:.0f} µs/call)")
+
+        Project.enable_write_behind(os.path.join(tmp, "bench.journal"), fsync=not args.no_fsync)
+        elapsed = burst(queued_keys)
+        start = time.perf_counter()
+        Project.disable_write_behind()
+        drained = time.perf_counter() - start
+        print(f"write-behind: {elapsed * 1000:8.1f} ms  ({elapsed / len(queued_keys) * 1e6:.0f} µs/call), "
+              f"saved {drained * 1000:.1f} ms later")
+        Project.close_database()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Synthetic factory data for the benchmarks.
+
+A factory is a set of parts spread over orders. Each part has a dependency
+graph of stages with a chosen shape, operations drawn from a vocabulary, and a
+share of its stages already done (always a dependency-respecting prefix, so
+the data passes the same checks as real edits). Stages are assigned to a crew
+of operators, a few of them busier than the rest, and done stages carry
+completion times spread over the last history_days days. Records come out in
+the bulk_import format, and the same spec and seed always give the same
+factory (apart from completion dates, which count back from today).
+"""
+import datetime
+import random
+
+OPERATIONS = ["drill", "deburr", "mill", "turn", "grind", "paint", "inspect", "pack",
+              "weld", "cut", "bend", "assemble", "test", "coat", "polish", "heat-treat"]
+SHAPES = ("chain", "tree", "layered", "random")
+
+
+class FactorySpec:
+    """Size and shape of a synthetic factory.
+
+    shape: "chain" (each stage needs the previous one), "tree" (assembly: each
+    stage needs fan_in sub-assemblies), "layered" (each stage needs every
+    stage of the previous layer of fan_in stages) or "random" (up to fan_in
+    earlier stages). reuse is the share of part IDs that also appear in
+    another order. crew is the number of operators.
+    """
+
+    def __init__(self, parts=1000, orders=50, stages_per_part=20, shape="chain", fan_in=2,
+                 operations=8, ops_per_stage=2, done_fraction=0.3, reuse=0.1, crew=20,
+                 history_days=30, seed=0):
+        if shape not in SHAPES:
+            raise ValueError(f"Unknown shape {shape!r}; expected one of {', '.join(SHAPES)}")
+        self.parts = parts
+        self.orders = orders
+        self.stages_per_part = stages_per_part
+        self.shape = shape
+        self.fan_in = max(1, fan_in)
+        self.operations = operations
+        self.ops_per_stage = ops_per_stage
+        self.done_fraction = done_fraction
+        self.reuse = reuse
+        self.crew = crew
+        self.history_days = history_days
+        self.seed = seed
+
+    @property
+    def stages(self):
+        return self.parts * self.stages_per_part
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def with_stages(self, n_stages):
+        """Same shape, scaled to about n_stages stages."""
+        spec = FactorySpec(**self.as_dict())
+        spec.parts = max(1, n_stages // self.stages_per_part)
+        return spec
+
+
+def operation_names(n):
+    return [OPERATIONS[i] if i < len(OPERATIONS) else f"op{i}" for i in range(n)]
+
+
+def stage_ids(n):
+    return [f"S{i:03d}" for i in range(n)]
+
+
+def crew_names(n):
+    first = ["Ali", "Sara", "Reza", "Mina", "Omid", "Nina", "Amir", "Leila", "Kian", "Yara"]
+    last = ["Ahmadi", "Karimi", "Rahimi", "Moradi", "Jafari", "Hosseini", "Sadeghi", "Rostami"]
+    return [(first[i % len(first)], last[i // len(first) % len(last)] + ("" if i < 80 else f" {i // 80}"))
+            for i in range(n)]
+
+
+def dependencies(spec, rng):
+    """deps[i] = indexes of the stages stage i depends on, plus an order in
+    which every stage comes after its dependencies."""
+    n, k = spec.stages_per_part, spec.fan_in
+    if spec.shape == "chain":
+        deps = [[i - 1] if i else [] for i in range(n)]
+    elif spec.shape == "tree":
+        # Stage 0 is the final assembly; stage i is built from i*k+1 .. i*k+k.
+        deps = [[c for c in range(i * k + 1, i * k + k + 1) if c < n] for i in range(n)]
+    elif spec.shape == "layered":
+        deps = [list(range((i // k - 1) * k, i // k * k)) if i >= k else [] for i in range(n)]
+    else:
+        deps = [sorted(rng.sample(range(i), min(i, rng.randint(1, k)))) if i else [] for i in range(n)]
+    order = list(range(n - 1, -1, -1)) if spec.shape == "tree" else list(range(n))
+    return deps, order
+
+
+def factory_records(spec):
+    """Yield one bulk_import record per stage."""
+    rng = random.Random(spec.seed)
+    # A separate generator, so the factory itself is the same with or without a crew.
+    crew_rng = random.Random(f"{spec.seed}-crew")
+    crew = crew_names(spec.crew)
+    workload = [1 / (i + 1) for i in range(len(crew))]   # a few operators get most of the work
+    now = datetime.datetime.now().replace(microsecond=0)
+    sids = stage_ids(spec.stages_per_part)
+    vocabulary = operation_names(spec.operations)
+    keys = set()
+    for i in range(spec.parts):
+        order_id = f"O{i % spec.orders:03d}"
+        pid = f"P{i:06d}"
+        if i and rng.random() < spec.reuse:
+            candidate = f"P{rng.randrange(i):06d}"
+            if (candidate, order_id) not in keys:
+                pid = candidate
+        keys.add((pid, order_id))
+
+        deps, order = dependencies(spec, rng)
+        n_done = round(spec.stages_per_part * min(1.0, rng.uniform(0, 2 * spec.done_fraction)))
+        done = set(order[:n_done])
+        # Completion times rise along the completion order, ending within the history window.
+        finished = now - datetime.timedelta(seconds=crew_rng.uniform(0, spec.history_days * 86400))
+        step = datetime.timedelta(minutes=crew_rng.uniform(5, 60))
+        completed_at = {s: finished - step * (n_done - 1 - k) for k, s in enumerate(order[:n_done])}
+        operators = crew_rng.choices(crew, workload, k=len(sids)) if crew else [("", "")] * len(sids)
+        for s, sid in enumerate(sids):
+            ops = rng.sample(vocabulary, min(len(vocabulary), rng.randint(1, spec.ops_per_stage)))
+            yield {
+                "part_id": pid,
+                "order_id": order_id,
+                "stage_id": sid,
+                "operations": ",".join(ops),
+                "dependencies": ",".join(sids[d] for d in deps[s]),
+                "done": s in done,
+                "operator_first": operators[s][0],
+                "operator_last": operators[s][1],
+                "completed_at": completed_at[s].strftime("%Y-%m-%d %H:%M:%S") if s in done else None,
+            }
+
+
+def make_records(n_stages, stages_per_part=20, **options):
+    """Records for about n_stages stages in a chain-shaped factory."""
+    spec = FactorySpec(stages_per_part=stages_per_part, **options)
+    return factory_records(spec.with_stages(n_stages))
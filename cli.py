@@ -0,0 +1,281 @@
+"""Command-line entry point for scripts, barcode scanners and scheduled jobs.
+
+    python cli.py [--sqlite FILE] <command> ...
+    python cli.py complete P-100 ORD-7 S3
+    python cli.py export stages.csv --order ORD-7 --source db
+
+Part commands load only the parts they touch, so they start and finish in a
+fraction of a second however big the database is. Reports, validation and
+cache exports load everything first; "stages" and "dependents" are answered
+by the database's indexes without loading anything. Nothing here needs Qt or
+a display. Terminals that send a steady stream of edits are better served by
+service.py, which keeps the data loaded between requests.
+Exit status is 0 on success and 1 when the command reports a problem.
+"""
+import argparse
+import sys
+
+import Project
+from database import DatabaseError
+from write_behind import JournalLocked
+
+
+# Both raise DatabaseError, so main reports a failed load instead of running
+# the command against an empty cache.
+def _load_part(args):
+    Project.load_parts([(args.part_id, args.order_id)])
+
+
+def _load_all():
+    Project.load_from_db(raise_errors=True)
+
+
+def cmd_add_part(args):
+    _load_part(args)
+    return Project.add_part(args.part_id, args.order_id)
+
+
+def cmd_add_stage(args):
+    _load_part(args)
+    return Project.add_stage(args.part_id, args.order_id, args.stage_id, args.ops, args.deps,
+                             args.operator_first, args.operator_last)
+
+
+def cmd_complete(args):
+    _load_part(args)
+    if args.with_deps:
+        return Project.complete_stages([(args.part_id, args.order_id, args.stage_id)])
+    return Project.complete_stage(args.part_id, args.order_id, args.stage_id)
+
+
+def cmd_complete_part(args):
+    _load_part(args)
+    return Project.complete_part(args.part_id, args.order_id)
+
+
+def cmd_complete_order(args):
+    _load_all()
+    return Project.complete_order(args.order_id)
+
+
+def cmd_update_stage(args):
+    _load_part(args)
+    return Project.update_stage(args.part_id, args.order_id, args.stage_id, args.ops, args.deps)
+
+
+def cmd_remove_part(args):
+    _load_part(args)
+    return Project.remove_part(args.part_id, args.order_id)
+
+
+def cmd_remove_stage(args):
+    _load_part(args)
+    return Project.remove_stage(args.part_id, args.order_id, args.stage_id)
+
+
+def cmd_import(args):
+    # Rows are checked against the cache, so the parts they touch are loaded first.
+    Project.load_parts(Project.import_part_keys(args.file))
+    report = Project.bulk_import(args.file, chunk_size=args.chunk_size)
+    lines = [report.summary()] + [f"Row {row}: {error}" for row, error in report.errors]
+    return "\n".join(lines)
+
+
+def cmd_export(args):
+    if args.source == "cache":
+        _load_all()
+    try:
+        count = Project.export_stages(args.path, args.format, args.source, args.order, args.status)
+    except (ValueError, ImportError) as e:
+        return f"❌ {e}"
+    return f"✅ {count} stages exported to {args.path}"
+
+
+def cmd_report(args):
+    _load_all()
+    if args.kind == "completed":
+        return Project.generate_completed_parts_pdf()
+    if args.kind == "multi-order":
+        return Project.generate_multiple_orders_report()
+    if args.kind == "excel":
+        filename = Project.generate_excel_report(args.output or "parts_report.xlsx")
+        return f"✅ Excel file created: {filename}"
+    if args.kind == "operators":
+        return Project.generate_operator_report(args.output or "operator_workload_report.pdf",
+                                                args.order, args.days, args.period)
+    return Project.generate_dependency_pdfs(args.order, output=args.output)
+
+
+def cmd_validate(args):
+    _load_all()
+    violations = Project.validate_all_parts()
+    if not violations:
+        return "✅ All dependencies are valid."
+    lines = [f"❌ {len(violations)} dependency problems found."]
+    lines += [f"Part {pid} (Order {order_id}), stage {sid}: {problem}"
+              for pid, order_id, sid, problem in violations]
+    return "\n".join(lines)
+
+
+def cmd_ready(args):
+    _load_all()
+    return "\n".join("\t".join(row) for row in sorted(Project.ready_stages(args.order, args.operation)))
+
+
+def cmd_progress(args):
+    _load_all()
+    progress = Project.order_progress()
+    orders = [args.order] if args.order else sorted(progress)
+    lines = []
+    for order_id in orders:
+        p = progress.get(order_id) or Project.order_progress(order_id)
+        lines.append(f"{order_id}\t{p.complete_parts}/{p.parts} parts\t"
+                     f"{p.done_stages}/{p.stages} stages\t{p.percent:.1f}%")
+    return "\n".join(lines)
+
+
+def cmd_operators(args):
+    _load_all()
+    workload = Project.operator_workload(args.order)
+    per_day = Project.operator_throughput(args.days, order_id=args.order).per_day()
+    overloaded = set(workload.overloaded())
+    return "\n".join(f"{load.operator}\t{load.completed}/{load.assigned} stages\t{load.pending} pending\t"
+                     f"{per_day.get(load.operator, 0.0)}/day" + ("\toverloaded" if load.operator in overloaded else "")
+                     for load in workload.loads())
+
+
+def cmd_replay_writes(args):
+    try:
+        count = Project.replay_pending_writes(args.journal)
+    except JournalLocked as e:
+        return f"❌ {e}"
+    return f"✅ {count} journaled writes saved."
+
+
+def cmd_migrate_schema(args):
+    return Project.migrate_schema(args.batch_size)
+
+
+def cmd_stages(args):
+    done = None if args.status is None else args.status == "done"
+    return "\n".join("\t".join(row) for row in Project.db_stages_with_operation(args.operation, done, args.order))
+
+
+def cmd_dependents(args):
+    return "\n".join(Project.db_dependents(args.part_id, args.order_id, args.stage_id))
+
+
+def build_parser():
+    ap = argparse.ArgumentParser(prog="cli.py", description="Production Manager without the window.")
+    ap.add_argument("--sqlite", metavar="FILE", help="use an SQLite database file instead of MySQL")
+    ap.add_argument("--metrics", metavar="FILE", help="record timings and slow queries and write them to FILE as JSON")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    def part_command(name, fn, help, stage=False):
+        p = sub.add_parser(name, help=help)
+        p.add_argument("part_id")
+        p.add_argument("order_id")
+        if stage:
+            p.add_argument("stage_id")
+        p.set_defaults(func=fn)
+        return p
+
+    part_command("add-part", cmd_add_part, "add a part")
+    p = part_command("add-stage", cmd_add_stage, "add a stage to a part", stage=True)
+    p.add_argument("--ops", default="", help="comma-separated operations")
+    p.add_argument("--deps", default="", help="comma-separated stage IDs")
+    p.add_argument("--operator-first", default="")
+    p.add_argument("--operator-last", default="")
+    p = part_command("complete", cmd_complete, "mark a stage done", stage=True)
+    p.add_argument("--with-deps", action="store_true", help="also complete every unfinished stage it depends on")
+    part_command("complete-part", cmd_complete_part, "complete every stage of a part, in dependency order")
+    p = sub.add_parser("complete-order", help="complete every stage of an order, in dependency order")
+    p.add_argument("order_id")
+    p.set_defaults(func=cmd_complete_order)
+    p = part_command("update-stage", cmd_update_stage, "replace a stage's operations and dependencies", stage=True)
+    p.add_argument("--ops", default="")
+    p.add_argument("--deps", default="")
+    part_command("remove-part", cmd_remove_part, "delete a part and its stages")
+    part_command("remove-stage", cmd_remove_stage, "delete a stage", stage=True)
+
+    p = sub.add_parser("import", help="bulk import a CSV or XLSX file")
+    p.add_argument("file")
+    p.add_argument("--chunk-size", type=int, default=1000)
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="export stages to xlsx, csv or parquet")
+    p.add_argument("path")
+    p.add_argument("--format", choices=("xlsx", "csv", "parquet"), help="default: from the file extension")
+    p.add_argument("--source", choices=("cache", "db"), default="db",
+                   help="db streams rows without loading the cache (default)")
+    p.add_argument("--order")
+    p.add_argument("--status", choices=("done", "pending"))
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("report", help="generate a PDF or Excel report")
+    p.add_argument("kind", choices=("completed", "multi-order", "excel", "graphs", "operators"))
+    p.add_argument("--order", help="graphs/operators: limit to one order")
+    p.add_argument("--output", help="excel/graphs/operators: output file name (operators: .pdf or .xlsx)")
+    p.add_argument("--days", type=int, default=30, help="operators: throughput window")
+    p.add_argument("--period", choices=("day", "week", "month"), default="week", help="operators: throughput period")
+    p.set_defaults(func=cmd_report)
+
+    sub.add_parser("validate", help="check every part's dependencies").set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("ready", help="list stages that can be completed now")
+    p.add_argument("--order")
+    p.add_argument("--operation")
+    p.set_defaults(func=cmd_ready)
+
+    p = sub.add_parser("progress", help="completion per order")
+    p.add_argument("--order")
+    p.set_defaults(func=cmd_progress)
+
+    p = sub.add_parser("operators", help="assigned, completed and pending stages per operator")
+    p.add_argument("--order")
+    p.add_argument("--days", type=int, default=30, help="window for completions per day")
+    p.set_defaults(func=cmd_operators)
+
+    p = sub.add_parser("stages", help="stages that use an operation, answered by the database")
+    p.add_argument("--operation", required=True)
+    p.add_argument("--order")
+    p.add_argument("--status", choices=("done", "pending"))
+    p.set_defaults(func=cmd_stages)
+
+    part_command("dependents", cmd_dependents, "stages that depend directly on a stage", stage=True)
+
+    p = sub.add_parser("migrate-schema",
+                       help="bring an older database up to date: stage lists in their own indexed tables, "
+                            "completion times")
+    p.add_argument("--batch-size", type=int, default=5000)
+    p.set_defaults(func=cmd_migrate_schema)
+
+    p = sub.add_parser("replay-writes", help="save stage writes a crashed window left in the write-behind journal")
+    p.add_argument("--journal", default=Project.WRITE_BEHIND_JOURNAL)
+    p.set_defaults(func=cmd_replay_writes)
+    return ap
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        Project.set_instrumentation(True)
+    if args.sqlite:
+        from database import SQLiteBackend
+        Project.configure_database(SQLiteBackend(args.sqlite))
+    try:
+        result = args.func(args)
+    except DatabaseError as e:
+        result = f"❌ Database error: {e}"
+    finally:
+        Project.close_database()
+        if args.metrics:
+            Project.dump_metrics(args.metrics)
+    if result:
+        print(result)
+    # Any failed or rejected line counts, e.g. the rejected rows under an import summary.
+    return 1 if result and any(line.startswith(("❌", "⚠")) for line in result.splitlines()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,562 @@
+import sqlite3
+import threading
+import time
+
+# ------------------ Errors ------------------
+# Driver exceptions are translated into these so the rest of the code does not
+# care whether it is talking to MySQL or to the SQLite stand-in.
+class DatabaseError(Exception):
+    pass
+
+class IntegrityError(DatabaseError):
+    pass
+
+class PoolExhausted(DatabaseError):
+    pass
+
+# ------------------ Backends ------------------
+class MySQLBackend:
+    name = "mysql"
+
+    def __init__(self, **config):
+        import mysql.connector
+        self._mysql = mysql.connector
+        self.config = config
+
+    def connect(self):
+        try:
+            return self._mysql.connect(**self.config)
+        except self._mysql.Error as e:
+            raise DatabaseError(str(e)) from e
+
+    def ping(self, raw):
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except self._mysql.Error:
+            return False
+
+    def translate(self, exc):
+        if isinstance(exc, self._mysql.IntegrityError):
+            return IntegrityError(str(exc))
+        if isinstance(exc, self._mysql.Error):
+            return DatabaseError(str(exc))
+        return None
+
+    def prepare(self, sql):
+        return sql
+
+    def cursor(self, raw, dictionary=False, buffered=None):
+        kwargs = {"dictionary": dictionary}
+        if buffered is not None:
+            kwargs["buffered"] = buffered
+        return raw.cursor(**kwargs)
+
+    def change_log_ddl(self):
+        return MYSQL_CHANGE_LOG_DDL
+
+    def stage_tables_ddl(self):
+        return MYSQL_STAGE_TABLES_DDL
+
+
+class SQLiteBackend:
+    name = "sqlite"
+
+    def __init__(self, path=":memory:", create_schema=True):
+        # A plain ":memory:" database is private to one connection, so pooled
+        # connections share a named in-memory database, kept alive by one
+        # extra connection for the lifetime of the backend.
+        self._keepalive = None
+        if path == ":memory:":
+            path = f"file:pm_{id(self)}?mode=memory&cache=shared"
+            self._keepalive = sqlite3.connect(path, uri=True, check_same_thread=False)
+        self.path = path
+        self._needs_schema = create_schema
+        self._lock = threading.Lock()
+
+    def connect(self):
+        try:
+            raw = sqlite3.connect(self.path, uri=self.path.startswith("file:"),
+                                  check_same_thread=False)
+            raw.execute("PRAGMA foreign_keys = ON")
+            with self._lock:
+                if self._needs_schema:
+                    raw.executescript(SQLITE_SCHEMA)
+                    for statement in SQLITE_STAGE_TABLES_DDL + SQLITE_CHANGE_LOG_DDL:
+                        raw.execute(statement)
+                    # An older file gets the column itself from migrate-schema.
+                    if any(row[1] == "completed_at" for row in raw.execute("PRAGMA table_info(stages)")):
+                        raw.execute("CREATE INDEX IF NOT EXISTS stages_by_completed_at ON stages (completed_at)")
+                    raw.commit()
+                    self._needs_schema = False
+        except sqlite3.Error as e:
+            raise DatabaseError(str(e)) from e
+        return raw
+
+    def ping(self, raw):
+        try:
+            raw.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def translate(self, exc):
+        if isinstance(exc, sqlite3.IntegrityError):
+            return IntegrityError(str(exc))
+        if isinstance(exc, sqlite3.Error):
+            return DatabaseError(str(exc))
+        return None
+
+    def prepare(self, sql):
+        return sql.replace("%s", "?")
+
+    def cursor(self, raw, dictionary=False, buffered=None):
+        cursor = raw.cursor()
+        if dictionary:
+            cursor.row_factory = sqlite3.Row
+        return cursor
+
+    def change_log_ddl(self):
+        return SQLITE_CHANGE_LOG_DDL
+
+    def stage_tables_ddl(self):
+        return SQLITE_STAGE_TABLES_DDL
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS parts (
+    part_id  VARCHAR(64) NOT NULL,
+    order_id VARCHAR(64) NOT NULL,
+    PRIMARY KEY (part_id, order_id)
+);
+CREATE TABLE IF NOT EXISTS stages (
+    part_id        VARCHAR(64) NOT NULL,
+    order_id       VARCHAR(64) NOT NULL,
+    stage_id       VARCHAR(64) NOT NULL,
+    done           BOOLEAN NOT NULL DEFAULT 0,
+    operator_first VARCHAR(64),
+    operator_last  VARCHAR(64),
+    completed_at   TIMESTAMP NULL,
+    PRIMARY KEY (part_id, order_id, stage_id),
+    FOREIGN KEY (part_id, order_id) REFERENCES parts (part_id, order_id) ON DELETE CASCADE
+);
+"""
+
+# ------------------ Stage operations and dependencies ------------------
+# One row per operation and per dependency edge, with its position in the
+# stage's list. The secondary indexes answer "stages using operation X" and
+# "what depends on stage S" without scanning stages. depends_on is not a
+# foreign key: dangling dependencies are allowed and reported by validation.
+MYSQL_STAGE_TABLES_DDL = [
+    """CREATE TABLE IF NOT EXISTS stage_operations (
+        part_id   VARCHAR(64) NOT NULL,
+        order_id  VARCHAR(64) NOT NULL,
+        stage_id  VARCHAR(64) NOT NULL,
+        ordinal   SMALLINT NOT NULL,
+        operation VARCHAR(64) NOT NULL,
+        PRIMARY KEY (part_id, order_id, stage_id, ordinal),
+        INDEX stage_operations_by_operation (operation),
+        FOREIGN KEY (part_id, order_id, stage_id) REFERENCES stages (part_id, order_id, stage_id) ON DELETE CASCADE
+    )""",
+    """CREATE TABLE IF NOT EXISTS stage_dependencies (
+        part_id    VARCHAR(64) NOT NULL,
+        order_id   VARCHAR(64) NOT NULL,
+        stage_id   VARCHAR(64) NOT NULL,
+        ordinal    SMALLINT NOT NULL,
+        depends_on VARCHAR(64) NOT NULL,
+        PRIMARY KEY (part_id, order_id, stage_id, ordinal),
+        INDEX stage_dependencies_by_target (part_id, order_id, depends_on),
+        FOREIGN KEY (part_id, order_id, stage_id) REFERENCES stages (part_id, order_id, stage_id) ON DELETE CASCADE
+    )""",
+]
+
+SQLITE_STAGE_TABLES_DDL = [
+    """CREATE TABLE IF NOT EXISTS stage_operations (
+        part_id   VARCHAR(64) NOT NULL,
+        order_id  VARCHAR(64) NOT NULL,
+        stage_id  VARCHAR(64) NOT NULL,
+        ordinal   INTEGER NOT NULL,
+        operation VARCHAR(64) NOT NULL,
+        PRIMARY KEY (part_id, order_id, stage_id, ordinal),
+        FOREIGN KEY (part_id, order_id, stage_id) REFERENCES stages (part_id, order_id, stage_id) ON DELETE CASCADE
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS stage_operations_by_operation ON stage_operations (operation)",
+    """CREATE TABLE IF NOT EXISTS stage_dependencies (
+        part_id    VARCHAR(64) NOT NULL,
+        order_id   VARCHAR(64) NOT NULL,
+        stage_id   VARCHAR(64) NOT NULL,
+        ordinal    INTEGER NOT NULL,
+        depends_on VARCHAR(64) NOT NULL,
+        PRIMARY KEY (part_id, order_id, stage_id, ordinal),
+        FOREIGN KEY (part_id, order_id, stage_id) REFERENCES stages (part_id, order_id, stage_id) ON DELETE CASCADE
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS stage_dependencies_by_target ON stage_dependencies (part_id, order_id, depends_on)",
+]
+
+def legacy_stage_columns(conn):
+    """True while stages still has the comma-joined operations/dependencies
+    columns, i.e. before the migrate-schema command (Project.migrate_stage_lists)
+    has run."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT operations, dependencies FROM stages WHERE 1 = 0")
+        cursor.fetchall()
+        return True
+    except DatabaseError:
+        return False
+    finally:
+        cursor.close()
+        conn.rollback()
+
+# Databases created before completion times were recorded get the column (and
+# its index, for throughput over a recent window) from migrate-schema. Until
+# then completions are saved without a time.
+COMPLETED_AT_DDL = [
+    "ALTER TABLE stages ADD COLUMN completed_at TIMESTAMP NULL",
+    "CREATE INDEX stages_by_completed_at ON stages (completed_at)",
+]
+
+def has_completed_at(conn):
+    """True once stages has the completed_at column."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT completed_at FROM stages WHERE 1 = 0")
+        cursor.fetchall()
+        return True
+    except DatabaseError:
+        return False
+    finally:
+        cursor.close()
+        conn.rollback()
+
+def ensure_completed_at(conn):
+    """Add stages.completed_at and its index if missing; True when added."""
+    if has_completed_at(conn):
+        return False
+    cursor = conn.cursor()
+    try:
+        for statement in COMPLETED_AT_DDL:
+            cursor.execute(statement)
+        conn.commit()
+        return True
+    finally:
+        cursor.close()
+
+# ------------------ Change log ------------------
+# Triggers record the key of every changed row; clients re-read only those keys
+# (see sync_from_db). Cascaded stage deletes do not fire triggers in MySQL, so a
+# logged part delete implies the removal of all its stages. Changes to a stage's
+# operations or dependencies are logged as an update of the stage.
+MYSQL_CHANGE_LOG_DDL = [
+    """CREATE TABLE IF NOT EXISTS change_log (
+        seq        BIGINT AUTO_INCREMENT PRIMARY KEY,
+        part_id    VARCHAR(255) NOT NULL,
+        order_id   VARCHAR(255) NOT NULL,
+        stage_id   VARCHAR(255) NULL,
+        action     CHAR(1) NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )""",
+    "DROP TRIGGER IF EXISTS parts_change_ins",
+    """CREATE TRIGGER parts_change_ins AFTER INSERT ON parts FOR EACH ROW
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (NEW.part_id, NEW.order_id, NULL, 'I')""",
+    "DROP TRIGGER IF EXISTS parts_change_del",
+    """CREATE TRIGGER parts_change_del AFTER DELETE ON parts FOR EACH ROW
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (OLD.part_id, OLD.order_id, NULL, 'D')""",
+    "DROP TRIGGER IF EXISTS stages_change_ins",
+    """CREATE TRIGGER stages_change_ins AFTER INSERT ON stages FOR EACH ROW
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (NEW.part_id, NEW.order_id, NEW.stage_id, 'I')""",
+    "DROP TRIGGER IF EXISTS stages_change_upd",
+    """CREATE TRIGGER stages_change_upd AFTER UPDATE ON stages FOR EACH ROW
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (NEW.part_id, NEW.order_id, NEW.stage_id, 'U')""",
+    "DROP TRIGGER IF EXISTS stages_change_del",
+    """CREATE TRIGGER stages_change_del AFTER DELETE ON stages FOR EACH ROW
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (OLD.part_id, OLD.order_id, OLD.stage_id, 'D')""",
+    "DROP TRIGGER IF EXISTS stage_operations_change_ins",
+    """CREATE TRIGGER stage_operations_change_ins AFTER INSERT ON stage_operations FOR EACH ROW
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (NEW.part_id, NEW.order_id, NEW.stage_id, 'U')""",
+    "DROP TRIGGER IF EXISTS stage_operations_change_del",
+    """CREATE TRIGGER stage_operations_change_del AFTER DELETE ON stage_operations FOR EACH ROW
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (OLD.part_id, OLD.order_id, OLD.stage_id, 'U')""",
+    "DROP TRIGGER IF EXISTS stage_dependencies_change_ins",
+    """CREATE TRIGGER stage_dependencies_change_ins AFTER INSERT ON stage_dependencies FOR EACH ROW
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (NEW.part_id, NEW.order_id, NEW.stage_id, 'U')""",
+    "DROP TRIGGER IF EXISTS stage_dependencies_change_del",
+    """CREATE TRIGGER stage_dependencies_change_del AFTER DELETE ON stage_dependencies FOR EACH ROW
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (OLD.part_id, OLD.order_id, OLD.stage_id, 'U')""",
+]
+
+SQLITE_CHANGE_LOG_DDL = [
+    """CREATE TABLE IF NOT EXISTS change_log (
+        seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+        part_id    VARCHAR(255) NOT NULL,
+        order_id   VARCHAR(255) NOT NULL,
+        stage_id   VARCHAR(255),
+        action     CHAR(1) NOT NULL,
+        changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS parts_change_ins AFTER INSERT ON parts BEGIN
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (NEW.part_id, NEW.order_id, NULL, 'I'); END""",
+    """CREATE TRIGGER IF NOT EXISTS parts_change_del AFTER DELETE ON parts BEGIN
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (OLD.part_id, OLD.order_id, NULL, 'D'); END""",
+    """CREATE TRIGGER IF NOT EXISTS stages_change_ins AFTER INSERT ON stages BEGIN
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (NEW.part_id, NEW.order_id, NEW.stage_id, 'I'); END""",
+    """CREATE TRIGGER IF NOT EXISTS stages_change_upd AFTER UPDATE ON stages BEGIN
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (NEW.part_id, NEW.order_id, NEW.stage_id, 'U'); END""",
+    """CREATE TRIGGER IF NOT EXISTS stages_change_del AFTER DELETE ON stages BEGIN
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (OLD.part_id, OLD.order_id, OLD.stage_id, 'D'); END""",
+    """CREATE TRIGGER IF NOT EXISTS stage_operations_change_ins AFTER INSERT ON stage_operations BEGIN
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (NEW.part_id, NEW.order_id, NEW.stage_id, 'U'); END""",
+    """CREATE TRIGGER IF NOT EXISTS stage_operations_change_del AFTER DELETE ON stage_operations BEGIN
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (OLD.part_id, OLD.order_id, OLD.stage_id, 'U'); END""",
+    """CREATE TRIGGER IF NOT EXISTS stage_dependencies_change_ins AFTER INSERT ON stage_dependencies BEGIN
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (NEW.part_id, NEW.order_id, NEW.stage_id, 'U'); END""",
+    """CREATE TRIGGER IF NOT EXISTS stage_dependencies_change_del AFTER DELETE ON stage_dependencies BEGIN
+        INSERT INTO change_log (part_id, order_id, stage_id, action) VALUES (OLD.part_id, OLD.order_id, OLD.stage_id, 'U'); END""",
+]
+
+# ------------------ Pooled connections ------------------
+class PooledCursor:
+    def __init__(self, backend, cursor, observer=None):
+        self._backend = backend
+        self._cursor = cursor
+        self._observer = observer
+
+    def _call(self, fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            translated = self._backend.translate(e)
+            if translated is None:
+                raise
+            raise translated from e
+
+    def execute(self, sql, params=()):
+        if self._observer is None:
+            return self._call(self._cursor.execute, self._backend.prepare(sql), params)
+        return self._observed(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        if self._observer is None:
+            return self._call(self._cursor.executemany, self._backend.prepare(sql), seq_of_params)
+        return self._observed(self._cursor.executemany, sql, seq_of_params)
+
+    def _observed(self, fn, sql, params):
+        # observer(sql, params, seconds, rowcount, error) after every statement.
+        start = time.perf_counter()
+        try:
+            result = self._call(fn, self._backend.prepare(sql), params)
+        except Exception:
+            self._observer(sql, params, time.perf_counter() - start, -1, True)
+            raise
+        self._observer(sql, params, time.perf_counter() - start, self._cursor.rowcount, False)
+        return result
+
+    def fetchone(self):
+        return self._call(self._cursor.fetchone)
+
+    def fetchmany(self, size):
+        return self._call(self._cursor.fetchmany, size)
+
+    def fetchall(self):
+        return self._call(self._cursor.fetchall)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        try:
+            self._cursor.close()
+        except Exception:
+            pass
+
+
+class PooledConnection:
+    """Checked-out connection; close() hands it back to the pool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._broken = False
+
+    def _check(self):
+        if self._raw is None:
+            raise DatabaseError("Connection already returned to the pool.")
+
+    def cursor(self, dictionary=False, buffered=None):
+        self._check()
+        try:
+            cursor = self._pool.backend.cursor(self._raw, dictionary=dictionary, buffered=buffered)
+        except Exception as e:
+            self._broken = True
+            translated = self._pool.backend.translate(e)
+            if translated is None:
+                raise
+            raise translated from e
+        return PooledCursor(self._pool.backend, cursor, self._pool.query_observer)
+
+    def commit(self):
+        self._check()
+        try:
+            self._raw.commit()
+        except Exception as e:
+            translated = self._pool.backend.translate(e)
+            if translated is None:
+                raise
+            raise translated from e
+
+    def rollback(self):
+        self._check()
+        try:
+            self._raw.rollback()
+        except Exception as e:
+            self._broken = True
+            translated = self._pool.backend.translate(e)
+            if translated is None:
+                raise
+            raise translated from e
+
+    def close(self):
+        # Safe to call more than once; only the first call releases.
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw, self._broken)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, backend, size=5, timeout=10.0, health_check_interval=30.0, max_idle=3600.0):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self.backend = backend
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.max_idle = max_idle
+        self._idle = []           # [(raw, last_used), ...], most recently used last
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._stats = {
+            "acquired": 0, "created": 0, "reused": 0, "waits": 0, "wait_time": 0.0,
+            "health_checks": 0, "stale_reconnects": 0, "discarded": 0, "timeouts": 0,
+        }
+        # Set to observer(sql, params, seconds, rowcount, error) to time every
+        # statement run through this pool's cursors; None costs nothing.
+        self.query_observer = None
+
+    def acquire(self):
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        with self._cond:
+            waited = False
+            while True:
+                if self._closed:
+                    raise DatabaseError("Connection pool is closed.")
+                if self._idle:
+                    raw, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    raw, last_used = None, None
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolExhausted(f"No free database connection after {self.timeout:.1f}s "
+                                        f"(pool size {self.size}).")
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_time"] += time.perf_counter() - start
+
+        try:
+            if raw is not None:
+                raw = self._revalidate(raw, last_used)
+            if raw is None:
+                raw = self.backend.connect()
+                with self._cond:
+                    self._stats["created"] += 1
+            else:
+                with self._cond:
+                    self._stats["reused"] += 1
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats["acquired"] += 1
+        return PooledConnection(self, raw)
+
+    def _revalidate(self, raw, last_used):
+        idle_for = time.monotonic() - last_used
+        if idle_for > self.max_idle:
+            self._discard(raw)
+            with self._cond:
+                self._stats["stale_reconnects"] += 1
+            return None
+        if idle_for > self.health_check_interval:
+            with self._cond:
+                self._stats["health_checks"] += 1
+            if not self.backend.ping(raw):
+                self._discard(raw)
+                with self._cond:
+                    self._stats["stale_reconnects"] += 1
+                return None
+        return raw
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _release(self, raw, broken=False):
+        if not broken:
+            try:
+                if getattr(raw, "in_transaction", False):
+                    raw.rollback()
+            except Exception:
+                broken = True
+        with self._cond:
+            if broken or self._closed:
+                self._open -= 1
+                self._stats["discarded"] += 1
+                discard = True
+            else:
+                self._idle.append((raw, time.monotonic()))
+                discard = False
+            self._cond.notify()
+        if discard:
+            self._discard(raw)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update(backend=self.backend.name, size=self.size, open=self._open,
+                         idle=len(self._idle), in_use=self._open - len(self._idle))
+        return stats
+
+    def close_all(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for raw, _ in idle:
+            self._discard(raw)
@@ -0,0 +1,208 @@
+import hashlib
+import io
+import json
+import os
+
+# ------------------ Dependency graph rendering ------------------
+# A part's graph is identified by a signature: a hash of its stage IDs and
+# dependency edges. Parts with the same routing share a signature, so each
+# distinct graph is laid out and rasterized once per batch, and its layout is
+# kept in a LayoutCache so later batches skip the layout step entirely.
+#
+# Rendering happens in worker processes (spawned, so they never inherit the GUI
+# or the parts cache) and images travel back as PNG bytes, so there are no
+# temporary files to collide.
+
+PARALLEL_MIN_GRAPHS = 8   # fewer distinct graphs than this are drawn in-process
+
+
+def graph_signature(stages):
+    """stages: iterable of (stage_id, deps). Returns (signature, canonical edges)."""
+    canonical = tuple(sorted((sid, tuple(sorted(set(deps)))) for sid, deps in stages))
+    digest = hashlib.blake2b(repr(canonical).encode("utf-8"), digest_size=16).hexdigest()
+    return digest, canonical
+
+
+class LayoutCache:
+    """Node positions per graph signature, optionally persisted as JSON files."""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._layouts = {}
+        self.hits = self.misses = 0
+
+    def get(self, signature):
+        pos = self._layouts.get(signature)
+        if pos is None and self.directory:
+            try:
+                with open(os.path.join(self.directory, signature + ".json"), encoding="utf-8") as f:
+                    pos = {node: tuple(xy) for node, xy in json.load(f).items()}
+                self._layouts[signature] = pos
+            except (OSError, ValueError):
+                pos = None
+        if pos is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return pos
+
+    def put(self, signature, pos):
+        self._layouts[signature] = pos
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, signature + ".json")
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(pos, f)
+            os.replace(tmp_path, path)
+
+    def clear(self):
+        self._layouts.clear()
+
+    def __contains__(self, signature):
+        return signature in self._layouts
+
+    def __len__(self):
+        return len(self._layouts)
+
+
+class RenderCancelled(Exception):
+    pass
+
+
+def render_graphs(graphs, layout_cache=None, workers=None, progress=None, cancel=None):
+    """Draw every distinct graph once.
+
+    graphs maps signature -> canonical edges (from graph_signature). Returns
+    {signature: png bytes}. progress(done, total) is called as graphs finish;
+    setting cancel stops the batch and raises RenderCancelled.
+    """
+    if layout_cache is None:
+        layout_cache = LayoutCache()
+    jobs = [(sig, edges, layout_cache.get(sig)) for sig, edges in graphs.items()]
+    images = {}
+
+    def collect(result):
+        sig, pos, png = result
+        if sig not in layout_cache:
+            layout_cache.put(sig, pos)
+        images[sig] = png
+        if progress:
+            progress(len(images), len(jobs))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < PARALLEL_MIN_GRAPHS:
+        for job in jobs:
+            if cancel is not None and cancel.is_set():
+                raise RenderCancelled()
+            collect(_render_job(job))
+        return images
+
+    import multiprocessing
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    # Keep a bounded number of jobs in flight so cancelling is prompt and the
+    # queue does not hold every graph at once.
+    pending = iter(jobs)
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        running = set()
+        try:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise RenderCancelled()
+                for job in pending:
+                    running.add(pool.submit(_render_job, job))
+                    if len(running) >= workers * 4:
+                        break
+                if not running:
+                    break
+                finished, running = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(future.result())
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+    return images
+
+
+def _render_job(job):
+    # Runs in a worker process: everything it needs arrives in job.
+    sig, edges, pos = job
+    G = _build_graph(edges)
+    if pos is None:
+        pos = compute_layout(G)
+    return sig, {node: (float(x), float(y)) for node, (x, y) in pos.items()}, draw_graph(G, pos)
+
+
+def _build_graph(edges):
+    import networkx as nx
+    G = nx.DiGraph()
+    for sid, deps in edges:
+        G.add_node(sid)
+        for dep in deps:
+            G.add_edge(dep, sid)
+    return G
+
+
+def compute_layout(G):
+    """Graphviz "dot" layout, or a layered layout when pygraphviz is missing."""
+    try:
+        from networkx.drawing.nx_agraph import graphviz_layout
+        return graphviz_layout(G, prog="dot")
+    except ImportError:
+        return _layered_layout(G)
+
+
+def _layered_layout(G):
+    # Same shape as dot: dependencies above their dependents, one row per level.
+    import networkx as nx
+    if not nx.is_directed_acyclic_graph(G):
+        return nx.spring_layout(G, seed=0, scale=100)
+    pos = {}
+    for depth, layer in enumerate(nx.topological_generations(G)):
+        layer = sorted(layer)
+        for i, node in enumerate(layer):
+            pos[node] = ((i - (len(layer) - 1) / 2) * 100.0, -depth * 100.0)
+    return pos
+
+
+def draw_graph(G, pos):
+    import networkx as nx
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    # Figure/Agg rather than pyplot, so this can run on any thread.
+    fig = Figure(figsize=(6, 4))
+    FigureCanvasAgg(fig)
+    nx.draw(
+        G, pos,
+        ax=fig.add_subplot(),
+        with_labels=True,
+        node_color='lightblue',
+        edge_color='gray',
+        node_size=2000,
+        font_size=10,
+        arrowsize=20
+    )
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches='tight')
+    return buf.getvalue()
+
+
+def write_graph_pages(path, pages):
+    """One PDF page per (title, png bytes). Identical images are stored once."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    width, height = A4
+    pdf = canvas.Canvas(path, pagesize=A4)
+    for title, png in pages:
+        pdf.setFont("Helvetica-Bold", 14)
+        pdf.drawString(72, height - 72, title)
+        pdf.drawImage(ImageReader(io.BytesIO(png)), (width - 400) / 2, height - 400,
+                      width=400, height=300, preserveAspectRatio=True)
+        pdf.showPage()
+    pdf.save()
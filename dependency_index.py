@@ -0,0 +1,172 @@
+from collections import defaultdict
+
+# ------------------ Dependency index ------------------
+# Kept in step with the parts cache through the cache listener hooks in
+# Project.py. For every part it stores reverse edges (stage -> stages that
+# depend on it) and, per stage, how many dependencies are still unmet (missing
+# or not done). A stage is ready when it is not done and nothing is unmet.
+# Ready stages are also filed by order and by operation, so ready-queue
+# queries cost time proportional to the answer, not to the shop.
+
+class DependencyIndex:
+    def __init__(self):
+        self.reset({})
+
+    # ---- listener hooks ----
+    def reset(self, parts):
+        self._dependents = {}   # part key -> {sid: set(dependent sids)}
+        self._unmet = {}        # part key -> {sid: unmet dependency count}
+        self._ready = set()                        # {(key, sid)}
+        self._ready_by_order = defaultdict(set)    # order_id -> {(key, sid)}
+        self._ready_by_op = defaultdict(set)       # operation -> {(key, sid)}
+        self._ready_by_order_op = defaultdict(set) # (order_id, operation) -> {(key, sid)}
+        self._ops = {}                             # (key, sid) -> ops filed under
+        for part in parts.values():
+            self.part_added(part)
+            for stage in part.stages.values():
+                self._link(part, stage)
+        for part in parts.values():
+            key = (part.pid, part.order_id)
+            unmet = self._unmet[key]
+            for stage in part.stages.values():
+                unmet[stage.sid] = self._count_unmet(part, stage)
+                self._refresh(part, stage)
+
+    def part_added(self, part):
+        key = (part.pid, part.order_id)
+        self._dependents.setdefault(key, {})
+        self._unmet.setdefault(key, {})
+
+    def part_removed(self, part):
+        key = (part.pid, part.order_id)
+        for sid in part.stages:
+            self._unfile((key, sid))
+        self._dependents.pop(key, None)
+        self._unmet.pop(key, None)
+
+    def stage_added(self, part, stage):
+        key = (part.pid, part.order_id)
+        self._link(part, stage)
+        self._unmet[key][stage.sid] = self._count_unmet(part, stage)
+        if stage.done:
+            self._dependents_changed(part, stage.sid, -1)
+        self._refresh(part, stage)
+
+    def stage_removed(self, part, stage):
+        key = (part.pid, part.order_id)
+        self._unlink(part, stage.sid, stage.deps)
+        self._unmet[key].pop(stage.sid, None)
+        self._unfile((key, stage.sid))
+        if stage.done:
+            self._dependents_changed(part, stage.sid, +1)
+
+    def stage_changed(self, part, stage, old_ops, old_deps, old_done):
+        key = (part.pid, part.order_id)
+        if old_deps != stage.deps:
+            self._unlink(part, stage.sid, old_deps)
+            self._link(part, stage)
+            self._unmet[key][stage.sid] = self._count_unmet(part, stage)
+        if old_done != stage.done:
+            self._dependents_changed(part, stage.sid, -1 if stage.done else +1)
+        if old_ops != stage.ops:
+            self._unfile((key, stage.sid))
+        self._refresh(part, stage)
+
+    # ---- queries ----
+    def is_ready(self, key, sid):
+        return (key, sid) in self._ready
+
+    def unmet_count(self, key, sid):
+        return self._unmet.get(key, {}).get(sid)
+
+    def dependents(self, key, sid):
+        return set(self._dependents.get(key, {}).get(sid, ()))
+
+    def dependents_map(self, key):
+        # Live view (sid -> dependent sids) for graph searches; do not modify.
+        return self._dependents.get(key, {})
+
+    def ready_stages(self, order_id=None, operation=None):
+        if order_id is not None and operation is not None:
+            entries = self._ready_by_order_op.get((order_id, operation), ())
+        elif order_id is not None:
+            entries = self._ready_by_order.get(order_id, ())
+        elif operation is not None:
+            entries = self._ready_by_op.get(operation, ())
+        else:
+            entries = self._ready
+        return [(key[0], key[1], sid) for key, sid in entries]
+
+    def ready_count(self, order_id=None, operation=None):
+        if order_id is not None and operation is not None:
+            return len(self._ready_by_order_op.get((order_id, operation), ()))
+        if order_id is not None:
+            return len(self._ready_by_order.get(order_id, ()))
+        if operation is not None:
+            return len(self._ready_by_op.get(operation, ()))
+        return len(self._ready)
+
+    # ---- internals ----
+    def _link(self, part, stage):
+        dependents = self._dependents[(part.pid, part.order_id)]
+        for dep in set(stage.deps):
+            if dep != stage.sid:   # a self-dependency is ignored, as in _count_unmet
+                dependents.setdefault(dep, set()).add(stage.sid)
+
+    def _unlink(self, part, sid, deps):
+        dependents = self._dependents[(part.pid, part.order_id)]
+        for dep in set(deps):
+            users = dependents.get(dep)
+            if users is not None:
+                users.discard(sid)
+                if not users:
+                    del dependents[dep]
+
+    def _count_unmet(self, part, stage):
+        stages = part.stages
+        return sum(1 for dep in set(stage.deps)
+                   if dep != stage.sid and (dep not in stages or not stages[dep].done))
+
+    def _dependents_changed(self, part, sid, delta):
+        # sid became done (-1) or stopped being done/present (+1).
+        key = (part.pid, part.order_id)
+        unmet = self._unmet[key]
+        for dependent in self._dependents[key].get(sid, ()):
+            if dependent in unmet:
+                unmet[dependent] += delta
+                self._refresh(part, part.stages[dependent])
+
+    def _refresh(self, part, stage):
+        key = (part.pid, part.order_id)
+        entry = (key, stage.sid)
+        ready = not stage.done and self._unmet[key].get(stage.sid) == 0
+        if ready and entry not in self._ready:
+            self._file(entry, part.order_id, stage.ops)
+        elif not ready and entry in self._ready:
+            self._unfile(entry)
+
+    def _file(self, entry, order_id, ops):
+        self._ready.add(entry)
+        self._ready_by_order[order_id].add(entry)
+        self._ops[entry] = ops
+        for op in set(ops):
+            self._ready_by_op[op].add(entry)
+            self._ready_by_order_op[(order_id, op)].add(entry)
+
+    def _unfile(self, entry):
+        if entry not in self._ready:
+            return
+        self._ready.discard(entry)
+        order_id = entry[0][1]
+        _discard(self._ready_by_order, order_id, entry)
+        for op in set(self._ops.pop(entry, ())):
+            _discard(self._ready_by_op, op, entry)
+            _discard(self._ready_by_order_op, (order_id, op), entry)
+
+
+def _discard(index, bucket, entry):
+    entries = index.get(bucket)
+    if entries is not None:
+        entries.discard(entry)
+        if not entries:
+            del index[bucket]
@@ -0,0 +1,123 @@
+import csv
+import os
+
+# ------------------ Streaming exports ------------------
+# Writers take an iterator of stage rows (part_id, order_id, stage_id,
+# operations, dependencies, done) and never hold more than one chunk in memory.
+# Spreadsheet formats show done as ✔/✘ like the reports; Parquet keeps a bool.
+# Output goes to "<path>.part" and is renamed into place when complete, so a
+# cancelled or failed export never leaves a truncated file behind.
+
+EXPORT_HEADERS = ["Part ID", "Order ID", "Stage ID", "Operations", "Dependencies", "Done"]
+EXPORT_FORMATS = ("xlsx", "csv", "parquet")
+EXPORT_CHUNK = 5000
+
+
+def export_format(path, fmt=None):
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt or path}")
+    return fmt
+
+
+def write_rows(path, rows, fmt=None, total=None, progress=None, cancel=None):
+    """Stream rows to path; returns the number of rows written.
+
+    Raises ExportCancelled if cancel is set while writing.
+    """
+    writer = {"xlsx": _write_xlsx, "csv": _write_csv, "parquet": _write_parquet}[export_format(path, fmt)]
+    tmp_path = path + ".part"
+    try:
+        count = writer(tmp_path, _chunks(rows, total, progress, cancel), EXPORT_HEADERS)
+        os.replace(tmp_path, path)
+        return count
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def _chunks(rows, total, progress, cancel):
+    chunk = []
+    done = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK:
+            if cancel is not None and cancel.is_set():
+                raise ExportCancelled()
+            done += len(chunk)
+            yield chunk
+            chunk = []
+            if progress:
+                progress(done, total or 0)
+    if chunk:
+        yield chunk
+
+
+def _write_xlsx(path, chunks, headers):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Parts Report")
+    ws.append(headers)
+    count = 0
+    try:
+        for chunk in chunks:
+            for row in chunk:
+                ws.append(_display(row))
+            count += len(chunk)
+    finally:
+        wb.save(path)  # also closes the sheet's temp file when stopped early
+    return count
+
+
+def write_sheets(path, sheets):
+    """Write [(title, headers, rows)] as one xlsx workbook, a sheet each."""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    for title, headers, rows in sheets:
+        ws = wb.create_sheet(title[:31])  # Excel's limit
+        ws.append(headers)
+        for row in rows:
+            ws.append(row)
+    tmp_path = path + ".part"
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_csv(path, chunks, headers):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        for chunk in chunks:
+            writer.writerows(map(_display, chunk))
+            count += len(chunk)
+    return count
+
+
+def _write_parquet(path, chunks, headers):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow. Please install pyarrow.") from None
+    names = [h.lower().replace(" ", "_") for h in headers]
+    schema = pa.schema([(name, pa.bool_() if name == "done" else pa.string()) for name in names])
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            columns = [pa.array(col, type=field.type) for col, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def _display(row):
+    return (*row[:5], "✔" if row[5] else "✘")
@@ -0,0 +1,905 @@
+from PyQt5 import QtCore, QtWidgets
+import sys, bisect, threading
+from Project import (
+    parts, cache_lock, part_index, add_cache_listener, load_from_db, close_database,
+    SYNC_INTERVAL_MS, DASHBOARD_INTERVAL_MS, sync_from_db, check_report_aggregates,
+    add_part, add_stage, complete_stage, remove_part, remove_stage, update_stage,
+    complete_stages, complete_part, complete_order,
+    validate_all_parts, bulk_import, ExportCancelled, export_stages, generate_excel_report,
+    generate_part_dependency_pdf, generate_dependency_pdfs, generate_completed_parts_pdf,
+    generate_multiple_orders_report, generate_operator_report, set_instrumentation, dump_metrics,
+    WRITE_BEHIND, enable_write_behind, replay_pending_writes, write_behind_stats, DatabaseError,
+)
+from metrics import metrics
+from write_behind import JournalLocked
+
+# The desktop front end. Project.py holds everything that works without a
+# display; this module is only imported when the window is opened.
+
+# ------------------ Table model ------------------
+TABLE_HEADERS = ["Part ID", "Order ID", "Stage ID", "Operations", "Dependencies", "Done"]
+
+class PartsTableModel(QtCore.QAbstractTableModel):
+    """One row per stage, read straight from the parts cache.
+
+    Only (part key, stage ID) is stored per row; cell text is produced when the
+    view asks for a visible cell. As a cache listener the model emits
+    fine-grained row signals, so mutations repaint only the rows they touch.
+    """
+
+    # Listener hooks may fire on worker threads; they only capture what changed
+    # and post it here, so the model itself is only touched on the GUI thread.
+    cacheEvent = QtCore.pyqtSignal(str, object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._row_of = {}
+        self.cacheEvent.connect(self._apply_cache_event)
+
+    # ---- cache listener hooks ----
+    def reset(self, cache):
+        self.cacheEvent.emit("reset", [(key, sid) for key, p in cache.items() for sid in p.stages])
+
+    def part_added(self, part):
+        pass
+
+    def part_removed(self, part):
+        key = (part.pid, part.order_id)
+        self.cacheEvent.emit("remove", [(key, sid) for sid in part.stages])
+
+    def stage_added(self, part, stage):
+        self.cacheEvent.emit("add", ((part.pid, part.order_id), stage.sid))
+
+    def stage_removed(self, part, stage):
+        self.cacheEvent.emit("remove", [((part.pid, part.order_id), stage.sid)])
+
+    def stage_changed(self, part, stage, old_ops, old_deps, old_done):
+        self.cacheEvent.emit("change", ((part.pid, part.order_id), stage.sid))
+
+    def _apply_cache_event(self, kind, payload):
+        # Events queued before a reset may already be reflected in it, so
+        # every update below is idempotent.
+        if kind == "reset":
+            self.beginResetModel()
+            self._rows = payload
+            self._row_of = None
+            self.endResetModel()
+        elif kind == "add":
+            if self._index_of(*payload) is not None:
+                return
+            row = len(self._rows)
+            self.beginInsertRows(QtCore.QModelIndex(), row, row)
+            self._rows.append(payload)
+            self._row_of[payload] = row
+            self.endInsertRows()
+        elif kind == "remove":
+            rows = sorted({row for row in (self._index_of(*entry) for entry in payload) if row is not None},
+                          reverse=True)
+            # Remove contiguous runs from the bottom up so earlier row numbers stay valid.
+            while rows:
+                last = first = rows.pop(0)
+                while rows and rows[0] == first - 1:
+                    first = rows.pop(0)
+                self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+                del self._rows[first:last + 1]
+                self._row_of = None
+                self.endRemoveRows()
+        elif kind == "change":
+            row = self._index_of(*payload)
+            if row is not None:
+                self.dataChanged.emit(self.index(row, 3), self.index(row, 5))
+
+    def _index_of(self, key, sid):
+        if self._row_of is None:  # rebuilt lazily after removals shift rows
+            self._row_of = {entry: row for row, entry in enumerate(self._rows)}
+        return self._row_of.get((key, sid))
+
+    # ---- Qt model interface ----
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(TABLE_HEADERS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return TABLE_HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole or not index.isValid():
+            return None
+        return self.cell_text(index.row(), index.column())
+
+    def cell_text(self, row, column):
+        return self._entry_text(self._rows[row], column)
+
+    def _entry_text(self, entry, column):
+        key, sid = entry
+        if column == 0:
+            return key[0]
+        if column == 1:
+            return key[1]
+        if column == 2:
+            return sid
+        part = parts.get(key)
+        stage = part.stages.get(sid) if part else None
+        if stage is None:
+            return ""
+        if column == 3:
+            return ", ".join(stage.ops)
+        if column == 4:
+            return ", ".join(stage.deps)
+        return "✔" if stage.done else "✘"
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        # Sorting here with a key function is far cheaper than letting a proxy
+        # call back into Python for every comparison.
+        self.layoutAboutToBeChanged.emit()
+        old_rows = self._rows
+        self._rows = sorted(old_rows, key=lambda entry: self._entry_text(entry, column),
+                            reverse=order == QtCore.Qt.DescendingOrder)
+        self._row_of = {entry: row for row, entry in enumerate(self._rows)}
+        old_indexes = self.persistentIndexList()
+        new_indexes = [self.index(self._row_of[old_rows[i.row()]], i.column()) for i in old_indexes]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def matching_rows(self, text):
+        text = text.lower()
+        return [row for row, ((pid, order_id), sid) in enumerate(self._rows)
+                if text in pid.lower() or text in order_id.lower() or text in sid.lower()]
+
+    def row_matches(self, row, text):
+        (pid, order_id), sid = self._rows[row]
+        text = text.lower()
+        return text in pid.lower() or text in order_id.lower() or text in sid.lower()
+
+
+class PartsFilterProxyModel(QtCore.QAbstractProxyModel):
+    """Filters PartsTableModel on part, order and stage ID.
+
+    The accepted source rows are kept as an ascending list (a range while no
+    filter is set), so mapping is O(log n) per visible cell and filtering is a
+    single pass in Python rather than one virtual call per row. Sorting is
+    delegated to the source model.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._filter = ""
+        self._rows = range(0)
+        self._pending_removal = None
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        super().setSourceModel(model)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._source_reset)
+        model.layoutAboutToBeChanged.connect(self.beginResetModel)
+        model.layoutChanged.connect(self._source_reset)
+        model.rowsAboutToBeRemoved.connect(self._source_rows_about_to_be_removed)
+        model.rowsRemoved.connect(self._source_rows_removed)
+        model.rowsInserted.connect(self._source_rows_inserted)
+        model.dataChanged.connect(self._source_data_changed)
+        self._rebuild()
+        self.endResetModel()
+
+    def set_filter(self, text):
+        self.beginResetModel()
+        self._filter = text.strip()
+        self._rebuild()
+        self.endResetModel()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def _rebuild(self):
+        source = self.sourceModel()
+        if source is None:
+            self._rows = range(0)
+        elif self._filter:
+            self._rows = source.matching_rows(self._filter)
+        else:
+            self._rows = range(source.rowCount())
+
+    def _proxy_row(self, source_row):
+        i = bisect.bisect_left(self._rows, source_row)
+        return i if i < len(self._rows) and self._rows[i] == source_row else None
+
+    # ---- source signals ----
+    def _source_reset(self):
+        self._rebuild()
+        self.endResetModel()
+
+    def _source_rows_about_to_be_removed(self, parent, first, last):
+        lo = bisect.bisect_left(self._rows, first)
+        hi = bisect.bisect_right(self._rows, last)
+        self._pending_removal = (lo, hi, last - first + 1)
+        if hi > lo:
+            self.beginRemoveRows(QtCore.QModelIndex(), lo, hi - 1)
+
+    def _source_rows_removed(self, parent, first, last):
+        lo, hi, count = self._pending_removal
+        self._pending_removal = None
+        if isinstance(self._rows, range):
+            self._rows = range(len(self._rows) - count)
+        else:
+            self._rows[lo:] = [row - count for row in self._rows[hi:]]
+        if hi > lo:
+            self.endRemoveRows()
+
+    def _source_rows_inserted(self, parent, first, last):
+        count = last - first + 1
+        pos = bisect.bisect_left(self._rows, first)
+        if isinstance(self._rows, range):
+            self.beginInsertRows(QtCore.QModelIndex(), first, last)
+            self._rows = range(len(self._rows) + count)
+            self.endInsertRows()
+            return
+        source = self.sourceModel()
+        added = [row for row in range(first, last + 1) if source.row_matches(row, self._filter)]
+        tail = [row + count for row in self._rows[pos:]]
+        if added:
+            self.beginInsertRows(QtCore.QModelIndex(), pos, pos + len(added) - 1)
+        self._rows[pos:] = added + tail
+        if added:
+            self.endInsertRows()
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        for source_row in range(top_left.row(), bottom_right.row() + 1):
+            row = self._proxy_row(source_row)
+            if row is not None:
+                self.dataChanged.emit(self.index(row, top_left.column()), self.index(row, bottom_right.column()))
+
+    # ---- Qt proxy interface ----
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QtCore.QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QtCore.QModelIndex()
+        row = self._proxy_row(source_index.row())
+        return QtCore.QModelIndex() if row is None else self.index(row, source_index.column())
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self._rows)) or not (0 <= column < self.columnCount()):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        return QtCore.QModelIndex()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        source = self.sourceModel()
+        return 0 if parent.isValid() or source is None else source.columnCount()
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Vertical:
+            return section + 1 if role == QtCore.Qt.DisplayRole else None
+        source = self.sourceModel()
+        return source.headerData(section, orientation, role) if source is not None else None
+
+# ------------------ Background tasks ------------------
+class TaskSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+    progress = QtCore.pyqtSignal(int, int)
+
+class Task(QtCore.QRunnable):
+    """Runs fn(*args, **kwargs) on the thread pool and reports back through signals.
+
+    With with_progress=True, fn also receives progress(done, total) and a
+    cancel event it is expected to poll.
+    """
+
+    def __init__(self, fn, *args, with_progress=False, **kwargs):
+        super().__init__()
+        self.fn, self.args, self.kwargs = fn, args, kwargs
+        self.signals = TaskSignals()
+        self.cancel_event = threading.Event()
+        if with_progress:
+            self.kwargs.update(progress=self.signals.progress.emit, cancel=self.cancel_event)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(f"❌ {type(e).__name__}: {e}")
+            return
+        self.signals.finished.emit(result)
+
+class Ui_MainWindow(object):
+    def setupUi(self, MainWindow):
+        MainWindow.setObjectName("MainWindow")
+        MainWindow.resize(800, 600)
+
+        self.centralwidget = QtWidgets.QWidget(MainWindow)
+
+        # ---- Main Layout ----
+        mainLayout = QtWidgets.QVBoxLayout(self.centralwidget)
+
+        # ---- Part Info ----
+        partBox = QtWidgets.QGroupBox("Part Info")
+        partLayout = QtWidgets.QHBoxLayout(partBox)
+        partLayout.addWidget(QtWidgets.QLabel("Part ID:"))
+        self.partInput = QtWidgets.QLineEdit()
+        partLayout.addWidget(self.partInput)
+        partLayout.addWidget(QtWidgets.QLabel("Order ID:"))
+        self.orderInput = QtWidgets.QLineEdit()
+        partLayout.addWidget(self.orderInput)
+        mainLayout.addWidget(partBox)
+
+        # ---- Stage Info ----
+        stageBox = QtWidgets.QGroupBox("Stage Info")
+        stageLayout = QtWidgets.QGridLayout(stageBox)
+        stageLayout.addWidget(QtWidgets.QLabel("Stage ID:"), 0, 0)
+        self.stageInput = QtWidgets.QLineEdit()
+        stageLayout.addWidget(self.stageInput, 0, 1)
+        stageLayout.addWidget(QtWidgets.QLabel("Operations:"), 0, 2)
+        self.opsInput = QtWidgets.QLineEdit()
+        stageLayout.addWidget(self.opsInput, 0, 3)
+        stageLayout.addWidget(QtWidgets.QLabel("Dependencies:"), 1, 0)
+        self.depsInput = QtWidgets.QLineEdit()
+        stageLayout.addWidget(self.depsInput, 1, 1, 1, 3)
+        mainLayout.addWidget(stageBox)
+
+        # ---- Operator Info ----
+        operatorBox = QtWidgets.QGroupBox("Operator Info")
+        operatorLayout = QtWidgets.QHBoxLayout(operatorBox)
+        operatorLayout.addWidget(QtWidgets.QLabel("First Name:"))
+        self.firstNameInput = QtWidgets.QLineEdit()
+        operatorLayout.addWidget(self.firstNameInput)
+        operatorLayout.addWidget(QtWidgets.QLabel("Last Name:"))
+        self.lastNameInput = QtWidgets.QLineEdit()
+        operatorLayout.addWidget(self.lastNameInput)
+        mainLayout.addWidget(operatorBox)
+
+        # ---- Action Buttons ----
+        buttonLayout = QtWidgets.QGridLayout()
+        self.addPartBtn = QtWidgets.QPushButton("Add Part")
+        self.addStageBtn = QtWidgets.QPushButton("Add Stage")
+        self.completeStageBtn = QtWidgets.QPushButton("Complete Stage")
+        self.completeUpstreamBtn = QtWidgets.QPushButton("Complete With Dependencies")
+        self.completeUpstreamBtn.setToolTip("Complete the stage and everything it depends on; "
+                                            "leave Stage ID blank for the whole part, or Part ID for the whole order")
+        self.listPartsBtn = QtWidgets.QPushButton("List Parts")
+        buttonLayout.addWidget(self.addPartBtn, 0, 0)
+        buttonLayout.addWidget(self.addStageBtn, 0, 1)
+        buttonLayout.addWidget(self.completeStageBtn, 0, 2)
+        buttonLayout.addWidget(self.completeUpstreamBtn, 0, 3)
+        buttonLayout.addWidget(self.listPartsBtn, 0, 4)
+        mainLayout.addLayout(buttonLayout)
+
+        # ---- PDF Buttons ----
+        pdfLayout = QtWidgets.QHBoxLayout()
+        self.depPdfBtn = QtWidgets.QPushButton("Part Dependency PDF")
+        self.completedPdfBtn = QtWidgets.QPushButton("Completed Parts Report")
+        self.multiPdfBtn = QtWidgets.QPushButton("Multiple Orders Report")
+        self.orderGraphsBtn = QtWidgets.QPushButton("Order Dependency PDFs")
+        self.operatorPdfBtn = QtWidgets.QPushButton("Operator Workload Report")
+        pdfLayout.addWidget(self.depPdfBtn)
+        pdfLayout.addWidget(self.completedPdfBtn)
+        pdfLayout.addWidget(self.multiPdfBtn)
+        pdfLayout.addWidget(self.orderGraphsBtn)
+        pdfLayout.addWidget(self.operatorPdfBtn)
+        mainLayout.addLayout(pdfLayout)
+
+        # ---- Remove/Update Buttons ----
+        crudLayout = QtWidgets.QHBoxLayout()
+        self.removePartBtn = QtWidgets.QPushButton("Remove Part")
+        self.removeStageBtn = QtWidgets.QPushButton("Remove Stage")
+        self.updateStageBtn = QtWidgets.QPushButton("Update Stage")
+        self.importBtn = QtWidgets.QPushButton("Bulk Import")
+        self.validateBtn = QtWidgets.QPushButton("Validate All")
+        self.exportBtn = QtWidgets.QPushButton("Export Data")
+        crudLayout.addWidget(self.removePartBtn)
+        crudLayout.addWidget(self.removeStageBtn)
+        crudLayout.addWidget(self.updateStageBtn)
+        crudLayout.addWidget(self.importBtn)
+        crudLayout.addWidget(self.validateBtn)
+        crudLayout.addWidget(self.exportBtn)
+        self.diagnosticsBtn = QtWidgets.QPushButton("Diagnostics")
+        crudLayout.addWidget(self.diagnosticsBtn)
+        mainLayout.addLayout(crudLayout)
+
+        # ---- Excel Report Button (hidden at first) ----
+        self.excelBtn = QtWidgets.QPushButton("Generate Excel Report")
+        self.excelBtn.setVisible(False)  # hidden until list is clicked
+        self.excelBtn.setFixedWidth(self.excelBtn.sizeHint().width() + 20)  # make it compact
+
+        # Apply a "bulging" style
+        self.excelBtn.setStyleSheet("""
+            QPushButton {
+                background-color: #4CAF50;   /* green */
+                color: white;
+                font-weight: bold;
+                border-radius: 12px;
+                padding: 6px 5px;
+            }
+            QPushButton:hover {
+                background-color: #45a049;   /* darker green */
+            }
+            QPushButton:pressed {
+                background-color: #3e8e41;   /* even darker when clicked */
+            }
+        """)
+
+        mainLayout.addWidget(self.excelBtn)
+
+        # ---- Dashboard ----
+        dashboardBox = QtWidgets.QGroupBox("Dashboard")
+        dashboardLayout = QtWidgets.QVBoxLayout(dashboardBox)
+        summaryLayout = QtWidgets.QHBoxLayout()
+        self.dashboardSummary = QtWidgets.QLabel()
+        summaryLayout.addWidget(self.dashboardSummary, 1)
+        self.checkAggregatesBtn = QtWidgets.QPushButton("Check Aggregates")
+        summaryLayout.addWidget(self.checkAggregatesBtn)
+        dashboardLayout.addLayout(summaryLayout)
+        self.dashboardTable = QtWidgets.QTableWidget(0, 5)
+        self.dashboardTable.setHorizontalHeaderLabels(["Order ID", "Parts", "Completed Parts", "Stages Done", "Progress"])
+        self.dashboardTable.horizontalHeader().setStretchLastSection(True)
+        self.dashboardTable.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.dashboardTable.setMaximumHeight(150)
+        dashboardLayout.addWidget(self.dashboardTable)
+        mainLayout.addWidget(dashboardBox)
+
+        # ---- Filter for the parts table ----
+        filterLayout = QtWidgets.QHBoxLayout()
+        filterLayout.addWidget(QtWidgets.QLabel("Filter:"))
+        self.filterInput = QtWidgets.QLineEdit()
+        self.filterInput.setPlaceholderText("Part, order or stage ID")
+        filterLayout.addWidget(self.filterInput)
+        mainLayout.addLayout(filterLayout)
+
+        # ---- Table for displaying parts ----
+        self.partsTable = QtWidgets.QTableView()
+        self.partsTable.setSortingEnabled(True)
+        self.partsTable.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.partsTable.horizontalHeader().setStretchLastSection(True)
+        mainLayout.addWidget(self.partsTable)
+
+        MainWindow.setCentralWidget(self.centralwidget)
+        MainWindow.setWindowTitle("Production Manager")
+
+# ------------------ Diagnostics ------------------
+METRIC_HEADERS = ["Name", "Calls", "Errors", "Rows", "p50 (ms)", "p95 (ms)", "Max (ms)", "Mean (ms)"]
+
+class DiagnosticsDialog(QtWidgets.QDialog):
+    """Live view of the hot-path metrics: per-operation and per-statement
+    latency, error and row counts, and the slow-query log."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostics")
+        self.resize(760, 560)
+        layout = QtWidgets.QVBoxLayout(self)
+
+        controls = QtWidgets.QHBoxLayout()
+        self.enabledBox = QtWidgets.QCheckBox("Enable instrumentation")
+        self.enabledBox.setChecked(metrics.enabled)
+        controls.addWidget(self.enabledBox)
+        controls.addWidget(QtWidgets.QLabel("Slow query (ms):"))
+        self.thresholdInput = QtWidgets.QSpinBox()
+        self.thresholdInput.setRange(0, 600000)
+        self.thresholdInput.setValue(int(metrics.slow_query_threshold * 1000))
+        controls.addWidget(self.thresholdInput)
+        controls.addStretch(1)
+        self.resetBtn = QtWidgets.QPushButton("Reset")
+        self.dumpBtn = QtWidgets.QPushButton("Dump Metrics...")
+        controls.addWidget(self.resetBtn)
+        controls.addWidget(self.dumpBtn)
+        layout.addLayout(controls)
+
+        self.operationsTable = self._table()
+        self.queriesTable = self._table()
+        self.slowList = QtWidgets.QListWidget()
+        layout.addWidget(QtWidgets.QLabel("Operations"))
+        layout.addWidget(self.operationsTable, 2)
+        layout.addWidget(QtWidgets.QLabel("SQL statements"))
+        layout.addWidget(self.queriesTable, 1)
+        layout.addWidget(QtWidgets.QLabel("Slow queries (newest first)"))
+        layout.addWidget(self.slowList, 1)
+        self.writeBehindLabel = QtWidgets.QLabel()
+        layout.addWidget(self.writeBehindLabel)
+
+        self.enabledBox.toggled.connect(self.handle_toggle)
+        self.thresholdInput.valueChanged.connect(self.handle_toggle)
+        self.resetBtn.clicked.connect(self.handle_reset)
+        self.dumpBtn.clicked.connect(self.handle_dump)
+        self.refreshTimer = QtCore.QTimer(self)
+        self.refreshTimer.timeout.connect(self.refresh)
+
+    def _table(self):
+        table = QtWidgets.QTableWidget(0, len(METRIC_HEADERS))
+        table.setHorizontalHeaderLabels(METRIC_HEADERS)
+        table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.ResizeToContents)
+        table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+        return table
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refreshTimer.start(1000)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refreshTimer.stop()
+        super().hideEvent(event)
+
+    def handle_toggle(self, *_):
+        set_instrumentation(self.enabledBox.isChecked(), self.thresholdInput.value() / 1000)
+        self.refresh()
+
+    def handle_reset(self):
+        metrics.reset()
+        self.refresh()
+
+    def handle_dump(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(self, "Dump Metrics", "metrics.json", "JSON (*.json)")
+        if path:
+            try:
+                QtWidgets.QMessageBox.information(self, "Dump Metrics", dump_metrics(path))
+            except OSError as e:
+                QtWidgets.QMessageBox.warning(self, "Dump Metrics", f"❌ {e}")
+
+    def refresh(self):
+        snapshot = metrics.snapshot()
+        self._fill(self.operationsTable, snapshot["operations"])
+        self._fill(self.queriesTable, snapshot["queries"])
+        slow = [f"{q['at']}  {q['seconds'] * 1000:.1f} ms  {q['sql']}  {q['params']}"
+                + ("  (failed)" if q["error"] else "")
+                for q in reversed(snapshot["slow_queries"])]
+        if slow != [self.slowList.item(i).text() for i in range(self.slowList.count())]:
+            self.slowList.clear()
+            self.slowList.addItems(slow)
+
+        queue = write_behind_stats()
+        if not queue:
+            self.writeBehindLabel.setText("Write-behind: off")
+        else:
+            self.writeBehindLabel.setText(
+                f"Write-behind: {queue['pending']} pending, {queue['written']} saved in {queue['batches']} batches"
+                + (f" · ⚠ {queue['last_error']}" if queue["last_error"] else ""))
+
+    @staticmethod
+    def _fill(table, summaries):
+        table.setRowCount(len(summaries))
+        for row, (name, s) in enumerate(summaries.items()):
+            values = [name, str(s["count"]), str(s["errors"]), str(s["rows"])]
+            values += [f"{s[k] * 1000:.2f}" for k in ("p50_s", "p95_s", "max_s", "mean_s")]
+            for col, value in enumerate(values):
+                item = table.item(row, col)
+                if item is None:
+                    table.setItem(row, col, QtWidgets.QTableWidgetItem(value))
+                elif item.text() != value:
+                    item.setText(value)
+
+# ------------------ Application ------------------
+class MyApp(QtWidgets.QMainWindow, Ui_MainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setupUi(self)
+
+        self.addPartBtn.clicked.connect(self.handle_add_part)
+        self.addStageBtn.clicked.connect(self.handle_add_stage)
+        self.completeStageBtn.clicked.connect(self.handle_complete_stage)
+        self.completeUpstreamBtn.clicked.connect(self.handle_complete_upstream)
+        self.listPartsBtn.clicked.connect(self.handle_list_parts)
+        self.depPdfBtn.clicked.connect(self.handle_dep_pdf)
+        self.completedPdfBtn.clicked.connect(self.handle_completed_pdf)
+        self.multiPdfBtn.clicked.connect(self.handle_multi_pdf)
+        self.orderGraphsBtn.clicked.connect(self.handle_order_graphs)
+        self.operatorPdfBtn.clicked.connect(self.handle_operator_pdf)
+        self.removePartBtn.clicked.connect(self.handle_remove_part)
+        self.removeStageBtn.clicked.connect(self.handle_remove_stage)
+        self.updateStageBtn.clicked.connect(self.handle_update_stage)
+        self.importBtn.clicked.connect(self.handle_bulk_import)
+        self.validateBtn.clicked.connect(self.handle_validate_all)
+        self.checkAggregatesBtn.clicked.connect(self.handle_check_aggregates)
+        self.exportBtn.clicked.connect(self.handle_export)
+        self.diagnosticsBtn.clicked.connect(self.handle_diagnostics)
+        self.diagnostics = None
+
+        self.partsModel = None
+        self.partsProxy = PartsFilterProxyModel(self)
+        self.filterTimer = QtCore.QTimer(self)
+        self.filterTimer.setSingleShot(True)
+        self.filterTimer.setInterval(300)
+        self.filterTimer.timeout.connect(self.apply_filter)
+        self.filterInput.textChanged.connect(self.handle_filter_changed)
+
+        self.threadPool = QtCore.QThreadPool.globalInstance()
+        self._tasks = set()
+        self._syncing = False
+        self.syncTimer = QtCore.QTimer(self)
+        self.syncTimer.timeout.connect(self.handle_sync)
+        self.syncTimer.start(SYNC_INTERVAL_MS)
+
+        self.dashboardTimer = QtCore.QTimer(self)
+        self.dashboardTimer.timeout.connect(self.refresh_dashboard)
+        self.dashboardTimer.start(DASHBOARD_INTERVAL_MS)
+        self.refresh_dashboard()
+
+    def run_task(self, title, fn, *args, on_done=None, on_error=None, with_progress=False, **kwargs):
+        """Run fn on the worker pool; on_done(result) runs back on the GUI thread.
+
+        By default the result string (or the error) is shown in a message box
+        titled title. Long jobs get a progress dialog with a Cancel button.
+        """
+        task = Task(fn, *args, with_progress=with_progress, **kwargs)
+        self._tasks.add(task)
+        dialog = None
+        if with_progress:
+            dialog = QtWidgets.QProgressDialog(f"{title}...", "Cancel", 0, 0, self)
+            dialog.setWindowTitle(title)
+            dialog.setMinimumDuration(500)
+            dialog.canceled.connect(task.cancel_event.set)
+            task.signals.progress.connect(lambda done, total: (dialog.setMaximum(total), dialog.setValue(done)))
+
+        def finish(callback, value):
+            self._tasks.discard(task)
+            if dialog is not None:
+                dialog.reset()
+            callback(value)
+
+        if on_done is None:
+            on_done = lambda msg: QtWidgets.QMessageBox.information(self, title, msg)
+        if on_error is None:
+            on_error = lambda msg: QtWidgets.QMessageBox.warning(self, title, msg)
+        task.signals.finished.connect(lambda result: finish(on_done, result))
+        task.signals.failed.connect(lambda error: finish(on_error, error))
+        self.threadPool.start(task)
+        return task
+
+    def handle_sync(self):
+        if self._syncing:
+            return
+        self._syncing = True
+
+        def done(_result):
+            self._syncing = False
+
+        def failed(error):
+            self._syncing = False
+            print(f"❌ Error while syncing: {error}")
+
+        self.run_task("Sync", sync_from_db, on_done=done, on_error=failed)
+
+    def handle_add_part(self):
+        self.run_task("Add Part", add_part, self.partInput.text().strip(), self.orderInput.text().strip())
+
+    def handle_add_stage(self):
+        pid = self.partInput.text().strip()
+        order_id = self.orderInput.text().strip()
+        sid = self.stageInput.text().strip()
+        ops = self.opsInput.text().strip()
+        deps = self.depsInput.text().strip()
+        operator_first = self.firstNameInput.text().strip()
+        operator_last = self.lastNameInput.text().strip()
+
+        self.run_task("Add Stage", add_stage, pid, order_id, sid, ops, deps, operator_first, operator_last)
+
+    def handle_complete_stage(self):
+        self.run_task("Complete Stage", complete_stage,
+            self.partInput.text().strip(),
+            self.orderInput.text().strip(),
+            self.stageInput.text().strip()
+        )
+
+    def handle_complete_upstream(self):
+        pid, order_id, sid = self.partInput.text().strip(), self.orderInput.text().strip(), self.stageInput.text().strip()
+        if not order_id:
+            QtWidgets.QMessageBox.warning(self, "Warning", "⚠ Order ID cannot be blank.")
+            return
+        if sid and pid:
+            self.run_task("Complete Stages", complete_stages, [(pid, order_id, sid)])
+            return
+        what = f"every stage of part {pid} (Order {order_id})" if pid else f"every stage of order {order_id}"
+        reply = QtWidgets.QMessageBox.question(self, "Confirm", f"Complete {what}?",
+            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
+        if reply != QtWidgets.QMessageBox.Yes:
+            return
+        if pid:
+            self.run_task("Complete Stages", complete_part, pid, order_id)
+        else:
+            self.run_task("Complete Stages", complete_order, order_id)
+
+    def handle_list_parts(self):
+        # Show Excel button
+        self.excelBtn.setVisible(True)
+        self.excelBtn.clicked.disconnect() if self.excelBtn.receivers(self.excelBtn.clicked) > 0 else None
+        self.excelBtn.clicked.connect(self.handle_excel_report)
+
+        # Attach the live model on first use; it then tracks every cache change itself.
+        if self.partsModel is None:
+            self.partsModel = PartsTableModel(self)
+            add_cache_listener(self.partsModel)
+            self.partsProxy.setSourceModel(self.partsModel)
+            self.partsTable.horizontalHeader().setSortIndicator(-1, QtCore.Qt.AscendingOrder)
+            self.partsTable.setModel(self.partsProxy)
+
+        if self.partsModel.rowCount() == 0:
+            QtWidgets.QMessageBox.information(self, "Parts", "⚠ No parts available.")
+
+    def handle_filter_changed(self):
+        self.filterTimer.start()
+
+    def apply_filter(self):
+        self.partsProxy.set_filter(self.filterInput.text())
+
+    def handle_excel_report(self):
+        def done(filename):
+            if filename:
+                QtWidgets.QMessageBox.information(self, "Excel Report", f"✅ Excel file created: {filename}")
+            else:
+                QtWidgets.QMessageBox.information(self, "Excel Report", "⚠ Report cancelled.")
+        self.run_task("Excel Report", generate_excel_report, on_done=done, with_progress=True)
+
+    def handle_dep_pdf(self):
+        self.run_task("PDF", generate_part_dependency_pdf,
+                      (self.partInput.text().strip(), self.orderInput.text().strip()))
+
+    def handle_completed_pdf(self):
+        self.run_task("PDF", generate_completed_parts_pdf, with_progress=True)
+
+    def handle_multi_pdf(self):
+        self.run_task("PDF", generate_multiple_orders_report, with_progress=True)
+
+    def handle_operator_pdf(self):
+        # Limited to the order in the Order ID box, if any.
+        self.run_task("PDF", generate_operator_report, order_id=self.orderInput.text().strip() or None)
+
+    def handle_order_graphs(self):
+        order_id = self.orderInput.text().strip()
+        if not order_id:
+            QtWidgets.QMessageBox.warning(self, "PDF", "⚠ Order ID cannot be blank.")
+            return
+        self.run_task("PDF", generate_dependency_pdfs, order_id, with_progress=True)
+
+    def handle_remove_part(self):
+        pid, order_id = self.partInput.text().strip(), self.orderInput.text().strip()
+        reply = QtWidgets.QMessageBox.question(self, "Confirm",
+            f"Delete part {pid} (Order {order_id}) and all its stages?",
+            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
+        if reply == QtWidgets.QMessageBox.Yes:
+            self.run_task("Remove Part", remove_part, pid, order_id)
+
+    def handle_remove_stage(self):
+        pid, order_id, sid = self.partInput.text().strip(), self.orderInput.text().strip(), self.stageInput.text().strip()
+        reply = QtWidgets.QMessageBox.question(self, "Confirm",
+            f"Delete stage {sid} from part {pid} (Order {order_id})?",
+            QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No)
+        if reply == QtWidgets.QMessageBox.Yes:
+            self.run_task("Remove Stage", remove_stage, pid, order_id, sid)
+
+    def handle_update_stage(self):
+        self.run_task("Update Stage", update_stage,
+            self.partInput.text().strip(),
+            self.orderInput.text().strip(),
+            self.stageInput.text().strip(),
+            self.opsInput.text().strip(),
+            self.depsInput.text().strip()
+        )
+
+    def refresh_dashboard(self):
+        # Aggregates are read straight from the index; skip this tick rather
+        # than block the GUI if a worker holds the lock.
+        if not cache_lock.acquire(blocking=False):
+            return
+        try:
+            totals = part_index.totals()
+            progress = sorted((oid, part_index.order_progress(oid)) for oid in part_index.order_ids())
+        finally:
+            cache_lock.release()
+
+        self.dashboardSummary.setText(
+            f"{totals.parts} parts, {totals.complete_parts} completed · "
+            f"{totals.done_stages}/{totals.stages} stages done ({totals.percent:.1f}%)")
+        self.dashboardTable.setRowCount(len(progress))
+        for row, (oid, p) in enumerate(progress):
+            values = [oid, str(p.parts), str(p.complete_parts), f"{p.done_stages}/{p.stages}", f"{p.percent:.1f}%"]
+            for col, value in enumerate(values):
+                item = self.dashboardTable.item(row, col)
+                if item is None:
+                    self.dashboardTable.setItem(row, col, QtWidgets.QTableWidgetItem(value))
+                elif item.text() != value:
+                    item.setText(value)
+
+    def handle_check_aggregates(self):
+        def done(mismatches):
+            if mismatches:
+                QtWidgets.QMessageBox.warning(self, "Check Aggregates",
+                    "❌ Out of step with the data: " + ", ".join(mismatches))
+            else:
+                QtWidgets.QMessageBox.information(self, "Check Aggregates", "✅ Report aggregates are consistent.")
+        self.run_task("Check Aggregates", check_report_aggregates, on_done=done)
+
+    def handle_validate_all(self):
+        self.run_task("Validate All", validate_all_parts, on_done=self.show_validation)
+
+    def show_validation(self, violations):
+        if not violations:
+            QtWidgets.QMessageBox.information(self, "Validate All", "✅ All dependencies are valid.")
+            return
+        msg = f"❌ {len(violations)} dependency problems found."
+        for pid, order_id, sid, problem in violations[:10]:
+            msg += f"\nPart {pid} (Order {order_id}), stage {sid}: {problem}"
+        if len(violations) > 10:
+            msg += f"\n... and {len(violations) - 10} more."
+        QtWidgets.QMessageBox.warning(self, "Validate All", msg)
+
+    def handle_bulk_import(self):
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Bulk Import", "", "Parts data (*.csv *.xlsx)")
+        if path:
+            self.run_task("Bulk Import", bulk_import, path, on_done=self.show_import_report)
+
+    def handle_export(self):
+        path, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Export Data", "stages.csv", "CSV (*.csv);;Excel (*.xlsx);;Parquet (*.parquet)")
+        if not path:
+            return
+
+        def export(progress=None, cancel=None):
+            try:
+                count = export_stages(path, progress=progress, cancel=cancel)
+            except ExportCancelled:
+                return "⚠ Export cancelled."
+            return f"✅ {count} stages exported to {path}"
+
+        self.run_task("Export Data", export, with_progress=True)
+
+    def handle_diagnostics(self):
+        if self.diagnostics is None:
+            self.diagnostics = DiagnosticsDialog(self)
+        self.diagnostics.show()
+        self.diagnostics.raise_()
+
+    def show_import_report(self, report):
+        msg = report.summary()
+        for row_number, error in report.errors[:10]:
+            msg += f"\nRow {row_number}: {error}"
+        if len(report.errors) > 10:
+            msg += f"\n... and {len(report.errors) - 10} more."
+        QtWidgets.QMessageBox.information(self, "Bulk Import", msg)
+
+# ------------------ Run ------------------
+def main(argv=None):
+    app = QtWidgets.QApplication(sys.argv if argv is None else argv)
+    loading = QtWidgets.QProgressDialog("Loading production data...", None, 0, 0)
+    loading.setWindowTitle("Production Manager")
+    loading.setMinimumDuration(500)
+
+    def show_load_progress(loaded, total):
+        loading.setMaximum(total)
+        loading.setValue(loaded)
+        app.processEvents()
+
+    # Writes a crashed session left in the journal go in before the load.
+    try:
+        if WRITE_BEHIND:
+            enable_write_behind()
+        else:
+            replay_pending_writes()
+    except DatabaseError as e:
+        print(f"❌ Could not save journaled writes: {e}")
+    except JournalLocked as e:
+        print(f"⚠ Not using the write-behind journal: {e}")
+    load_from_db(progress=show_load_progress)
+    loading.close()
+    window = MyApp()
+    window.show()
+    exit_code = app.exec_()
+    QtCore.QThreadPool.globalInstance().waitForDone()
+    close_database()
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import bisect
+import functools
+import json
+import threading
+import time
+from collections import deque
+
+# ------------------ Instrumentation ------------------
+# Off by default. When off, instrumented functions cost one attribute check
+# and database cursors are not wrapped at all. When on, every public
+# operation and every SQL statement lands in a latency histogram, together
+# with call, error and row counts. Statements slower than
+# slow_query_threshold also go to a bounded slow-query log.
+
+# Bucket upper bounds in seconds: 0.1 ms doubling up to about 105 s.
+BUCKETS = [0.0001 * 2 ** i for i in range(21)]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = self.errors = self.rows = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds, rows=None, error=False):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if error:
+            self.errors += 1
+        if rows is not None and rows > 0:
+            self.rows += rows
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (0 < q <= 1)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(BUCKETS[i], self.max) if i < len(BUCKETS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "error_rate": self.errors / self.count if self.count else 0.0,
+            "rows": self.rows,
+            "mean_s": self.total / self.count if self.count else 0.0,
+            "p50_s": self.percentile(0.5),
+            "p95_s": self.percentile(0.95),
+            "p99_s": self.percentile(0.99),
+            "max_s": self.max,
+            "buckets": {f"{bound:g}": n for bound, n in zip(BUCKETS + [float("inf")], self.counts) if n},
+        }
+
+
+class Metrics:
+    def __init__(self, slow_query_threshold=0.25, slow_log_size=200):
+        self.enabled = False
+        self.slow_query_threshold = slow_query_threshold
+        self._lock = threading.Lock()
+        self._slow_log_size = slow_log_size
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.operations = {}    # name -> Histogram
+            self.queries = {}       # first SQL keyword -> Histogram
+            self.slow_queries = deque(maxlen=self._slow_log_size)
+            self.started = time.time()
+
+    def observe(self, name, seconds, rows=None, error=False):
+        with self._lock:
+            histogram = self.operations.get(name)
+            if histogram is None:
+                histogram = self.operations[name] = Histogram()
+            histogram.add(seconds, rows, error)
+
+    def observe_query(self, sql, params, seconds, rowcount, error):
+        # Signature matches ConnectionPool.query_observer.
+        kind = "SQL " + (sql.split(None, 1)[0].upper() if sql.strip() else "?")
+        with self._lock:
+            histogram = self.queries.get(kind)
+            if histogram is None:
+                histogram = self.queries[kind] = Histogram()
+            histogram.add(seconds, rowcount, error)
+            if seconds >= self.slow_query_threshold:
+                self.slow_queries.append({
+                    "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "seconds": seconds,
+                    "sql": " ".join(sql.split()),
+                    "params": _describe_params(params),
+                    "rows": rowcount,
+                    "error": error,
+                })
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "since": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+                "slow_query_threshold_s": self.slow_query_threshold,
+                "operations": {name: h.summary() for name, h in sorted(self.operations.items())},
+                "queries": {name: h.summary() for name, h in sorted(self.queries.items())},
+                "slow_queries": list(self.slow_queries),
+            }
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+        return path
+
+
+def _describe_params(params):
+    # executemany passes a list of rows; keep the log entry small.
+    if isinstance(params, list) and params and isinstance(params[0], (tuple, list)):
+        return f"{len(params)} rows, first {params[0]!r}"[:300]
+    return repr(params)[:300]
+
+
+metrics = Metrics()
+
+
+def instrumented(fn=None, rows=None, failed=None):
+    """Time fn into metrics.operations under its name while metrics.enabled.
+
+    rows(result) gives the row count to record; failed(result) says whether a
+    returned result is an error. By default a status string starting with ❌
+    counts as an error, and so does any exception.
+    """
+    if fn is None:
+        return lambda f: instrumented(f, rows, failed)
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            metrics.observe(name, time.perf_counter() - start, error=True)
+            raise
+        elapsed = time.perf_counter() - start
+        error = failed(result) if failed else isinstance(result, str) and result.startswith("❌")
+        metrics.observe(name, elapsed, rows(result) if rows else None, error)
+        return result
+    return wrapper
@@ -0,0 +1,133 @@
+from collections import namedtuple
+
+import numpy as np
+
+# ------------------ Operator analytics ------------------
+# Workload figures start from the parts cache reduced to counts of distinct
+# (operator, operations, done) triples. Operators and operation tuples are
+# interned and few, so millions of stages reduce to a few thousand triples in
+# one C-level counting pass, and every figure below is a NumPy reduction over
+# those counts. Throughput comes from the database's completion times, already
+# grouped by operator and day on the server.
+
+UNASSIGNED = "(unassigned)"
+PERIODS = ("day", "week", "month")
+
+OperatorLoad = namedtuple("OperatorLoad", "operator assigned completed pending percent")
+
+
+def operator_name(operator):
+    """Display name for an interned (first, last) operator."""
+    return " ".join(p for p in operator if p) or UNASSIGNED
+
+
+def _codes(values):
+    # Index of every value in the sorted list of distinct values.
+    names = sorted(set(values))
+    index = {name: i for i, name in enumerate(names)}
+    return names, np.fromiter((index[v] for v in values), np.intp, len(values))
+
+
+class OperatorWorkload:
+    """Per-operator counts from {(operator, ops, done): stages}."""
+
+    def __init__(self, triples):
+        keys = list(triples)
+        counts = np.fromiter(triples.values(), np.int64, len(keys))
+        done = np.fromiter((k[2] for k in keys), bool, len(keys))
+        self.operators, operator = _codes([operator_name(k[0]) for k in keys])
+        op_tuples = sorted({k[1] for k in keys})
+        tuple_index = {ops: i for i, ops in enumerate(op_tuples)}
+        ops = np.fromiter((tuple_index[k[1]] for k in keys), np.intp, len(keys))
+        self.operations = sorted({op for t in op_tuples for op in t})
+
+        n = len(self.operators)
+        self.assigned = np.bincount(operator, counts, n).astype(np.int64)
+        self.completed = np.bincount(operator[done], counts[done], n).astype(np.int64)
+        self.pending = self.assigned - self.completed
+
+        # stages[operator, tuple] @ uses[tuple, operation] = stages using each operation
+        operation_index = {op: i for i, op in enumerate(self.operations)}
+        uses = np.zeros((len(op_tuples), len(self.operations)), np.int64)
+        for t, tup in enumerate(op_tuples):
+            uses[t, [operation_index[op] for op in set(tup)]] = 1
+        stages = np.zeros((2, n, len(op_tuples)), np.int64)
+        np.add.at(stages, (done.astype(np.intp), operator, ops), counts)
+        self.pending_mix, self.completed_mix = stages @ uses
+
+    @property
+    def total_stages(self):
+        return int(self.assigned.sum())
+
+    def loads(self):
+        """OperatorLoad per operator, most pending work first."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            percent = np.where(self.assigned > 0, 100.0 * self.completed / self.assigned, 0.0)
+        order = np.lexsort((np.arange(len(self.operators)), -self.pending))
+        return [OperatorLoad(self.operators[i], int(self.assigned[i]), int(self.completed[i]),
+                             int(self.pending[i]), round(float(percent[i]), 1)) for i in order]
+
+    def overloaded(self, factor=1.5):
+        """Names of assigned operators whose pending stages exceed factor times
+        the mean over operators with pending work."""
+        named = np.array([name != UNASSIGNED for name in self.operators], bool)
+        busy = named & (self.pending > 0)
+        if not busy.any():
+            return []
+        limit = factor * self.pending[busy].mean()
+        return [self.operators[i] for i in np.flatnonzero(busy & (self.pending > limit))]
+
+    def operation_mix(self, pending_only=False):
+        """[(operator, operation, stages)] for every non-zero pair; a stage
+        with several operations counts once for each."""
+        mix = self.pending_mix if pending_only else self.pending_mix + self.completed_mix
+        rows, cols = np.nonzero(mix)
+        return [(self.operators[r], self.operations[c], int(mix[r, c])) for r, c in zip(rows, cols)]
+
+
+class Throughput:
+    """Completed stages per operator per period, from (first, last, day, count) rows."""
+
+    def __init__(self, rows, start, end, period="day"):
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period {period!r}; expected one of {', '.join(PERIODS)}")
+        self.period = period
+        rows = list(rows)
+        self.operators, operator = _codes([operator_name((first or "", last or "")) for first, last, _d, _n in rows])
+        days = np.array([str(d)[:10] for _f, _l, d, _n in rows], dtype="datetime64[D]")
+        counts = np.fromiter((n for *_rest, n in rows), np.int64, len(rows))
+        first, last = self._bucket(np.array([start, end], dtype="datetime64[D]"))
+        self.periods = np.arange(first, last + 1)
+        buckets = self._bucket(days) - first
+        keep = (buckets >= 0) & (buckets < len(self.periods))
+        self.counts = np.zeros((len(self.operators), len(self.periods)), np.int64)
+        np.add.at(self.counts, (operator[keep], buckets[keep]), counts[keep])
+        self.days = int((np.datetime64(end, "D") - np.datetime64(start, "D")).astype(int)) + 1
+
+    def _bucket(self, days):
+        # Period index: days, Monday-based weeks or months since the epoch.
+        if self.period == "month":
+            return days.astype("datetime64[M]").astype(np.int64)
+        d = days.astype(np.int64)
+        return (d + 3) // 7 if self.period == "week" else d   # 1970-01-01 was a Thursday
+
+    def labels(self):
+        """First day (or month) of each period."""
+        if self.period == "month":
+            return [str(p) for p in self.periods.astype("datetime64[M]")]
+        starts = self.periods * 7 - 3 if self.period == "week" else self.periods
+        return [str(p) for p in starts.astype("datetime64[D]")]
+
+    def totals(self):
+        """{operator: completed stages in the window}."""
+        return dict(zip(self.operators, self.counts.sum(axis=1).tolist()))
+
+    def per_day(self):
+        """{operator: mean completed stages per day over the window}."""
+        return dict(zip(self.operators, (self.counts.sum(axis=1) / max(self.days, 1)).round(2).tolist()))
+
+    def rows(self):
+        """[(operator, [count per period], total)], busiest first."""
+        totals = self.counts.sum(axis=1)
+        order = np.lexsort((np.arange(len(self.operators)), -totals))
+        return [(self.operators[i], self.counts[i].tolist(), int(totals[i])) for i in order]
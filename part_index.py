@@ -0,0 +1,203 @@
+from collections import defaultdict, namedtuple
+
+# ------------------ Part index ------------------
+# Secondary indexes over the parts cache, kept in step through the cache
+# listener hooks in Project.py (always under cache_lock, so a reader never
+# sees the cache and the indexes disagree). Lookups by order, by part ID, by
+# completion status and by operation cost time proportional to the answer.
+# Per-part and per-order stage counters are updated in O(1) per change, so
+# the reports and the dashboard never have to scan the cache.
+
+OrderProgress = namedtuple("OrderProgress", "parts complete_parts stages done_stages percent")
+
+class PartIndex:
+    def __init__(self):
+        self.reset({})
+
+    # ---- listener hooks ----
+    def reset(self, parts):
+        self._by_order = defaultdict(set)       # order_id -> {key}
+        self._by_pid = defaultdict(set)         # part_id -> {key}
+        self._multi_order = set()               # part IDs that appear in more than one order
+        self._done_count = {}                   # key -> number of done stages
+        self._stage_count = {}                  # key -> number of stages
+        self._complete = set()                  # keys whose stages are all done
+        self._complete_by_order = defaultdict(set)
+        self._by_op = defaultdict(set)          # operation -> {(key, sid)}
+        self._order_stages = defaultdict(int)   # order_id -> number of stages
+        self._order_done = defaultdict(int)     # order_id -> number of done stages
+        # Bulk build for the whole cache; ops tuples are interned, so their
+        # distinct operations are worked out once per routing.
+        distinct_ops = {}
+        by_op = self._by_op
+        for key, part in parts.items():
+            self.part_added(part)
+            done = 0
+            for sid, stage in part.stages.items():
+                ops = distinct_ops.get(stage.ops)
+                if ops is None:
+                    ops = distinct_ops[stage.ops] = tuple(set(stage.ops))
+                for op in ops:
+                    by_op[op].add((key, sid))
+                if stage.done:
+                    done += 1
+            self._stage_count[key] = len(part.stages)
+            self._done_count[key] = done
+            self._order_stages[part.order_id] += len(part.stages)
+            self._order_done[part.order_id] += done
+            self._refresh(key, part.order_id)
+
+    def part_added(self, part):
+        key = (part.pid, part.order_id)
+        self._by_order[part.order_id].add(key)
+        keys = self._by_pid[part.pid]
+        keys.add(key)
+        if len(keys) > 1:
+            self._multi_order.add(part.pid)
+        self._done_count[key] = 0
+        self._stage_count[key] = 0
+
+    def part_removed(self, part):
+        key = (part.pid, part.order_id)
+        for stage in part.stages.values():
+            self._unfile_ops(key, stage.sid, stage.ops)
+        _discard(self._by_order, part.order_id, key)
+        _discard(self._by_pid, part.pid, key)
+        if len(self._by_pid.get(part.pid, ())) < 2:
+            self._multi_order.discard(part.pid)
+        self._count_order(part.order_id, -self._stage_count.pop(key, 0), -self._done_count.pop(key, 0))
+        self._set_complete(key, part.order_id, False)
+
+    def stage_added(self, part, stage):
+        key = (part.pid, part.order_id)
+        self._file_ops(key, stage.sid, stage.ops)
+        self._stage_count[key] += 1
+        if stage.done:
+            self._done_count[key] += 1
+        self._count_order(part.order_id, 1, int(stage.done))
+        self._refresh(key, part.order_id)
+
+    def stage_removed(self, part, stage):
+        key = (part.pid, part.order_id)
+        self._unfile_ops(key, stage.sid, stage.ops)
+        self._stage_count[key] -= 1
+        if stage.done:
+            self._done_count[key] -= 1
+        self._count_order(part.order_id, -1, -int(stage.done))
+        self._refresh(key, part.order_id)
+
+    def stage_changed(self, part, stage, old_ops, old_deps, old_done):
+        key = (part.pid, part.order_id)
+        if old_ops != stage.ops:
+            self._unfile_ops(key, stage.sid, old_ops)
+            self._file_ops(key, stage.sid, stage.ops)
+        if old_done != stage.done:
+            delta = 1 if stage.done else -1
+            self._done_count[key] += delta
+            self._count_order(part.order_id, 0, delta)
+            self._refresh(key, part.order_id)
+
+    # ---- queries ----
+    def keys_for_order(self, order_id):
+        return list(self._by_order.get(order_id, ()))
+
+    def keys_for_part(self, pid):
+        return list(self._by_pid.get(pid, ()))
+
+    def order_ids(self):
+        return list(self._by_order)
+
+    def multi_order_parts(self):
+        """{part_id: number of orders} for parts that appear in more than one order."""
+        return {pid: len(self._by_pid[pid]) for pid in self._multi_order}
+
+    def is_complete(self, key):
+        return key in self._complete
+
+    def complete_parts(self, order_id=None):
+        if order_id is None:
+            return list(self._complete)
+        return list(self._complete_by_order.get(order_id, ()))
+
+    def stage_counts(self, key):
+        """(stages, done stages) for one part, or None if it is not cached."""
+        if key not in self._stage_count:
+            return None
+        return self._stage_count[key], self._done_count[key]
+
+    def stages_with_operation(self, operation):
+        return [(key[0], key[1], sid) for key, sid in self._by_op.get(operation, ())]
+
+    def operation_count(self, operation):
+        return len(self._by_op.get(operation, ()))
+
+    def order_progress(self, order_id):
+        stages, done = self._order_stages.get(order_id, 0), self._order_done.get(order_id, 0)
+        return OrderProgress(len(self._by_order.get(order_id, ())),
+                             len(self._complete_by_order.get(order_id, ())),
+                             stages, done, 100.0 * done / stages if stages else 0.0)
+
+    def totals(self):
+        """OrderProgress summed over every order."""
+        stages, done = sum(self._order_stages.values()), sum(self._order_done.values())
+        return OrderProgress(len(self._stage_count), len(self._complete), stages, done,
+                             100.0 * done / stages if stages else 0.0)
+
+    # ---- consistency ----
+    def verify(self, parts):
+        """Names of the aggregates that differ from a full recompute over parts."""
+        fresh = PartIndex()
+        fresh.reset(parts)
+        mine, theirs = self._aggregates(), fresh._aggregates()
+        return [name for name in mine if mine[name] != theirs[name]]
+
+    def _aggregates(self):
+        # Empty buckets are dropped so a zero counter equals a missing one.
+        return {
+            "parts by order": {k: v for k, v in self._by_order.items() if v},
+            "parts by part ID": {k: v for k, v in self._by_pid.items() if v},
+            "multi-order parts": self._multi_order,
+            "stage counts": self._stage_count,
+            "done counts": self._done_count,
+            "completed parts": self._complete,
+            "completed parts by order": {k: v for k, v in self._complete_by_order.items() if v},
+            "stages by operation": {k: v for k, v in self._by_op.items() if v},
+            "order stage counts": {k: v for k, v in self._order_stages.items() if v},
+            "order done counts": {k: v for k, v in self._order_done.items() if v},
+        }
+
+    # ---- internals ----
+    def _count_order(self, order_id, stages, done):
+        self._order_stages[order_id] += stages
+        self._order_done[order_id] += done
+        if not self._order_stages[order_id]:
+            del self._order_stages[order_id]
+            self._order_done.pop(order_id, None)
+
+    def _refresh(self, key, order_id):
+        stages = self._stage_count[key]
+        self._set_complete(key, order_id, stages > 0 and self._done_count[key] == stages)
+
+    def _set_complete(self, key, order_id, complete):
+        if complete:
+            self._complete.add(key)
+            self._complete_by_order[order_id].add(key)
+        elif key in self._complete:
+            self._complete.discard(key)
+            _discard(self._complete_by_order, order_id, key)
+
+    def _file_ops(self, key, sid, ops):
+        for op in set(ops):
+            self._by_op[op].add((key, sid))
+
+    def _unfile_ops(self, key, sid, ops):
+        for op in set(ops):
+            _discard(self._by_op, op, (key, sid))
+
+
+def _discard(index, bucket, entry):
+    entries = index.get(bucket)
+    if entries is not None:
+        entries.discard(entry)
+        if not entries:
+            del index[bucket]
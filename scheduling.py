@@ -0,0 +1,297 @@
+import heapq
+from collections import namedtuple
+
+import numpy as np
+
+# ------------------ Scheduling ------------------
+# Durations are per operation (hours by convention); a stage runs its
+# operations one after another, so its duration is their sum. Done stages are
+# finished and drop out of the graph. Time 0 is "now".
+#
+# Critical-path figures are per part and recomputed lazily, only for parts
+# that changed since the last query, in one vectorized batch. The
+# finite-capacity schedule couples every open order through the machines, so
+# it is rebuilt on the next request after any change.
+
+StageTiming = namedtuple("StageTiming", "es ef ls lf slack critical")
+ScheduledOperation = namedtuple("ScheduledOperation",
+                                "part_id order_id stage_id operation machine start end")
+
+
+class ScheduleEngine:
+    def __init__(self, durations=None, capacities=None, default_duration=1.0, default_capacity=1):
+        self.durations = dict(durations or {})
+        self.capacities = dict(capacities or {})
+        self.default_duration = default_duration
+        self.default_capacity = default_capacity
+        self.reset({})
+
+    def configure(self, durations=None, capacities=None, default_duration=None, default_capacity=None):
+        if durations is not None:
+            self.durations = dict(durations)
+        if capacities is not None:
+            self.capacities = dict(capacities)
+        if default_duration is not None:
+            self.default_duration = default_duration
+        if default_capacity is not None:
+            self.default_capacity = default_capacity
+        self.reset(self._parts)
+
+    # ---- listener hooks ----
+    def reset(self, parts):
+        self._parts = parts
+        self._timings = {}        # part key -> {sid: StageTiming}
+        self._finish = {}         # part key -> earliest completion
+        self._dirty = set(parts)
+        self._op_duration = {}    # ops tuple -> stage duration
+        self._shop = None
+
+    def part_added(self, part):
+        self._touch((part.pid, part.order_id))
+
+    def part_removed(self, part):
+        key = (part.pid, part.order_id)
+        self._dirty.discard(key)
+        self._timings.pop(key, None)
+        self._finish.pop(key, None)
+        self._shop = None
+
+    def stage_added(self, part, stage):
+        self._touch((part.pid, part.order_id))
+
+    def stage_removed(self, part, stage):
+        self._touch((part.pid, part.order_id))
+
+    def stage_changed(self, part, stage, old_ops, old_deps, old_done):
+        self._touch((part.pid, part.order_id))
+
+    def _touch(self, key):
+        self._dirty.add(key)
+        self._shop = None
+
+    # ---- critical path ----
+    def stage_timings(self, key):
+        """{stage_id: StageTiming} for the open stages of one part."""
+        self._refresh()
+        return self._timings.get(key, {})
+
+    def completion_time(self, key):
+        self._refresh()
+        return self._finish.get(key)
+
+    def critical_path(self, key):
+        timings = self.stage_timings(key)
+        return sorted((sid for sid, t in timings.items() if t.critical), key=lambda sid: timings[sid].es)
+
+    def order_completion_time(self, order_id):
+        self._refresh()
+        times = [t for (pid, oid), t in self._finish.items() if oid == order_id]
+        return max(times) if times else None
+
+    def stage_duration(self, stage):
+        duration = self._op_duration.get(stage.ops)
+        if duration is None:
+            duration = sum(self.durations.get(op, self.default_duration) for op in stage.ops) \
+                if stage.ops else self.default_duration
+            self._op_duration[stage.ops] = duration
+        return duration
+
+    def _refresh(self):
+        if not self._dirty:
+            return
+        keys = [key for key in self._dirty if key in self._parts]
+        self._dirty = set()
+        graph = _build_graph(self, [self._parts[key] for key in keys])
+        es, ef, ls, lf, finish = critical_path_arrays(graph)
+        for pi, key in enumerate(keys):
+            self._timings[key] = {}
+            self._finish[key] = float(finish[pi])
+        slack = ls - es
+        critical = slack <= 1e-9
+        timings = self._timings
+        for i, (pi, sid) in enumerate(zip(graph.part_of.tolist(), graph.sids)):
+            if np.isnan(es[i]):
+                continue  # part of a dependency cycle
+            timings[keys[pi]][sid] = StageTiming(float(es[i]), float(ef[i]), float(ls[i]), float(lf[i]),
+                                                 float(slack[i]), bool(critical[i]))
+
+    # ---- finite capacity ----
+    def shop_schedule(self):
+        """ShopSchedule for every open stage, respecting machine capacities."""
+        if self._shop is None:
+            self._shop = self._build_shop_schedule()
+        return self._shop
+
+    def _build_shop_schedule(self):
+        keys = list(self._parts)
+        graph = _build_graph(self, [self._parts[key] for key in keys])
+        es, ef, ls, lf, finish = critical_path_arrays(graph)
+        n = len(graph.sids)
+        if n == 0:
+            return ShopSchedule([], {})
+
+        # Serial schedule generation: among stages whose dependencies are
+        # scheduled, always take the one with the smallest latest start.
+        succ_ptr, succ = graph.successors()
+        remaining = np.bincount(graph.dst, minlength=n).tolist()
+        release = [0.0] * n
+        priority = np.nan_to_num(ls, nan=np.inf).tolist()
+        eligible = [(priority[i], i) for i in range(n) if remaining[i] == 0]
+        heapq.heapify(eligible)
+        machines = {}
+        operations = []
+        part_of, sids, stage_ops = graph.part_of.tolist(), graph.sids, graph.ops
+        succ_ptr, succ = succ_ptr.tolist(), succ.tolist()
+        while eligible:
+            _, i = heapq.heappop(eligible)
+            key = keys[part_of[i]]
+            t = release[i]
+            if not stage_ops[i]:  # no operation, so no machine to wait for
+                operations.append(ScheduledOperation(key[0], key[1], sids[i], "", "", t, t + self.default_duration))
+                t += self.default_duration
+            for op in stage_ops[i]:
+                pool = machines.get(op)
+                if pool is None:
+                    capacity = max(1, int(self.capacities.get(op, self.default_capacity)))
+                    pool = machines[op] = [(0.0, m) for m in range(capacity)]
+                free_at, m = heapq.heappop(pool)
+                start = max(t, free_at)
+                t = start + self.durations.get(op, self.default_duration)
+                heapq.heappush(pool, (t, m))
+                operations.append(ScheduledOperation(key[0], key[1], sids[i], op, f"{op}#{m + 1}", start, t))
+            for j in succ[succ_ptr[i]:succ_ptr[i + 1]]:
+                if t > release[j]:
+                    release[j] = t
+                remaining[j] -= 1
+                if remaining[j] == 0:
+                    heapq.heappush(eligible, (priority[j], j))
+        return ShopSchedule(operations, {key: float(f) for key, f in zip(keys, finish)})
+
+
+class ShopSchedule:
+    def __init__(self, operations, unconstrained_finish):
+        self.operations = operations
+        self.unconstrained_finish = unconstrained_finish   # part key -> CPM finish
+        self.part_finish = {}
+        for op in operations:
+            key = (op.part_id, op.order_id)
+            if op.end > self.part_finish.get(key, 0.0):
+                self.part_finish[key] = op.end
+
+    @property
+    def makespan(self):
+        return max(self.part_finish.values(), default=0.0)
+
+    def order_completion_time(self, order_id):
+        times = [t for (pid, oid), t in self.part_finish.items() if oid == order_id]
+        return max(times) if times else None
+
+    def machine_queues(self):
+        """{machine: [ScheduledOperation, ...]} in start order."""
+        queues = {}
+        for op in sorted(self.operations, key=lambda op: (op.start, op.machine)):
+            if op.machine:
+                queues.setdefault(op.machine, []).append(op)
+        return queues
+
+    def next_for_machines(self):
+        return {machine: queue[0] for machine, queue in self.machine_queues().items()}
+
+
+# ------------------ Graph arrays ------------------
+class _Graph:
+    def __init__(self, sids, ops, part_of, duration, src, dst, n_parts):
+        self.sids = sids
+        self.ops = ops
+        self.part_of = part_of
+        self.duration = duration
+        self.src = src
+        self.dst = dst
+        self.n_parts = n_parts
+
+    def successors(self):
+        n = len(self.sids)
+        order = np.argsort(self.src, kind="stable")
+        ptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.src, minlength=n), out=ptr[1:])
+        return ptr, self.dst[order]
+
+
+def _build_graph(engine, part_list):
+    sids, ops, part_of, duration, src, dst = [], [], [], [], [], []
+    for pi, part in enumerate(part_list):
+        base = len(sids)
+        local = {}
+        for stage in part.stages.values():
+            if stage.done:
+                continue
+            local[stage.sid] = base + len(local)
+            sids.append(stage.sid)
+            ops.append(stage.ops)
+            part_of.append(pi)
+            duration.append(engine.stage_duration(stage))
+        for stage in part.stages.values():
+            if stage.done:
+                continue
+            i = local[stage.sid]
+            for dep in set(stage.deps):
+                j = local.get(dep)
+                if j is not None:  # done or unknown dependencies do not hold anything up
+                    src.append(j)
+                    dst.append(i)
+    return _Graph(sids, ops, np.array(part_of, dtype=np.int64), np.array(duration, dtype=float),
+                  np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64), len(part_list))
+
+
+def critical_path_arrays(graph):
+    """Vectorized CPM over many parts at once, processed level by level.
+
+    Returns es, ef, ls, lf per stage (NaN for stages caught in a cycle) and the
+    earliest finish of each part.
+    """
+    n = len(graph.sids)
+    dur = graph.duration
+    es = np.zeros(n)
+    finish = np.zeros(graph.n_parts)
+    if n == 0:
+        return es, es.copy(), es.copy(), es.copy(), finish
+    ptr, succ = graph.successors()
+    indeg = np.bincount(graph.dst, minlength=n)
+    levels = []
+    frontier = np.flatnonzero(indeg == 0)
+    while frontier.size:
+        levels.append(frontier)
+        edges, counts = _out_edges(ptr, frontier)
+        if not edges.size:
+            break
+        targets = succ[edges]
+        np.maximum.at(es, targets, np.repeat(es[frontier] + dur[frontier], counts))
+        indeg = indeg - np.bincount(targets, minlength=n)
+        frontier = np.unique(targets[indeg[targets] == 0])
+
+    placed = np.zeros(n, dtype=bool)
+    for level in levels:
+        placed[level] = True
+    es[~placed] = np.nan
+    ef = es + dur
+    np.maximum.at(finish, graph.part_of[placed], ef[placed])
+
+    lf = finish[graph.part_of].copy()
+    ls = np.full(n, np.nan)
+    for level in reversed(levels):
+        edges, counts = _out_edges(ptr, level)
+        if edges.size:
+            np.fmin.at(lf, np.repeat(level, counts), ls[succ[edges]])
+        ls[level] = lf[level] - dur[level]
+    lf[~placed] = np.nan
+    return es, ef, ls, lf, finish
+
+
+def _out_edges(ptr, nodes):
+    starts = ptr[nodes]
+    counts = ptr[nodes + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), counts
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(starts, counts) + offsets, counts
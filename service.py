@@ -0,0 +1,512 @@
+"""HTTP/JSON service for shop-floor terminals.
+
+    python service.py [--sqlite FILE] [--host 127.0.0.1] [--port 8080] [--write-behind]
+                      [--export-dir DIR]
+
+One process loads the parts cache once and serves any number of terminals, so
+a terminal needs neither the dataset nor a database connection. Requests are
+parsed on an asyncio event loop; the model calls they map to run on a thread
+pool (reports on a separate one, so they never hold up terminals). Requests
+for the same part queue up on the event loop, one at a time per part, and
+the model's own per-part locks let edits of different parts overlap their
+database round trips.
+
+Every response is JSON. Model calls that return a status string come back as
+{"ok": ..., "message": ...} with 200 for ✅, 400 for ⚠, 404 when something
+is not found, 503 for database errors and 409 for other refusals.
+Reports and exports are written inside the export directory; "output" and
+"path" are file names relative to it.
+
+    GET    /health
+    GET    /parts?order=O                       part keys, all or one order
+    POST   /parts                               {"part_id", "order_id"}
+    GET    /parts/P/O                           a part with its stages
+    DELETE /parts/P/O
+    POST   /parts/P/O/stages                    {"stage_id", "operations", "dependencies",
+                                                 "operator_first", "operator_last"}
+    PUT    /parts/P/O/stages/S                  {"operations", "dependencies"}
+    DELETE /parts/P/O/stages/S
+    POST   /parts/P/O/stages/S/complete         ?with_deps=1 to complete upstream stages too
+    POST   /parts/P/O/complete                  every stage of the part
+    POST   /orders/O/complete                   every stage of the order
+    GET    /ready?order=O&operation=X           stages that can be completed now
+    GET    /progress?order=O
+    GET    /stages?operation=X&status=pending   from the cache
+    GET    /operators?order=O&days=30           workload per operator
+    POST   /sync
+    POST   /reports/completed | multi-order | excel | graphs | operators
+                                                {"order", "output", "days", "period"}
+    POST   /export                              {"path", "format", "source", "order", "status"}
+    GET    /metrics
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import Project
+from metrics import metrics
+from write_behind import JournalLocked
+
+MAX_BODY = 1 << 20
+MAX_HEADERS = 100
+REQUEST_TIMEOUT = 30.0    # seconds to wait for a request from an idle keep-alive connection
+EXPORT_DIR = "."          # where reports and exports go; set by --export-dir
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error",
+               503: "Service Unavailable"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# ------------------ Model calls ------------------
+# Plain functions run on the worker threads; each returns (status, payload).
+def _status(message):
+    if message.startswith("✅"):
+        return 200, {"ok": True, "message": message}
+    if message.startswith("⚠"):
+        return 400, {"ok": False, "message": message}
+    if "not found" in message:
+        return 404, {"ok": False, "message": message}
+    if "Database error" in message:
+        return 503, {"ok": False, "message": message}
+    return 409, {"ok": False, "message": message}
+
+
+def _field(body, name, required=False):
+    value = body.get(name)
+    if value is None:
+        if required:
+            raise HttpError(400, f"Missing field: {name}")
+        return ""
+    return str(value).strip()
+
+
+def _int_field(source, name, default):
+    # Positive whole number from the query string or a JSON body.
+    value = source.get(name)
+    if value is None or value == "":
+        return default
+    text = str(value).strip()
+    if not re.fullmatch(r"[0-9]+", text) or not int(text):
+        raise HttpError(400, f"{name} must be a positive whole number")
+    return int(text)
+
+
+def _output_path(name, default=None):
+    # A client-chosen file name, kept inside EXPORT_DIR.
+    name = str(name or default or "").strip()
+    if not name:
+        raise HttpError(400, "Missing field: output")
+    if os.path.isabs(name) or os.path.splitdrive(name)[0] or ".." in re.split(r"[\\/]", name):
+        raise HttpError(400, f"Output must be a file name inside the export directory: {name}")
+    root = os.path.realpath(EXPORT_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if path == root or os.path.commonpath([root, path]) != root:
+        raise HttpError(400, f"Output must be a file name inside the export directory: {name}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def health(query, body):
+    with Project.cache_lock:
+        count = len(Project.parts)
+    return 200, {"ok": True, "parts": count}
+
+
+def list_parts(query, body):
+    order_id = query.get("order")
+    with Project.cache_lock:
+        keys = Project.parts_in_order(order_id) if order_id else sorted(Project.parts)
+    return 200, {"parts": [list(key) for key in keys]}
+
+
+def get_part(query, body, pid, order_id):
+    with Project.cache_lock:
+        part = Project.parts.get((pid, order_id))
+        if part is None:
+            return 404, {"ok": False, "message": f"❌ Part {pid} (Order {order_id}) not found."}
+        stages = [{"stage_id": s.sid, "operations": list(s.ops), "dependencies": list(s.deps), "done": s.done}
+                  for s in part.stages.values()]
+        complete = Project.part_index.is_complete((pid, order_id))
+    return 200, {"part_id": pid, "order_id": order_id, "complete": complete, "stages": stages}
+
+
+def add_part(query, body):
+    return _status(Project.add_part(_field(body, "part_id", True), _field(body, "order_id", True)))
+
+
+def remove_part(query, body, pid, order_id):
+    return _status(Project.remove_part(pid, order_id))
+
+
+def add_stage(query, body, pid, order_id):
+    return _status(Project.add_stage(pid, order_id, _field(body, "stage_id", True),
+                                     _field(body, "operations"), _field(body, "dependencies"),
+                                     _field(body, "operator_first"), _field(body, "operator_last")))
+
+
+def update_stage(query, body, pid, order_id, sid):
+    return _status(Project.update_stage(pid, order_id, sid, _field(body, "operations"), _field(body, "dependencies")))
+
+
+def remove_stage(query, body, pid, order_id, sid):
+    return _status(Project.remove_stage(pid, order_id, sid))
+
+
+def complete_stage(query, body, pid, order_id, sid):
+    if query.get("with_deps") in ("1", "true", "yes"):
+        return _status(Project.complete_stages([(pid, order_id, sid)]))
+    return _status(Project.complete_stage(pid, order_id, sid))
+
+
+def complete_part(query, body, pid, order_id):
+    return _status(Project.complete_part(pid, order_id))
+
+
+def complete_order(query, body, order_id):
+    return _status(Project.complete_order(order_id))
+
+
+def ready(query, body):
+    rows = Project.ready_stages(query.get("order"), query.get("operation"))
+    return 200, {"stages": [list(row) for row in sorted(rows)]}
+
+
+def progress(query, body):
+    order_id = query.get("order")
+    if order_id:
+        return 200, Project.order_progress(order_id)._asdict()
+    return 200, {oid: p._asdict() for oid, p in sorted(Project.order_progress().items())}
+
+
+def stages(query, body):
+    operation = query.get("operation")
+    if not operation:
+        raise HttpError(400, "Missing query parameter: operation")
+    status = query.get("status")
+    done = None if status is None else status == "done"
+    return 200, {"stages": [list(row) for row in Project.stages_with_operation(operation, done)]}
+
+
+def operators(query, body):
+    workload = Project.operator_workload(query.get("order"))
+    per_day = Project.operator_throughput(_int_field(query, "days", 30), order_id=query.get("order")).per_day()
+    return 200, {"operators": [dict(load._asdict(), per_day=per_day.get(load.operator, 0.0))
+                               for load in workload.loads()],
+                 "overloaded": workload.overloaded()}
+
+
+def sync(query, body):
+    return 200, Project.sync_from_db()
+
+
+def report(query, body, kind):
+    order_id, output = body.get("order"), body.get("output")
+    if kind == "completed":
+        return _status(Project.generate_completed_parts_pdf(
+            pdf_filename=_output_path(output, "completed_parts_report.pdf")))
+    if kind == "multi-order":
+        return _status(Project.generate_multiple_orders_report(
+            pdf_filename=_output_path(output, "multiple_orders_report.pdf")))
+    if kind == "excel":
+        filename = Project.generate_excel_report(_output_path(output, "parts_report.xlsx"))
+        return _status(f"✅ Excel file created: {filename}" if filename else "⚠ Report cancelled.")
+    if kind == "graphs":
+        path = _output_path(output, f"{order_id or 'all'}_dependency_graphs.pdf")
+        return _status(Project.generate_dependency_pdfs(order_id, output=path))
+    if kind == "operators":
+        return _status(Project.generate_operator_report(_output_path(output, "operator_workload_report.pdf"),
+                                                        order_id, _int_field(body, "days", 30),
+                                                        body.get("period") or "week"))
+    raise HttpError(404, f"Unknown report: {kind}")
+
+
+def export(query, body):
+    path = _output_path(_field(body, "path", True))
+    try:
+        count = Project.export_stages(path, body.get("format"), body.get("source") or "cache",
+                                      body.get("order"), body.get("status"))
+    except (ValueError, ImportError) as e:
+        return 400, {"ok": False, "message": f"❌ {e}"}
+    return 200, {"ok": True, "message": f"✅ {count} stages exported to {path}", "count": count}
+
+
+def get_metrics(query, body):
+    return 200, metrics.snapshot()
+
+
+# (method, path pattern, handler, path groups that name a part, runs on the report pool)
+ROUTES = [
+    ("GET", r"/health", health, False, False),
+    ("GET", r"/parts", list_parts, False, False),
+    ("POST", r"/parts", add_part, False, False),
+    ("GET", r"/parts/([^/]+)/([^/]+)", get_part, True, False),
+    ("DELETE", r"/parts/([^/]+)/([^/]+)", remove_part, True, False),
+    ("POST", r"/parts/([^/]+)/([^/]+)/stages", add_stage, True, False),
+    ("PUT", r"/parts/([^/]+)/([^/]+)/stages/([^/]+)", update_stage, True, False),
+    ("DELETE", r"/parts/([^/]+)/([^/]+)/stages/([^/]+)", remove_stage, True, False),
+    ("POST", r"/parts/([^/]+)/([^/]+)/stages/([^/]+)/complete", complete_stage, True, False),
+    ("POST", r"/parts/([^/]+)/([^/]+)/complete", complete_part, True, False),
+    ("POST", r"/orders/([^/]+)/complete", complete_order, False, True),
+    ("GET", r"/ready", ready, False, False),
+    ("GET", r"/progress", progress, False, False),
+    ("GET", r"/stages", stages, False, False),
+    ("GET", r"/operators", operators, False, False),
+    ("POST", r"/sync", sync, False, False),
+    ("POST", r"/reports/([^/]+)", report, False, True),
+    ("POST", r"/export", export, False, True),
+    ("GET", r"/metrics", get_metrics, False, False),
+]
+ROUTES = [(method, re.compile(pattern + "$"), handler, by_part, slow)
+          for method, pattern, handler, by_part, slow in ROUTES]
+
+
+# ------------------ Server ------------------
+class ProductionService:
+    def __init__(self, workers=8, sync_interval=Project.SYNC_INTERVAL_MS / 1000):
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="service")
+        self.report_executor = ThreadPoolExecutor(1, thread_name_prefix="service-report")
+        self.sync_interval = sync_interval
+        self.requests = 0
+        self._part_locks = {}   # key -> [asyncio.Lock, holders and waiters]
+        self._server = None
+        self._sync_task = None
+        self._idle = {}         # connection task -> writer, while waiting for the next request
+        self._connections = set()
+        self._stopping = False
+
+    async def start(self, host="127.0.0.1", port=8080):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, Project.load_from_db)
+        self._server = await asyncio.start_server(self._serve_connection, host, port)
+        if self.sync_interval:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def stop(self):
+        # Requests in progress get their response; idle keep-alive connections are closed.
+        self._stopping = True
+        if self._sync_task:
+            self._sync_task.cancel()
+        if self._server:
+            self._server.close()
+        for writer in self._idle.values():
+            writer.close()
+        if self._connections:
+            await asyncio.wait(self._connections, timeout=REQUEST_TIMEOUT)
+        self.executor.shutdown(wait=True)
+        self.report_executor.shutdown(wait=True)
+
+    async def _sync_loop(self):
+        # Picks up edits made by desktop clients writing to the same database.
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await loop.run_in_executor(self.executor, Project.sync_from_db)
+            except Project.DatabaseError as e:
+                print(f"❌ Sync failed: {e}", file=sys.stderr, flush=True)
+
+    async def _serve_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while not self._stopping:
+                self._idle[task] = writer
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), REQUEST_TIMEOUT)
+                except HttpError as e:
+                    await _respond(writer, e.status, {"ok": False, "message": str(e)}, close=True)
+                    return
+                finally:
+                    del self._idle[task]
+                if request is None:
+                    return
+                method, target, headers, body = request
+                status, payload = await self.dispatch(method, target, body)
+                close = self._stopping or headers.get("connection", "").lower() == "close"
+                await _respond(writer, status, payload, close)
+                if close:
+                    return
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            self._connections.discard(task)
+
+    async def dispatch(self, method, target, body):
+        start = time.perf_counter()
+        self.requests += 1
+        url = urlsplit(target)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        name = "not found"
+        try:
+            route, args = _match(method, url.path)
+            handler, by_part, slow = route[2], route[3], route[4]
+            name = handler.__name__
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError:
+                raise HttpError(400, "Request body is not valid JSON")
+            if not isinstance(data, dict):
+                raise HttpError(400, "Request body must be a JSON object")
+            executor = self.report_executor if slow else self.executor
+            call = lambda: handler(query, data, *args)
+            if by_part:
+                async with self._part_lock((args[0], args[1])):
+                    status, payload = await asyncio.get_running_loop().run_in_executor(executor, call)
+            else:
+                status, payload = await asyncio.get_running_loop().run_in_executor(executor, call)
+        except HttpError as e:
+            status, payload = e.status, {"ok": False, "message": str(e)}
+        except Project.DatabaseError as e:
+            status, payload = 503, {"ok": False, "message": f"❌ Database error: {e}"}
+        except Exception as e:
+            status, payload = 500, {"ok": False, "message": f"❌ {type(e).__name__}: {e}"}
+        if metrics.enabled:
+            metrics.observe(f"HTTP {method} {name}", time.perf_counter() - start, error=status >= 500)
+        return status, payload
+
+    def _part_lock(self, key):
+        return _KeyedLock(self._part_locks, key)
+
+
+class _KeyedLock:
+    # An asyncio.Lock per key that only exists while someone holds or waits for it.
+    def __init__(self, locks, key):
+        self.locks, self.key = locks, key
+
+    async def __aenter__(self):
+        entry = self.locks.get(self.key)
+        if entry is None:
+            entry = self.locks[self.key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        self.entry = entry
+        await entry[0].acquire()
+
+    async def __aexit__(self, *exc):
+        self.entry[0].release()
+        self.entry[1] -= 1
+        if not self.entry[1]:
+            del self.locks[self.key]
+
+
+def _match(method, path):
+    allowed = False
+    for route in ROUTES:
+        m = route[1].match(path)
+        if m:
+            if route[0] == method:
+                return route, [unquote(g) for g in m.groups()]
+            allowed = True
+    raise HttpError(405 if allowed else 404, f"No route for {method} {path}")
+
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HttpError(400, "Too many headers")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = headers.get("content-length") or "0"
+    if not re.fullmatch(r"[0-9]+", length):
+        raise HttpError(400, "Invalid Content-Length")
+    length = int(length)
+    if length > MAX_BODY:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def _respond(writer, status, payload, close=False):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+# ------------------ Run ------------------
+async def serve(host, port, workers):
+    service = ProductionService(workers)
+    host, port = await service.start(host, port)
+    print(f"Serving on http://{host}:{port}", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+    await stop.wait()
+    await service.stop()
+
+
+def main(argv=None):
+    global EXPORT_DIR
+    ap = argparse.ArgumentParser(description="Production Manager JSON service.")
+    ap.add_argument("--sqlite", metavar="FILE", help="use an SQLite database file instead of MySQL")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080, help="0 picks a free port")
+    ap.add_argument("--workers", type=int, default=8, help="threads running model calls")
+    ap.add_argument("--write-behind", action="store_true", help="queue stage completions and updates")
+    ap.add_argument("--metrics", action="store_true", help="record timings, readable at GET /metrics")
+    ap.add_argument("--export-dir", default=EXPORT_DIR, help="directory for reports and exports")
+    args = ap.parse_args(argv)
+
+    EXPORT_DIR = args.export_dir
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+
+    # One connection per worker thread plus one for the periodic sync.
+    backend = None
+    if args.sqlite:
+        from database import SQLiteBackend
+        backend = SQLiteBackend(args.sqlite)
+    Project.configure_database(backend, pool_size=max(Project.DB_POOL_SIZE, args.workers + 1))
+    if args.metrics:
+        Project.set_instrumentation(True)
+    try:
+        if args.write_behind:
+            Project.enable_write_behind()
+        else:
+            try:
+                Project.replay_pending_writes()
+            except JournalLocked as e:
+                print(f"⚠ Not replaying the write-behind journal: {e}", file=sys.stderr, flush=True)
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+    except JournalLocked as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        Project.close_database()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
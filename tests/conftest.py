@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import Project
+from database import SQLiteBackend
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Project configured against an empty SQLite database in tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    Project.configure_database(SQLiteBackend(str(tmp_path / "production.db")))
+    Project.load_from_db()
+    yield tmp_path
+    Project.close_database()
@@ -0,0 +1,39 @@
+import Project
+
+
+def test_dependency_problems_are_reported(db):
+    report = Project.bulk_import([
+        {"part_id": "P1", "order_id": "O1", "stage_id": "S1", "dependencies": "S2"},
+        {"part_id": "P1", "order_id": "O1", "stage_id": "S2", "dependencies": "S1"},
+        {"part_id": "P2", "order_id": "O1", "stage_id": "S1", "dependencies": "GONE"},
+        {"part_id": "P3", "order_id": "O1", "stage_id": "S1"},
+        {"part_id": "P3", "order_id": "O1", "stage_id": "S2", "dependencies": "S1"},
+    ])
+    assert report.stages_added == 5
+    assert report.dependency_problems == 3
+    assert report.errors == [
+        (1, "Part P1 (Order O1), stage S1: Dependency cycle among stages S1, S2."),
+        (2, "Part P1 (Order O1), stage S2: Dependency cycle among stages S1, S2."),
+        (3, "Part P2 (Order O1), stage S1: Dependency GONE does not exist."),
+    ]
+    assert "3 dependency problems" in report.summary()
+    assert "rows rejected" not in report.summary()
+
+
+def test_imported_lists_survive_a_reload(db):
+    report = Project.bulk_import([
+        {"part_id": "P1", "order_id": "O1", "stage_id": "S1", "operations": "cut, drill"},
+        {"part_id": "P1", "order_id": "O1", "stage_id": "S2", "operations": "weld", "dependencies": "S1"},
+        {"part_id": "P1", "order_id": "O1", "stage_id": "S3", "dependencies": "S1, S2", "done": "yes",
+         "completed_at": "2026-01-02 03:04:05"},
+    ])
+    assert not report.errors
+    Project.load_from_db()
+    stages = Project.parts[("P1", "O1")].stages
+    assert [(s.sid, s.ops, s.deps) for s in stages.values()] == [
+        ("S1", ("cut", "drill"), ()),
+        ("S2", ("weld",), ("S1",)),
+        ("S3", (), ("S1", "S2")),
+    ]
+    assert Project._db_query("SELECT completed_at FROM stages WHERE stage_id = %s", ("S3",)) == [
+        ("2026-01-02 03:04:05",)]
@@ -0,0 +1,25 @@
+import cli
+
+
+def test_unreachable_database_fails_the_command(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    missing = str(tmp_path / "no" / "such" / "dir.db")
+    assert cli.main(["--sqlite", missing, "validate"]) == 1
+    assert cli.main(["--sqlite", missing, "report", "completed"]) == 1
+    assert capsys.readouterr().out.startswith("❌ Database error")
+    assert not (tmp_path / "completed_parts_report.pdf").exists()
+
+
+def test_import_into_an_existing_part(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    db = str(tmp_path / "cli.db")
+    assert cli.main(["--sqlite", db, "add-part", "P1", "O1"]) == 0
+    (tmp_path / "stages.csv").write_text("part_id,order_id,stage_id,operations,dependencies\n"
+                                         "P1,O1,S1,cut,\nP1,O1,S2,weld,S1\n")
+    assert cli.main(["--sqlite", db, "import", "stages.csv"]) == 0
+    assert "Imported 0 parts and 2 stages." in capsys.readouterr().out
+
+    (tmp_path / "more.csv").write_text("part_id,order_id,stage_id\nP1,O1,S1\nP1,O1,S3\n")
+    assert cli.main(["--sqlite", db, "import", "more.csv"]) == 1
+    out = capsys.readouterr().out
+    assert "Imported 0 parts and 1 stages." in out and "Row 1: Stage S1 already exists" in out
@@ -0,0 +1,91 @@
+import threading
+
+import Project
+from database import DatabaseError
+
+
+def _part(pid, *stages):
+    Project.add_part(pid, "O1")
+    for sid, deps in stages:
+        Project.add_stage(pid, "O1", sid, "drill", deps)
+
+
+def _done():
+    return sorted(Project._db_query("SELECT part_id, stage_id FROM stages WHERE done", ()))
+
+
+def test_upstream_stages_are_completed_first(db, monkeypatch):
+    _part("P1", ("S1", ""), ("S2", "S1"), ("S3", "S2"), ("S4", ""))
+    _part("P2", ("S1", ""))
+    written = []
+    mark_done = Project._mark_done
+
+    def record(cursor, rows, timed):
+        written.extend((pid, sid) for _at, pid, _oid, sid in rows)
+        mark_done(cursor, rows, timed)
+
+    monkeypatch.setattr(Project, "_mark_done", record)
+    assert Project.complete_stages([("P1", "O1", "S3"), ("P2", "O1", "S1")]) == \
+        "✅ 4 stages completed in 2 parts."
+    assert written == [("P1", "S1"), ("P1", "S2"), ("P1", "S3"), ("P2", "S1")]
+    assert _done() == [("P1", "S1"), ("P1", "S2"), ("P1", "S3"), ("P2", "S1")]
+    assert Project.ready_stages() == [("P1", "O1", "S4")]
+    assert Project.complete_stages([("P1", "O1", "S2")]) == "⚠ Those stages are already completed."
+
+
+def test_an_unknown_stage_completes_nothing(db):
+    _part("P1", ("S1", ""), ("S2", "S1"))
+    _part("P2", ("S1", ""))
+    assert Project.complete_stages([("P2", "O1", "S1"), ("P1", "O1", "S9")]) == "❌ Stage S9 not found in part P1."
+    assert Project.complete_stages([("P2", "O1", "S1"), ("P9", "O1", "S1")]) == "❌ Part P9 (Order O1) not found."
+    assert _done() == []
+    assert sorted(Project.ready_stages()) == [("P1", "O1", "S1"), ("P2", "O1", "S1")]
+
+
+def test_a_broken_routing_completes_nothing(db):
+    _part("P1", ("S1", ""))
+    _part("P2", ("S1", ""), ("S2", "S1"))
+    Project.parts[("P2", "O1")].stages["S1"].deps = ("S2",)   # a cycle left by another client
+    assert Project.complete_stages([("P1", "O1", "S1"), ("P2", "O1", "S2")]) == \
+        "❌ Part P2 (Order O1): Dependency cycle: S2 -> S1 -> S2. Nothing was completed."
+    assert _done() == []
+
+
+def test_a_failed_write_rolls_the_whole_batch_back(db, monkeypatch):
+    _part("P1", ("S1", ""), ("S2", "S1"))
+    _part("P2", ("S1", ""))
+    mark_done = Project._mark_done
+
+    def fail_after_writing(cursor, rows, timed):
+        mark_done(cursor, rows, timed)
+        raise DatabaseError("lost connection")
+
+    monkeypatch.setattr(Project, "_mark_done", fail_after_writing)
+    assert Project.complete_order("O1") == "❌ Database error: lost connection. Nothing was completed."
+    assert _done() == []
+    assert not any(stage.done for part in Project.parts.values() for stage in part.stages.values())
+
+def test_the_transaction_runs_without_cache_lock(db, monkeypatch):
+    _part("P1", ("S1", ""), ("S2", "S1"))
+    in_transaction, commit = threading.Event(), threading.Event()
+    mark_done = Project._mark_done
+
+    def slow_mark_done(cursor, rows, timed):
+        mark_done(cursor, rows, timed)
+        in_transaction.set()
+        commit.wait(5)
+
+    monkeypatch.setattr(Project, "_mark_done", slow_mark_done)
+    results = []
+    worker = threading.Thread(target=lambda: results.append(Project.complete_part("P1", "O1")))
+    worker.start()
+    try:
+        assert in_transaction.wait(5)
+        assert Project.cache_lock.acquire(timeout=1)
+        Project.cache_lock.release()
+        assert Project.ready_stages() == [("P1", "O1", "S1")]
+    finally:
+        commit.set()
+        worker.join(5)
+    assert results == ["✅ 2 stages completed in 1 part."]
+    assert Project.ready_stages() == []
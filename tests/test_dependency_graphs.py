@@ -0,0 +1,71 @@
+import re
+import threading
+
+import pytest
+
+import Project
+from dependency_graphs import LayoutCache, graph_signature, render_graphs
+
+
+def _pages(path):
+    return len(re.findall(rb"/Type /Page\b(?!s)", path.read_bytes()))
+
+
+@pytest.fixture
+def layouts(db, monkeypatch):
+    cache = LayoutCache(str(db / "layouts"))
+    monkeypatch.setattr(Project, "layout_cache", cache)
+    return cache
+
+
+def _routing(pid, order_id, stages):
+    Project.add_part(pid, order_id)
+    for sid, deps in stages:
+        Project.add_stage(pid, order_id, sid, "drill", deps)
+
+
+def test_signature_ignores_order_and_repeats():
+    sig, edges = graph_signature([("S2", ["S1", "S1"]), ("S1", [])])
+    assert edges == (("S1", ()), ("S2", ("S1",)))
+    assert graph_signature([("S1", ()), ("S2", ("S1",))])[0] == sig
+    assert graph_signature([("S1", ()), ("S2", ())])[0] != sig
+
+
+def test_one_pdf_draws_each_routing_once(db, layouts):
+    for pid in ("P1", "P2", "P3"):
+        _routing(pid, "O1", [("S1", ""), ("S2", "S1")])
+    _routing("P4", "O1", [("S1", ""), ("S2", ""), ("S3", "S1,S2")])
+    Project.add_part("P5", "O1")   # nothing to draw
+
+    result = Project.generate_dependency_pdfs("O1", workers=1)
+    assert result == "✅ Dependency graph PDF created: O1_dependency_graphs.pdf (4 parts, 2 distinct graphs)"
+    assert _pages(db / "O1_dependency_graphs.pdf") == 4
+    assert (layouts.hits, layouts.misses, len(layouts)) == (0, 2, 2)
+
+    Project.generate_dependency_pdfs("O1", workers=1)
+    assert layouts.hits == 2
+    assert LayoutCache(layouts.directory).get(graph_signature([("S1", ()), ("S2", ("S1",))])[0]) is not None
+
+
+def test_separate_pdfs_and_cancel(db, layouts):
+    _routing("P1", "O1", [("S1", "")])
+    _routing("P2", "O1", [("S1", ""), ("S2", "S1")])
+    out = db / "graphs"
+    assert Project.generate_dependency_pdfs(keys=[("P1", "O1"), ("P2", "O1")], output=str(out),
+                                            separate=True, workers=1) == f"✅ 2 dependency graph PDFs created in {out}"
+    assert sorted(p.name for p in out.iterdir()) == ["P1_O1_dependency_graph.pdf", "P2_O1_dependency_graph.pdf"]
+
+    cancel = threading.Event()
+    cancel.set()
+    assert Project.generate_dependency_pdfs("O1", workers=1, cancel=cancel) == "⚠ Report cancelled."
+    assert Project.generate_dependency_pdfs("O9") == "⚠ No parts with stages to draw."
+
+
+def test_the_process_pool_returns_every_graph(tmp_path):
+    graphs = dict(graph_signature([(f"S{j}", [f"S{j - 1}"] if j else []) for j in range(i + 1)])
+                  for i in range(8))
+    done = []
+    images = render_graphs(graphs, LayoutCache(), workers=2, progress=lambda n, total: done.append((n, total)))
+    assert set(images) == set(graphs)
+    assert all(png.startswith(b"\x89PNG") for png in images.values())
+    assert done[-1] == (8, 8)
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from dependency_index import DependencyIndex
+from Project import Part, Stage
+
+SIDS = [f"S{i}" for i in range(8)]
+
+
+def _snapshot(index, parts):
+    unmet = {(key, sid): index.unmet_count(key, sid) for key, part in parts.items() for sid in part.stages}
+    return sorted(index.ready_stages()), unmet
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_updates_match_a_rebuild(seed):
+    rng = random.Random(seed)
+    parts = {}
+    index = DependencyIndex()
+    for _ in range(400):
+        key = (f"P{rng.randrange(3)}", "O1")
+        part = parts.get(key)
+        if part is None:
+            part = parts[key] = Part(*key)
+            index.part_added(part)
+        sid = rng.choice(SIDS)
+        deps = rng.sample(SIDS, rng.randrange(3))   # may include sid itself
+        stage = part.stages.get(sid)
+        action = rng.random()
+        if stage is None:
+            stage = part.stages[sid] = Stage(sid, ["drill"], deps, rng.random() < 0.3)
+            index.stage_added(part, stage)
+        elif action < 0.2:
+            del part.stages[sid]
+            index.stage_removed(part, stage)
+        elif action < 0.6:
+            old_deps, old_done = stage.deps, stage.done
+            stage.done = not stage.done
+            index.stage_changed(part, stage, stage.ops, old_deps, old_done)
+        else:
+            old_ops, old_deps, old_done = stage.ops, stage.deps, stage.done
+            stage.deps = Stage(sid, deps=deps).deps
+            stage.ops = Stage(sid, ops=rng.sample(["drill", "weld", "paint"], 1)).ops
+            index.stage_changed(part, stage, old_ops, old_deps, old_done)
+
+        rebuilt = DependencyIndex()
+        rebuilt.reset(parts)
+        assert _snapshot(index, parts) == _snapshot(rebuilt, parts)
+
+
+def test_self_dependency_is_ignored():
+    part = Part("P1", "O1")
+    part.stages["S1"] = Stage("S1", ["drill"], ["S1"])
+    index = DependencyIndex()
+    index.reset({("P1", "O1"): part})
+    assert index.unmet_count(("P1", "O1"), "S1") == 0
+    assert index.ready_stages() == [("P1", "O1", "S1")]
@@ -0,0 +1,80 @@
+import csv
+import threading
+
+import openpyxl
+import pytest
+
+import exports
+import Project
+from exports import ExportCancelled
+
+
+def _setup():
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill,deburr", "")
+    Project.add_stage("P1", "O1", "S2", "weld", "S1")
+    Project.add_part("P2", "O2")
+    Project.add_stage("P2", "O2", "S1", "paint", "")
+    Project.complete_stage("P1", "O1", "S1")
+
+
+def _csv_rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+@pytest.mark.parametrize("source", ["cache", "db"])
+def test_filters_by_order_and_status(db, source):
+    _setup()
+    path = str(db / "stages.csv")
+    assert Project.export_stages(path, source=source, order_id="O1") == 2
+    assert sorted(_csv_rows(path)[1:]) == [["P1", "O1", "S1", "drill, deburr", "", "✔"],
+                                           ["P1", "O1", "S2", "weld", "S1", "✘"]]
+    assert Project.export_stages(path, source=source, status="pending") == 2
+    assert sorted(r[:3] for r in _csv_rows(path)[1:]) == [["P1", "O1", "S2"], ["P2", "O2", "S1"]]
+    assert Project.export_stages(path, source=source, order_id="O2", status="done") == 0
+    assert _csv_rows(path) == [exports.EXPORT_HEADERS]
+
+
+def test_xlsx_export(db):
+    _setup()
+    path = db / "stages.xlsx"
+    assert Project.export_stages(str(path)) == 3
+    sheet = openpyxl.load_workbook(path)["Parts Report"]
+    rows = [tuple(c.value for c in row) for row in sheet.iter_rows()]
+    assert rows[0] == tuple(exports.EXPORT_HEADERS)
+    assert sorted(rows[1:])[0] == ("P1", "O1", "S1", "drill, deburr", None, "✔")
+
+
+def test_parquet_export(db):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _setup()
+    path = str(db / "stages.parquet")
+    assert Project.export_stages(path, source="db") == 3
+    table = pq.read_table(path)
+    assert table.column("done").to_pylist() == [True, False, False]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "xlsx"])
+def test_a_cancelled_export_leaves_the_old_file_alone(db, monkeypatch, fmt):
+    _setup()
+    monkeypatch.setattr(exports, "EXPORT_CHUNK", 1)
+    path = db / f"stages.{fmt}"
+    path.write_bytes(b"previous export")
+    cancel = threading.Event()
+
+    def progress(done, total):
+        if fmt == "csv":   # write-only xlsx only hits the disk when saved
+            assert (db / "stages.csv.part").exists()
+        cancel.set()
+
+    with pytest.raises(ExportCancelled):
+        Project.export_stages(str(path), progress=progress, cancel=cancel)
+    assert path.read_bytes() == b"previous export"
+    assert not (db / f"stages.{fmt}.part").exists()
+
+
+def test_unknown_format(db):
+    with pytest.raises(ValueError, match="Unsupported export format: txt"):
+        Project.export_stages(str(db / "stages.txt"))
+    assert exports.export_format("out.dat", "CSV") == "csv"
@@ -0,0 +1,71 @@
+import datetime
+
+import openpyxl
+import pytest
+
+import Project
+from operator_analytics import OperatorLoad, Throughput
+
+
+def test_excel_report_with_no_pending_stages_for_an_operation(db):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill", "", "Ann", "Lee")
+    Project.add_stage("P1", "O1", "S2", "weld", "S1", "Ann", "Lee")
+    assert Project.complete_stage("P1", "O1", "S1").startswith("✅")
+
+    result = Project.generate_operator_report(str(db / "ops.xlsx"), days=7, period="day")
+    assert result.startswith("✅"), result
+
+    sheet = openpyxl.load_workbook(db / "ops.xlsx")["Operation Mix"]
+    rows = [tuple(c.value for c in row) for row in sheet.iter_rows(min_row=2)]
+    assert rows == [("Ann Lee", "drill", 0, 1), ("Ann Lee", "weld", 1, 0)]
+
+
+def test_workload_per_operator(db):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill,weld", "", "Ann", "Lee")
+    Project.add_stage("P1", "O1", "S2", "weld", "S1", "Ann", "Lee")
+    Project.add_stage("P1", "O1", "S3", "paint", "", "Bo", "")
+    Project.add_stage("P1", "O1", "S4", "paint", "")
+    Project.add_part("P2", "O2")
+    for sid in ("S1", "S2", "S3", "S4", "S5"):
+        Project.add_stage("P2", "O2", sid, "drill", "", "Cy", "Moe")
+    Project.complete_stage("P1", "O1", "S1")
+
+    workload = Project.operator_workload()
+    assert workload.total_stages == 9
+    assert workload.loads() == [OperatorLoad("Cy Moe", 5, 0, 5, 0.0),
+                                OperatorLoad("(unassigned)", 1, 0, 1, 0.0),
+                                OperatorLoad("Ann Lee", 2, 1, 1, 50.0),
+                                OperatorLoad("Bo", 1, 0, 1, 0.0)]
+    assert workload.overloaded() == ["Cy Moe"]   # 5 pending against a mean of 7/3
+    assert sorted(workload.operation_mix()) == [
+        ("(unassigned)", "paint", 1), ("Ann Lee", "drill", 1), ("Ann Lee", "weld", 2),
+        ("Bo", "paint", 1), ("Cy Moe", "drill", 5)]
+    assert ("Ann Lee", "drill", 1) not in workload.operation_mix(pending_only=True)
+    assert [load.operator for load in Project.operator_workload("O1").loads()] == \
+        ["(unassigned)", "Ann Lee", "Bo"]
+
+
+def test_throughput_buckets_completions_by_period():
+    rows = [("Ann", "Lee", "2026-03-02", 2), ("Ann", "Lee", "2026-03-08", 1),
+            ("Ann", "Lee", "2026-03-09", 4), (None, None, "2026-03-04", 1),
+            ("Ann", "Lee", "2026-02-20", 9)]   # before the first week
+    start, end = datetime.date(2026, 3, 1), datetime.date(2026, 3, 14)
+    weekly = Throughput(rows, start, end, "week")
+    assert weekly.labels() == ["2026-02-23", "2026-03-02", "2026-03-09"]
+    assert weekly.rows() == [("Ann Lee", [0, 3, 4], 7), ("(unassigned)", [0, 1, 0], 1)]
+    assert weekly.per_day() == {"(unassigned)": 0.07, "Ann Lee": 0.5}
+    assert Throughput(rows, start, end, "month").totals() == {"(unassigned)": 1, "Ann Lee": 7}
+    with pytest.raises(ValueError):
+        Throughput(rows, start, end, "year")
+
+
+def test_throughput_from_completion_times(db):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill", "", "Ann", "Lee")
+    Project.add_stage("P1", "O1", "S2", "drill", "", "Ann", "Lee")
+    Project.complete_stage("P1", "O1", "S1")
+    throughput = Project.operator_throughput(days=7)
+    assert throughput.totals() == {"Ann Lee": 1}
+    assert throughput.rows()[0][1][-1] == 1   # today
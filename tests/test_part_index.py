@@ -0,0 +1,43 @@
+import Project
+
+
+def _setup():
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill,deburr", "")
+    Project.add_stage("P1", "O1", "S2", "weld", "S1")
+    Project.add_part("P1", "O2")
+    Project.add_stage("P1", "O2", "S1", "drill", "")
+    Project.add_part("P2", "O1")
+
+
+def test_lookups_by_order_part_and_operation(db):
+    _setup()
+    assert Project.parts_in_order("O1") == [("P1", "O1"), ("P2", "O1")]
+    assert Project.parts_in_order("O9") == []
+    assert Project.orders_for_part("P1") == ["O1", "O2"]
+    assert Project.part_index.multi_order_parts() == {"P1": 2}
+    assert Project.stages_with_operation("drill") == [("P1", "O1", "S1"), ("P1", "O2", "S1")]
+    assert Project.stages_with_operation("deburr") == [("P1", "O1", "S1")]
+
+    Project.complete_stage("P1", "O2", "S1")
+    assert Project.stages_with_operation("drill", done=True) == [("P1", "O2", "S1")]
+    assert Project.stages_with_operation("drill", done=False) == [("P1", "O1", "S1")]
+
+
+def test_lookups_follow_edits_and_removals(db):
+    _setup()
+    Project.update_stage("P1", "O1", "S1", "drill", "")
+    assert Project.stages_with_operation("deburr") == []
+    assert Project.completed_parts() == []   # a part without stages is not complete
+
+    Project.complete_stage("P1", "O2", "S1")
+    assert Project.completed_parts() == [("P1", "O2")]
+    assert Project.completed_parts("O1") == []
+    Project.add_stage("P1", "O2", "S2", "paint", "S1")
+    assert Project.completed_parts() == []
+
+    Project.remove_part("P1", "O2")
+    assert Project.orders_for_part("P1") == ["O1"]
+    assert Project.part_index.multi_order_parts() == {}
+    assert Project.stages_with_operation("paint") == []
+    assert Project.check_report_aggregates() == []
@@ -0,0 +1,51 @@
+import random
+
+import Project
+from part_index import OrderProgress
+
+
+def test_order_progress_and_totals(db):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill", "")
+    Project.add_stage("P1", "O1", "S2", "weld", "S1")
+    Project.add_part("P2", "O1")
+    Project.add_stage("P2", "O1", "S1", "drill", "")
+    Project.add_part("P1", "O2")
+    Project.add_stage("P1", "O2", "S1", "drill", "")
+    Project.complete_stage("P1", "O1", "S1")
+    Project.complete_stage("P2", "O1", "S1")
+
+    assert Project.order_progress("O1") == OrderProgress(2, 1, 3, 2, 200 / 3)
+    assert Project.order_progress() == {"O1": OrderProgress(2, 1, 3, 2, 200 / 3),
+                                        "O2": OrderProgress(1, 0, 1, 0, 0.0)}
+    assert Project.part_index.totals() == OrderProgress(3, 1, 4, 2, 50.0)
+
+    Project.remove_stage("P1", "O1", "S2")
+    Project.remove_part("P1", "O2")
+    assert Project.order_progress() == {"O1": OrderProgress(2, 2, 2, 2, 100.0)}
+    Project.load_from_db()
+    assert Project.order_progress() == {"O1": OrderProgress(2, 2, 2, 2, 100.0)}
+
+
+def test_aggregates_match_a_recompute_after_random_edits(db):
+    rng = random.Random(7)
+    for _ in range(150):
+        pid, order_id, sid = f"P{rng.randrange(4)}", f"O{rng.randrange(2)}", f"S{rng.randrange(4)}"
+        action = rng.random()
+        if action < 0.15:
+            Project.remove_part(pid, order_id)
+        elif action < 0.3:
+            Project.remove_stage(pid, order_id, sid)
+        elif action < 0.6:
+            Project.complete_stage(pid, order_id, sid)
+        else:
+            Project.add_part(pid, order_id)
+            Project.add_stage(pid, order_id, sid, rng.choice(["drill", "weld", "drill,weld"]), "")
+        assert Project.check_report_aggregates() == []
+
+
+def test_the_check_names_what_drifted(db):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill", "")
+    Project.part_index._done_count[("P1", "O1")] = 1
+    assert Project.check_report_aggregates() == ["done counts"]
@@ -0,0 +1,73 @@
+import pytest
+
+import Project
+from scheduling import ScheduleEngine, StageTiming
+
+DURATIONS = {"cut": 2, "weld": 3, "drill": 1, "paint": 1}
+
+
+@pytest.fixture
+def engine(db):
+    engine = ScheduleEngine(durations=DURATIONS)
+    Project.add_cache_listener(engine)
+    yield engine
+    Project.remove_cache_listener(engine)
+
+
+def _diamond(pid):
+    # S1 -> S2 -> S4 takes 6 hours; S1 -> S3 -> S4 has 2 hours to spare.
+    Project.add_part(pid, "O1")
+    Project.add_stage(pid, "O1", "S1", "cut", "")
+    Project.add_stage(pid, "O1", "S2", "weld", "S1")
+    Project.add_stage(pid, "O1", "S3", "drill", "S1")
+    Project.add_stage(pid, "O1", "S4", "paint", "S2,S3")
+
+
+def test_critical_path_and_slack(engine):
+    _diamond("P1")
+    key = ("P1", "O1")
+    assert engine.stage_timings(key) == {
+        "S1": StageTiming(0, 2, 0, 2, 0, True),
+        "S2": StageTiming(2, 5, 2, 5, 0, True),
+        "S3": StageTiming(2, 3, 4, 5, 2, False),
+        "S4": StageTiming(5, 6, 5, 6, 0, True),
+    }
+    assert engine.critical_path(key) == ["S1", "S2", "S4"]
+    assert engine.completion_time(key) == 6
+
+
+def test_done_stages_drop_out_and_only_changed_parts_are_recomputed(engine):
+    _diamond("P1")
+    _diamond("P2")
+    assert engine.order_completion_time("O1") == 6
+    Project.complete_stage("P1", "O1", "S1")
+    assert engine._dirty == {("P1", "O1")}
+    assert engine.completion_time(("P1", "O1")) == 4
+    assert "S1" not in engine.stage_timings(("P1", "O1"))
+    assert engine.stage_timings(("P1", "O1"))["S3"].slack == 2
+    assert engine.completion_time(("P2", "O1")) == 6
+
+
+def test_stages_in_a_cycle_get_no_timings(engine):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "cut", "")
+    Project.add_stage("P1", "O1", "S2", "weld", "S1")
+    Project.add_stage("P1", "O1", "S3", "drill", "S2")
+    Project.parts[("P1", "O1")].stages["S2"].deps = ("S1", "S3")   # not allowed through add_stage
+    engine.reset(Project.parts)
+    assert set(engine.stage_timings(("P1", "O1"))) == {"S1"}
+
+
+def test_machines_are_shared_across_parts(engine):
+    for pid in ("P1", "P2"):
+        Project.add_part(pid, "O1")
+        Project.add_stage(pid, "O1", "S1", "weld", "")
+    schedule = engine.shop_schedule()
+    assert schedule.makespan == 6
+    assert [(op.part_id, op.start, op.end) for op in schedule.machine_queues()["weld#1"]] == \
+        [("P1", 0, 3), ("P2", 3, 6)]
+
+    engine.configure(capacities={"weld": 2})
+    schedule = engine.shop_schedule()
+    assert schedule.makespan == 3
+    assert set(schedule.next_for_machines()) == {"weld#1", "weld#2"}
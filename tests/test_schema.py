@@ -0,0 +1,82 @@
+import sqlite3
+
+import Project
+import cli
+from database import SQLiteBackend
+
+OLD_STAGES = """
+CREATE TABLE parts (part_id VARCHAR(64) NOT NULL, order_id VARCHAR(64) NOT NULL, PRIMARY KEY (part_id, order_id));
+CREATE TABLE stages (
+    part_id VARCHAR(64) NOT NULL, order_id VARCHAR(64) NOT NULL, stage_id VARCHAR(64) NOT NULL,
+    done BOOLEAN NOT NULL DEFAULT 0, operator_first VARCHAR(64), operator_last VARCHAR(64),
+    PRIMARY KEY (part_id, order_id, stage_id),
+    FOREIGN KEY (part_id, order_id) REFERENCES parts (part_id, order_id) ON DELETE CASCADE
+);
+"""
+
+
+def _columns(path):
+    with sqlite3.connect(path) as raw:
+        return [row[1] for row in raw.execute("PRAGMA table_info(stages)")]
+
+
+def test_missing_completed_at_is_left_to_migrate_schema(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "old.db")
+    with sqlite3.connect(path) as raw:
+        raw.executescript(OLD_STAGES)
+
+    Project.configure_database(SQLiteBackend(path))
+    try:
+        Project.load_from_db()
+        assert "no completed_at column" in capsys.readouterr().out
+        report = Project.bulk_import([{"part_id": "P1", "order_id": "O1", "stage_id": "S1", "operator_first": "Ann",
+                                       "done": "yes", "completed_at": "2026-01-02"},
+                                      {"part_id": "P1", "order_id": "O1", "stage_id": "S2", "operator_first": "Ann"}])
+        assert not report.errors
+        assert Project.complete_stage("P1", "O1", "S2").startswith("✅")
+        assert Project.operator_throughput(7).totals() == {}
+        assert Project.generate_operator_report(str(tmp_path / "ops.pdf")).startswith("✅")
+    finally:
+        Project.close_database()
+    assert "completed_at" not in _columns(path)
+
+    assert cli.main(["--sqlite", path, "migrate-schema"]) == 0
+    assert "completed_at" in _columns(path)
+    Project.configure_database(SQLiteBackend(path))
+    try:
+        Project.load_from_db()
+        Project.add_stage("P1", "O1", "S3", "drill", "S2", "Ann")
+        assert Project.complete_stage("P1", "O1", "S3").startswith("✅")
+        assert Project.operator_throughput(7).totals() == {"Ann": 1}
+    finally:
+        Project.close_database()
+
+
+def test_without_a_change_log_sync_is_skipped_until_migrate_schema(tmp_path, capsys):
+    path = str(tmp_path / "nolog.db")
+    Project.configure_database(SQLiteBackend(path))
+    Project.load_from_db()
+    Project.add_part("P1", "O1")
+    Project.close_database()
+    with sqlite3.connect(path) as raw:
+        for (name,) in raw.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+            raw.execute(f"DROP TRIGGER {name}")
+        raw.execute("DROP TABLE change_log")
+
+    Project.configure_database(SQLiteBackend(path, create_schema=False))
+    try:
+        Project.load_from_db()
+        Project.load_from_db()
+        assert capsys.readouterr().out.count("no change log") == 1
+        stats = Project.sync_from_db()
+        assert stats["skipped"] and not stats["full_reload"]
+
+        assert "✅ Change log installed." in Project.migrate_schema()
+        Project.load_from_db()
+        Project.add_part("P2", "O1")
+        stats = Project.sync_from_db()
+        assert not stats["skipped"] and not stats["full_reload"]
+        assert stats["changes"] == 1
+    finally:
+        Project.close_database()
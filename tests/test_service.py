@@ -0,0 +1,65 @@
+import asyncio
+import os
+
+import pytest
+
+import Project
+import service
+from service import HttpError
+
+
+@pytest.fixture
+def export_dir(db, monkeypatch):
+    directory = db / "exports"
+    directory.mkdir()
+    monkeypatch.setattr(service, "EXPORT_DIR", str(directory))
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill", "")
+    return directory
+
+
+@pytest.mark.parametrize("path", ["/tmp/x.csv", "../x.csv", "a/../../x.csv", "..\\x.csv", "."])
+def test_export_paths_outside_the_export_directory_are_rejected(export_dir, path):
+    with pytest.raises(HttpError) as e:
+        service.export({}, {"path": path})
+    assert e.value.status == 400
+
+
+def test_symlink_out_of_the_export_directory_is_rejected(export_dir, tmp_path):
+    os.symlink(tmp_path, export_dir / "escape")
+    with pytest.raises(HttpError):
+        service.report({}, {"output": "escape/report.xlsx"}, "excel")
+
+
+def test_outputs_are_written_inside_the_export_directory(export_dir):
+    status, payload = service.export({}, {"path": "daily/stages.csv"})
+    assert status == 200, payload
+    assert (export_dir / "daily" / "stages.csv").exists()
+    status, payload = service.report({}, {"order": "O1"}, "graphs")
+    assert status == 200, payload
+    assert (export_dir / "O1_dependency_graphs.pdf").exists()
+    assert service.report({}, {}, "completed")[0] == 200
+    assert (export_dir / "completed_parts_report.pdf").exists()
+
+
+@pytest.mark.parametrize("days", ["abc", "-3", "0", "1.5"])
+def test_bad_days_is_a_bad_request(export_dir, days):
+    with pytest.raises(HttpError) as e:
+        service.operators({"days": days}, {})
+    assert e.value.status == 400
+    with pytest.raises(HttpError) as e:
+        service.report({}, {"days": days}, "operators")
+    assert e.value.status == 400
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "1e3"])
+def test_bad_content_length_is_a_bad_request(length):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(f"POST /sync HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+        reader.feed_eof()
+        return await service._read_request(reader)
+
+    with pytest.raises(HttpError) as e:
+        asyncio.run(read())
+    assert e.value.status == 400
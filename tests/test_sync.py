@@ -0,0 +1,53 @@
+import sqlite3
+
+import Project
+
+
+def _other_client(db):
+    return sqlite3.connect(str(db / "production.db"))
+
+
+def test_part_deleted_and_added_again_between_syncs(db):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "cut", "")
+    Project.add_stage("P1", "O1", "S2", "weld", "S1")
+    Project.sync_from_db()   # past this client's own changes
+    with _other_client(db) as raw:
+        raw.execute("PRAGMA foreign_keys = ON")
+        # MySQL fires no triggers for rows removed by a cascade.
+        for table in ("stages", "stage_operations", "stage_dependencies"):
+            raw.execute(f"DROP TRIGGER {table}_change_del")
+        raw.execute("DELETE FROM parts WHERE part_id = 'P1'")
+        raw.execute("INSERT INTO parts (part_id, order_id) VALUES ('P1', 'O1')")
+        raw.execute("INSERT INTO stages (part_id, order_id, stage_id, done) VALUES ('P1', 'O1', 'S3', 0)")
+        raw.execute("INSERT INTO stage_operations VALUES ('P1', 'O1', 'S3', 0, 'paint')")
+
+    stats = Project.sync_from_db()
+    assert not stats["full_reload"]
+    stages = Project.parts[("P1", "O1")].stages
+    assert {sid: s.ops for sid, s in stages.items()} == {"S3": ("paint",)}
+    assert Project.ready_stages() == [("P1", "O1", "S3")]
+
+
+def test_part_edited_during_the_read_waits_for_the_next_sync(db, monkeypatch):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "cut", "")
+    Project.sync_from_db()
+    with _other_client(db) as raw:
+        raw.execute("UPDATE stage_operations SET operation = 'saw' WHERE stage_id = 'S1'")
+
+    read_changes = Project._read_changes
+
+    def read_then_edit(since, gaps):
+        result = read_changes(since, gaps)   # still has 'saw'
+        Project.update_stage("P1", "O1", "S1", "drill", "")
+        return result
+
+    monkeypatch.setattr(Project, "_read_changes", read_then_edit)
+    Project.sync_from_db()
+    assert Project.parts[("P1", "O1")].stages["S1"].ops == ("drill",)
+
+    monkeypatch.setattr(Project, "_read_changes", read_changes)
+    Project.sync_from_db()
+    assert Project.parts[("P1", "O1")].stages["S1"].ops == ("drill",)
+    assert not Project._sync_gaps
@@ -0,0 +1,134 @@
+import json
+import threading
+
+import pytest
+
+import Project
+from database import DatabaseError, IntegrityError
+from write_behind import JournalLocked, WriteBehindQueue, read_journal
+
+
+def _lists(key):
+    return [Project._db_query(f"SELECT COUNT(*) FROM {table} WHERE part_id = %s AND order_id = %s AND stage_id = %s",
+                              key)[0][0] for table, _column, _attr in Project.STAGE_LIST_TABLES]
+
+
+def test_queued_update_of_a_removed_stage_is_dropped(db):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill", "")
+    Project.add_stage("P1", "O1", "S2", "weld", "S1")
+    Project._apply_stage_writes([
+        {"op": "update", "part_id": "P1", "order_id": "O1", "stage_id": "GONE",
+         "operations": "paint", "dependencies": "S1"},
+        {"op": "update", "part_id": "P1", "order_id": "O1", "stage_id": "S2",
+         "operations": "weld,grind", "dependencies": "S1"},
+    ])
+    assert _lists(("P1", "O1", "GONE")) == [0, 0]
+    assert _lists(("P1", "O1", "S2")) == [2, 1]
+
+
+def test_permanent_failures_are_set_aside_and_the_queue_keeps_draining(tmp_path, capsys):
+    saved = []
+    outage = [True]
+
+    def apply_batch(batch):
+        if any(e["stage_id"] == "BAD" for e in batch):
+            raise IntegrityError("foreign key")
+        if outage[0] and batch[-1]["stage_id"] == "S3":
+            outage[0] = False
+            raise DatabaseError("server gone")
+        saved.extend(e["stage_id"] for e in batch)
+
+    journal = str(tmp_path / "pending.journal")
+    queue = WriteBehindQueue(apply_batch, journal, linger=0.2, fsync=False, permanent_errors=(IntegrityError,))
+    queue.RETRY_DELAYS = (0.01,)
+    for sid in ("S1", "BAD", "S2", "S3"):
+        queue.put({"op": "complete", "part_id": "P1", "order_id": "O1", "stage_id": sid})
+    assert queue.flush(5)
+    stats = queue.stats()
+    queue.close()
+
+    assert saved == ["S1", "S2", "S3"]
+    assert (stats["written"], stats["rejected"]) == (3, 1)
+    assert read_journal(journal) == []
+    rejected = [json.loads(line) for line in open(journal + ".rejected", encoding="utf-8")]
+    assert [(e["stage_id"], e["error"]) for e in rejected] == [("BAD", "IntegrityError: foreign key")]
+    assert "rejected complete of P1/O1/BAD" in capsys.readouterr().err
+
+
+def test_close_leaves_a_busy_writer_its_journal(tmp_path):
+    journal = str(tmp_path / "pending.journal")
+    database_back = threading.Event()
+    queue = WriteBehindQueue(lambda batch: database_back.wait(5), journal, fsync=False)
+    queue.put({"op": "complete", "part_id": "P1", "order_id": "O1", "stage_id": "S1"})
+    assert not queue.close(0.2)
+    assert not queue._journal.closed
+    database_back.set()
+    queue._thread.join(5)
+    assert queue._journal.closed
+    assert read_journal(journal) == []
+
+
+def test_a_journal_in_use_is_neither_replayed_nor_shared(db):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill", "")
+    journal = str(db / "shared.journal")
+    blocked = threading.Event()
+
+    def apply_batch(batch):
+        blocked.wait(5)
+
+    queue = WriteBehindQueue(apply_batch, journal, fsync=False)   # another process's queue
+    queue.put({"op": "complete", "part_id": "P1", "order_id": "O1", "stage_id": "S1"})
+    with pytest.raises(JournalLocked):
+        Project.replay_pending_writes(journal)
+    with pytest.raises(JournalLocked):
+        Project.enable_write_behind(journal)
+    assert len(read_journal(journal)) == 1
+    blocked.set()
+    queue.close(5)
+
+
+def test_writes_left_by_a_crash_are_queued_first(db):
+    Project.add_part("P1", "O1")
+    Project.add_stage("P1", "O1", "S1", "drill", "")
+    journal = db / "crashed.journal"
+    journal.write_text(json.dumps({"op": "complete", "part_id": "P1", "order_id": "O1", "stage_id": "S1",
+                                   "completed_at": "2026-01-02 03:04:05", "seq": 7}) + "\n")
+    assert Project.enable_write_behind(str(journal)) == 1
+    Project.add_stage("P1", "O1", "S2", "weld", "S1")   # waits for the queue
+    assert Project._db_query("SELECT done FROM stages WHERE stage_id = %s", ("S1",)) == [(1,)]
+    assert Project.disable_write_behind()
+    assert journal.read_text() == ""
+    assert Project.replay_pending_writes(str(journal)) == 0
+
+
+def test_a_full_queue_does_not_hold_up_the_cache(db, monkeypatch):
+    for pid in ("P1", "P2"):
+        Project.add_part(pid, "O1")
+        Project.add_stage(pid, "O1", "S1", "drill", "")
+    database_back = threading.Event()
+    apply_stage_writes = Project._apply_stage_writes
+
+    def stalled(entries):
+        database_back.wait(5)
+        apply_stage_writes(entries)
+
+    monkeypatch.setattr(Project, "_apply_stage_writes", stalled)
+    Project.enable_write_behind(str(db / "pending.journal"), max_pending=1, fsync=False)
+    try:
+        assert Project.complete_stage("P1", "O1", "S1").startswith("✅")
+        waiting = threading.Thread(target=Project.complete_stage, args=("P2", "O1", "S1"))
+        waiting.start()
+        waiting.join(0.2)
+        assert waiting.is_alive()   # waiting for room in the queue
+        assert Project.cache_lock.acquire(timeout=1)
+        Project.cache_lock.release()
+        assert not Project.parts[("P2", "O1")].stages["S1"].done
+        database_back.set()
+        waiting.join(5)
+        assert Project.parts[("P2", "O1")].stages["S1"].done
+    finally:
+        database_back.set()
+        assert Project.disable_write_behind()
+    assert Project._db_query("SELECT COUNT(*) FROM stages WHERE done", ()) == [(2,)]
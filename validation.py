@@ -0,0 +1,126 @@
+# ------------------ Dependency validation ------------------
+# Edit-time checks look only at the stages downstream of the edited stage;
+# validate_part is the full linear-time pass (dangling deps + Tarjan SCCs).
+
+def find_cycle(dependents, sid, deps):
+    """Path sid -> ... -> dep if making sid depend on any of deps closes a loop.
+
+    dependents maps a stage ID to the stages that depend on it, so the search
+    only visits stages downstream of sid.
+    """
+    targets = set(deps)
+    if sid in targets:
+        return [sid]
+    parent = {sid: None}
+    stack = [sid]
+    while stack:
+        node = stack.pop()
+        for nxt in dependents.get(node, ()):
+            if nxt in parent:
+                continue
+            parent[nxt] = node
+            if nxt in targets:
+                path = [nxt]
+                while parent[path[-1]] is not None:
+                    path.append(parent[path[-1]])
+                return path[::-1]
+            stack.append(nxt)
+    return None
+
+
+def validate_part(part):
+    """Every dangling dependency and dependency cycle in one part, as messages."""
+    stages = part.stages
+    problems = []
+    for stage in stages.values():
+        for dep in stage.deps:
+            if dep not in stages:
+                problems.append((stage.sid, f"Dependency {dep} does not exist."))
+    for component in _strongly_connected(stages):
+        if len(component) > 1 or component[0] in stages[component[0]].deps:
+            members = sorted(component)
+            for sid in members:
+                problems.append((sid, f"Dependency cycle among stages {', '.join(members)}."))
+    return problems
+
+
+def _strongly_connected(stages):
+    # Iterative Tarjan over stage -> dependency edges.
+    index, low, on_stack = {}, {}, set()
+    stack, components = [], []
+    counter = 0
+    for root in stages:
+        if root in index:
+            continue
+        work = [(root, iter(stages[root].deps))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, edges = work[-1]
+            advanced = False
+            for dep in edges:
+                if dep not in stages:
+                    continue
+                if dep not in index:
+                    index[dep] = low[dep] = counter
+                    counter += 1
+                    stack.append(dep)
+                    on_stack.add(dep)
+                    work.append((dep, iter(stages[dep].deps)))
+                    advanced = True
+                    break
+                if dep in on_stack:
+                    low[node] = min(low[node], index[dep])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+def completion_order(stages, targets):
+    """Unfinished stages among targets and everything they depend on, each after
+    its own dependencies.
+
+    Returns (order, None), or ([], message) if a dependency is missing or the
+    stages involved form a cycle. Done stages are not walked past.
+    """
+    order = []
+    state = {}  # sid -> 1 while on the walk's path, 2 once placed in order
+    for root in targets:
+        if root in state or stages[root].done:
+            continue
+        state[root] = 1
+        work = [(root, iter(stages[root].deps))]
+        while work:
+            node, deps = work[-1]
+            for dep in deps:
+                stage = stages.get(dep)
+                if stage is None:
+                    return [], f"Dependency {dep} of stage {node} does not exist."
+                if stage.done or state.get(dep) == 2:
+                    continue
+                if state.get(dep) == 1:
+                    path = [sid for sid, _deps in work]
+                    return [], f"Dependency cycle: {' -> '.join(path[path.index(dep):] + [dep])}."
+                state[dep] = 1
+                work.append((dep, iter(stage.deps)))
+                break
+            else:
+                work.pop()
+                state[node] = 2
+                order.append(node)
+    return order, None
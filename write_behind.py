@@ -0,0 +1,224 @@
+import json
+import os
+import sys
+import threading
+
+# ------------------ Write-behind queue ------------------
+# Writes are appended to a local journal (one JSON object per line, fsynced)
+# before put() returns, then saved to the database by a background thread in
+# batches of up to batch_size, one transaction per batch. A batch leaves the
+# queue only after apply_batch() returns, so a failed batch is retried as a
+# whole. Once everything queued is saved the journal is truncated; otherwise a
+# {"committed": seq} line marks how far it got. Whatever a crash leaves behind
+# is queued again by the next queue to open the journal, or saved by a replay.
+# Whoever has the journal open for writing, a queue or a replay, holds an
+# exclusive lock on it, so a second process can neither replay entries a live
+# queue is still saving nor truncate them away.
+# A batch that fails with one of permanent_errors (say, a constraint the write
+# can never satisfy) is split up: the other writes are saved one at a time and
+# the failing ones are set aside in "<journal>.rejected" instead of blocking
+# the queue.
+
+
+class WriteQueueFull(Exception):
+    pass
+
+
+class JournalLocked(Exception):
+    pass
+
+
+def open_journal(path):
+    """Open the journal at path for appending, with an exclusive lock held until
+    it is closed. Raises JournalLocked if another queue or replay has it."""
+    f = open(path, "a+", encoding="utf-8")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        raise JournalLocked(f"{path} is in use by another write-behind queue or replay") from None
+    return f
+
+
+def read_journal(path):
+    """Entries in the journal at path that were never committed, oldest first."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return unsaved_entries(f)
+
+
+def unsaved_entries(f):
+    """Like read_journal(), from a journal opened with open_journal()."""
+    f.seek(0)
+    entries, committed = [], 0
+    for line in f:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # torn last line from a crash mid-write
+        if "committed" in record:
+            committed = max(committed, record["committed"])
+        else:
+            entries.append(record)
+    return [e for e in entries if e["seq"] > committed]
+
+
+def reject_entry(journal_path, entry, error):
+    """Set aside a write that can never be saved, with the reason, in "<journal>.rejected"."""
+    reason = f"{type(error).__name__}: {error}"
+    with open(journal_path + ".rejected", "a", encoding="utf-8") as f:
+        f.write(json.dumps(dict(entry, error=reason), ensure_ascii=False) + "\n")
+    print(f"❌ Write-behind rejected {entry.get('op')} of {entry.get('part_id')}/{entry.get('order_id')}/"
+          f"{entry.get('stage_id')}: {reason}", file=sys.stderr, flush=True)
+
+
+def apply_entries(apply_batch, entries, permanent_errors=(), reject=None):
+    """apply_batch(entries) in one go or, if that fails with permanent_errors,
+    one entry at a time, passing each that fails that way to reject(entry, error).
+
+    Returns (saved, rejected, error): how many entries from the front were
+    saved and set aside, and the other error that stopped it, if any.
+    """
+    try:
+        apply_batch(entries)
+        return len(entries), 0, None
+    except permanent_errors:
+        pass
+    except Exception as e:
+        return 0, 0, e
+    saved = rejected = 0
+    for entry in entries:
+        try:
+            apply_batch([entry])
+            saved += 1
+        except permanent_errors as e:
+            reject(entry, e)
+            rejected += 1
+        except Exception as e:
+            return saved, rejected, e
+    return saved, rejected, None
+
+
+class WriteBehindQueue:
+    RETRY_DELAYS = (0.5, 1, 2, 5, 10, 30)   # seconds between attempts after a failed batch
+
+    def __init__(self, apply_batch, journal_path, max_pending=10000, batch_size=500,
+                 linger=0.05, fsync=True, permanent_errors=()):
+        self.apply_batch = apply_batch
+        self.journal_path = journal_path
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.linger = linger          # wait this long for a burst to build up a batch
+        self.fsync = fsync
+        self.permanent_errors = permanent_errors   # exception types a retry cannot fix
+        self.written = self.batches = self.failures = self.rejected = 0
+        self.last_error = None
+        self._journal = open_journal(journal_path)
+        # Writes an earlier run left unsaved go first, under the lock just taken.
+        self._pending = unsaved_entries(self._journal)
+        self.recovered = len(self._pending)
+        self._seq = max((e["seq"] for e in self._pending), default=0)
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def put(self, entry, timeout=None):
+        """Journal entry and queue it for the writer.
+
+        Blocks while max_pending writes are waiting; raises WriteQueueFull if
+        that lasts longer than timeout seconds.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: len(self._pending) < self.max_pending or self._stopping, timeout):
+                raise WriteQueueFull(f"{len(self._pending)} writes are waiting for the database")
+            if self._stopping:
+                raise WriteQueueFull("the write-behind queue is closed")
+            self._seq += 1
+            entry = dict(entry, seq=self._seq)
+            self._append({k: entry[k] for k in sorted(entry)})
+            self._pending.append(entry)
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait until every queued write is saved; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def close(self, timeout=None):
+        """Flush, then stop the writer. Unsaved writes stay in the journal.
+
+        Returns False if writes are still pending. The writer closes the journal
+        when it stops, so one still busy with a batch can finish writing it down.
+        """
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        return flushed and not self._thread.is_alive()
+
+    def stats(self):
+        with self._cond:
+            return {"pending": len(self._pending), "written": self.written, "batches": self.batches,
+                    "failures": self.failures, "rejected": self.rejected, "last_error": self.last_error}
+
+    def _append(self, record):
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _run(self):
+        try:
+            self._write_batches()
+        finally:
+            self._journal.close()
+
+    def _write_batches(self):
+        attempt = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stopping)
+                if self._stopping:
+                    return
+                if self.linger:
+                    self._cond.wait_for(lambda: len(self._pending) >= self.batch_size or self._stopping,
+                                        self.linger)
+                batch = self._pending[:self.batch_size]
+            saved, rejected, error = apply_entries(self.apply_batch, batch, self.permanent_errors,
+                                                   lambda entry, e: reject_entry(self.journal_path, entry, e))
+            with self._cond:
+                if saved or rejected:
+                    # Whatever was saved or set aside leaves the queue, even if a
+                    # later write in the batch has to be retried.
+                    done = batch[:saved + rejected]
+                    del self._pending[:len(done)]
+                    self.written += saved
+                    self.rejected += rejected
+                    self.batches += 1
+                    if self._pending:
+                        self._append({"committed": done[-1]["seq"]})
+                    else:
+                        self._journal.truncate(0)
+                    self._cond.notify_all()
+                if error is None:
+                    attempt = 0
+                    self.last_error = None
+                    continue
+                self.failures += 1
+                self.last_error = f"{type(error).__name__}: {error}"
+                delay = self.RETRY_DELAYS[min(attempt, len(self.RETRY_DELAYS) - 1)]
+                attempt += 1
+                self._cond.wait_for(lambda: self._stopping, delay)